@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import shutil
+import typing
+import resource
+import argparse
+import statistics
+import tempfile
+import contextlib
+import subprocess
+from pathlib import Path
+
+import fio_decode
+import fio_plugin
+import fio_pack
+from fake_fio import FIXTURE, FAKE_FIO, parse_size, write_synthetic_output
+from fio_schema import fio_input_schema, fio_output_schema
+
+
+def _parse_baseline(path: Path) -> int:
+    return len(
+        fio_output_schema.unserialize(json.loads(path.read_text())).jobs
+    )
+
+
+def _parse_streaming(path: Path, use_mmap: bool = False) -> int:
+    return len(fio_decode.load_output(path, use_mmap=use_mmap).jobs)
+
+
+def _iterate_streaming(path: Path) -> int:
+    # consume each JobResult and drop it, as a job-at-a-time consumer would
+    return sum(1 for _ in fio_decode.iter_job_results(path))
+
+
+_parsers = {
+    "baseline": _parse_baseline,
+    "streaming": _parse_streaming,
+    "streaming-mmap": lambda path: _parse_streaming(path, use_mmap=True),
+    "streaming-iter": _iterate_streaming,
+}
+
+
+def _maxrss_kib() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure_parse(mode: str, path: Path) -> dict:
+    idle_kib = _maxrss_kib()
+    start = time.perf_counter()
+    jobs = _parsers[mode](path)
+    seconds = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "jobs": jobs,
+        "seconds": seconds,
+        "idle_maxrss_kib": idle_kib,
+        "maxrss_kib": _maxrss_kib(),
+    }
+
+
+def bench_decode(args) -> list:
+    # decoding only: the JSON text is parsed before the clock starts
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for size in args.sizes.split(","):
+            path = Path(workdir) / "fio-plus-{}.json".format(size)
+            jobs = write_synthetic_output(path, parse_size(size), args.bins)
+            text = path.read_text()
+            path.unlink()
+            for mode in args.modes.split(","):
+                seconds = []
+                for _ in range(args.repeat):
+                    # the schema converts lists in place, decode a fresh copy
+                    document = json.loads(text)
+                    start = time.perf_counter()
+                    fio_decode.decode_output(
+                        document, fio_decode.DecodeMode(mode)
+                    )
+                    seconds.append(time.perf_counter() - start)
+                result = {
+                    "size": size,
+                    "file_bytes": len(text),
+                    "jobs": jobs,
+                    "mode": mode,
+                    "seconds": min(seconds),
+                }
+                results.append(result)
+                print(
+                    "{size:>6} {jobs:>6} jobs {mode:<8} "
+                    "{seconds:8.3f}s".format(**result),
+                    file=sys.stderr,
+                )
+    return results
+
+
+def _best_of(repeat: int, function: typing.Callable[[], typing.Any]) -> float:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def bench_pack(args) -> list:
+    # the fixture, then synthetic outputs of each size
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        sources = [("fixture", FIXTURE)]
+        for size in args.sizes.split(","):
+            path = Path(workdir) / "fio-plus-{}.json".format(size)
+            write_synthetic_output(path, parse_size(size), args.bins)
+            sources.append((size, path))
+        for name, path in sources:
+            output = fio_decode.load_output(path)
+            packed = Path(workdir) / "fio-plus-{}.pack".format(name)
+            dump_seconds = _best_of(
+                args.repeat, lambda: fio_pack.dump_output(output, packed)
+            )
+            result = {
+                "source": name,
+                "jobs": len(output.jobs),
+                "json_bytes": path.stat().st_size,
+                "packed_bytes": packed.stat().st_size,
+                "json_load_seconds": _best_of(
+                    args.repeat, lambda: fio_decode.load_output(path)
+                ),
+                "packed_load_seconds": _best_of(
+                    args.repeat, lambda: fio_pack.load_output(packed)
+                ),
+                "packed_dump_seconds": dump_seconds,
+            }
+            results.append(result)
+            print(
+                "{source:>8} {jobs:>6} jobs {json_bytes:>11} B json "
+                "{packed_bytes:>10} B packed, load "
+                "{json_load_seconds:7.3f}s json "
+                "{packed_load_seconds:7.3f}s packed".format(**result),
+                file=sys.stderr,
+            )
+    return results
+
+
+_phases = ("render", "spawn", "parse", "unserialize", "serialize", "run")
+
+
+def overhead_job(args, jobs: int):
+    # ioengine=null moves no data, which leaves fio's and the plugin's own
+    # costs; the stand-in ignores the job file
+    document = {
+        "name": "overhead",
+        "params": {
+            "size": args.size,
+            "ioengine": "null",
+            "iodepth": 1,
+            "rate_iops": 0,
+            "io_submit_mode": "inline",
+            "readwrite": "randrw",
+        },
+        "work_dir": args.workdir,
+    }
+    if jobs > 1:
+        document["global_options"] = {"numjobs": str(jobs)}
+    return fio_input_schema.unserialize(document)
+
+
+@contextlib.contextmanager
+def _environment(overrides: typing.Dict[str, str]):
+    saved = dict(os.environ)
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+def measure_overhead(job, repeat: int) -> typing.Dict[str, typing.List[float]]:
+    """Time each phase of a plugin run separately, repeat times: writing
+    the job file, running fio, parsing its JSON, building the dataclasses
+    and serializing the result; then a whole fio_plugin.run."""
+    samples: typing.Dict[str, typing.List[float]] = {p: [] for p in _phases}
+    for _ in range(repeat):
+        with fio_plugin._work_dir(job) as work_dir:
+            start = time.perf_counter()
+            cmd = fio_plugin._fio_command(job, work_dir)
+            rendered = time.perf_counter()
+            subprocess.run(
+                cmd, cwd=work_dir, check=True, stdout=subprocess.DEVNULL
+            )
+            spawned = time.perf_counter()
+            document = json.loads(
+                (work_dir / fio_plugin._OUTPUT_FILE).read_text()
+            )
+            parsed = time.perf_counter()
+            output = fio_decode.decode_output(document)
+            decoded = time.perf_counter()
+            json.dumps(fio_output_schema.serialize(output))
+            serialized = time.perf_counter()
+        start_run = time.perf_counter()
+        output_id, result = fio_plugin.run(job)
+        if output_id != "success":
+            raise RuntimeError(result.error)
+        finished = time.perf_counter()
+        for phase, seconds in zip(
+            _phases,
+            (
+                rendered - start,
+                spawned - rendered,
+                parsed - spawned,
+                decoded - parsed,
+                serialized - decoded,
+                finished - start_run,
+            ),
+        ):
+            samples[phase].append(seconds)
+    return samples
+
+
+def bench_overhead(args) -> list:
+    results = []
+    real = args.fio != "fake"
+    configs = [
+        (jobs, bins)
+        for jobs in (int(j) for j in args.jobs.split(","))
+        for bins in ([None] if real else args.bins.split(","))
+    ]
+    with tempfile.TemporaryDirectory(dir=args.workdir) as cache:
+        for jobs, bins in configs:
+            env = {}
+            if real:
+                fio_dir = str(Path(shutil.which(args.fio)).parent)
+            else:
+                fio_dir = str(FAKE_FIO.parent)
+                env.update(
+                    FAKE_FIO_JOBS=str(jobs),
+                    FAKE_FIO_BINS=bins,
+                    FAKE_FIO_CACHE=cache,
+                )
+            env["PATH"] = fio_dir + os.pathsep + os.environ["PATH"]
+            job = overhead_job(args, jobs if real else 1)
+            with _environment(env):
+                # warm up: the stand-in generates its output, caches fill
+                measure_overhead(job, 1)
+                samples = measure_overhead(job, args.repeat)
+            result = {
+                "fio": "fake" if not real else args.fio,
+                "jobs": jobs,
+                "bins": bins and int(bins),
+                "phases": {
+                    phase: {
+                        "median": statistics.median(seconds),
+                        "min": min(seconds),
+                    }
+                    for phase, seconds in samples.items()
+                },
+            }
+            results.append(result)
+            print(
+                "{:>5} {:>4} jobs {:>6} bins ".format(
+                    result["fio"], jobs, bins or "-"
+                )
+                + " ".join(
+                    "{} {:.4f}s".format(phase, times["median"])
+                    for phase, times in result["phases"].items()
+                ),
+                file=sys.stderr,
+            )
+    return results
+
+
+def find_regressions(
+    baseline: list, results: list, tolerance: float
+) -> typing.List[str]:
+    """Phases whose median in results exceeds the same configuration's in
+    baseline by more than the tolerance, as a fraction."""
+    previous = {
+        (r["fio"], r["jobs"], r["bins"]): r["phases"] for r in baseline
+    }
+    regressions = []
+    for result in results:
+        key = (result["fio"], result["jobs"], result["bins"])
+        for phase, times in result["phases"].items():
+            before = previous.get(key, {}).get(phase)
+            if before and times["median"] > before["median"] * (
+                1 + tolerance
+            ):
+                regressions.append(
+                    "{} jobs={} bins={} {}: {:.4f}s -> {:.4f}s".format(
+                        *key, phase, before["median"], times["median"]
+                    )
+                )
+    return regressions
+
+
+def _run_child(args: list) -> dict:
+    # every measurement gets a fresh process so that peak RSS is per path
+    result = subprocess.run(
+        [sys.executable, __file__] + args,
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def bench_parse(args) -> list:
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for size in args.sizes.split(","):
+            path = Path(workdir) / "fio-plus-{}.json".format(size)
+            jobs = write_synthetic_output(path, parse_size(size), args.bins)
+            for mode in args.modes.split(","):
+                result = _run_child(["measure-parse", mode, str(path)])
+                result.update(size=size, file_bytes=path.stat().st_size)
+                results.append(result)
+                print(
+                    "{size:>6} {jobs:>6} jobs {mode:<15} {seconds:8.2f}s "
+                    "{peak:>10} KiB peak RSS".format(
+                        size=size,
+                        jobs=jobs,
+                        mode=mode,
+                        seconds=result["seconds"],
+                        peak=result["maxrss_kib"],
+                    ),
+                    file=sys.stderr,
+                )
+            path.unlink()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks for the fio plugin's own overhead."
+    )
+    parser.add_argument(
+        "--output", type=Path, help="write machine-readable results here"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parse_cmd = commands.add_parser(
+        "parse", help="peak memory and time of json+ output parsing"
+    )
+    parse_cmd.add_argument("--sizes", default="10MB,100MB")
+    parse_cmd.add_argument("--modes", default=",".join(_parsers))
+    parse_cmd.add_argument(
+        "--bins", type=int, default=20000, help="bins per latency histogram"
+    )
+    parse_cmd.add_argument("--workdir", help="directory for synthetic files")
+    parse_cmd.set_defaults(func=bench_parse)
+
+    decode_cmd = commands.add_parser(
+        "decode", help="CPU time of building the output dataclasses"
+    )
+    decode_cmd.add_argument("--sizes", default="1MB,10MB,100MB")
+    decode_cmd.add_argument("--modes", default="generic,fast")
+    decode_cmd.add_argument(
+        "--bins", type=int, default=20000, help="bins per latency histogram"
+    )
+    decode_cmd.add_argument("--repeat", type=int, default=3)
+    decode_cmd.add_argument("--workdir", help="directory for synthetic files")
+    decode_cmd.set_defaults(func=bench_decode)
+
+    pack_cmd = commands.add_parser(
+        "pack", help="size and load time of packed outputs against json+"
+    )
+    pack_cmd.add_argument("--sizes", default="1MB,10MB,100MB")
+    pack_cmd.add_argument(
+        "--bins", type=int, default=20000, help="bins per latency histogram"
+    )
+    pack_cmd.add_argument("--repeat", type=int, default=3)
+    pack_cmd.add_argument("--workdir", help="directory for synthetic files")
+    pack_cmd.set_defaults(func=bench_pack)
+
+    overhead_cmd = commands.add_parser(
+        "overhead",
+        help="per-phase cost of a plugin run, against the stand-in fio",
+    )
+    overhead_cmd.add_argument(
+        "--fio",
+        default="fake",
+        help="fake for mocks/fio, or a real fio executable to run with "
+        "ioengine=null",
+    )
+    overhead_cmd.add_argument(
+        "--jobs", default="1,16", help="jobs in the output, or numjobs"
+    )
+    overhead_cmd.add_argument(
+        "--bins", default="1000,20000", help="bins per latency histogram"
+    )
+    overhead_cmd.add_argument(
+        "--size", default="64m", help="size per job for a real fio"
+    )
+    overhead_cmd.add_argument("--repeat", type=int, default=5)
+    overhead_cmd.add_argument("--workdir", help="directory for fio's files")
+    overhead_cmd.add_argument(
+        "--baseline",
+        type=Path,
+        help="earlier --output of this benchmark to check for regressions",
+    )
+    overhead_cmd.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown of a phase's median against the baseline",
+    )
+    overhead_cmd.set_defaults(func=bench_overhead)
+
+    measure_cmd = commands.add_parser("measure-parse")
+    measure_cmd.add_argument("mode", choices=list(_parsers))
+    measure_cmd.add_argument("path", type=Path)
+
+    args = parser.parse_args(argv)
+    if args.command == "measure-parse":
+        print(json.dumps(measure_parse(args.mode, args.path)))
+        return 0
+
+    results = args.func(args)
+    document = json.dumps(
+        {"benchmark": args.command, "results": results}, indent=2
+    )
+    if args.output:
+        args.output.write_text(document)
+    else:
+        print(document)
+    if getattr(args, "baseline", None):
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = find_regressions(baseline, results, args.tolerance)
+        for regression in regressions:
+            print("regression: " + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
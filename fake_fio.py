@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# Synthetic fio json+ outputs, and a stand-in fio that emits them. Only the
+# standard library is imported, so that starting the stand-in costs about
+# as little as starting fio.
+
+import os
+import sys
+import json
+import random
+import shutil
+import typing
+import tempfile
+from pathlib import Path
+
+
+FIXTURE = Path(__file__).parent / (
+    "fixtures/poisson-rate-submission_output-plus.json"
+)
+
+# the stand-in fio, configured through the FAKE_FIO_* environment variables
+FAKE_FIO = Path(__file__).parent / "mocks" / "fio"
+
+_units = {"": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    for suffix in ("KB", "MB", "GB", ""):
+        number = text[: len(text) - len(suffix)]
+        if text.endswith(suffix) and number:
+            return int(float(number) * _units[suffix])
+    raise ValueError("invalid size {!r}".format(text))
+
+
+def _synthetic_bins(rng: random.Random, count: int) -> dict:
+    # fio's json+ bins are keyed by the latency bucket in nanoseconds
+    bins = {}
+    value = 1000
+    for _ in range(count):
+        value += rng.randint(1, 4096)
+        bins[str(value)] = rng.randint(1, 1000)
+    return bins
+
+
+def synthetic_job(template: dict, index: int, bins: int, seed: int) -> dict:
+    rng = random.Random(seed + index)
+    job = json.loads(json.dumps(template))
+    job["jobname"] = "{}-{}".format(template["jobname"], index)
+    for direction in ("read", "write", "trim"):
+        for latency in ("clat_ns", "lat_ns"):
+            job[direction][latency]["bins"] = _synthetic_bins(rng, bins)
+    return job
+
+
+def write_synthetic_output(
+    path: Path,
+    target_bytes: int,
+    bins: int = 20000,
+    seed: int = 0,
+    job_count: typing.Optional[int] = None,
+) -> int:
+    """Write a fio json+ output of roughly target_bytes, or of exactly
+    job_count jobs, by replicating the fixture's job with dense latency
+    bins. Returns the job count."""
+    document = json.loads(FIXTURE.read_text())
+    template = document.pop("jobs")[0]
+    header = json.dumps(document)[1:-1]
+    written = 0
+    jobs = 0
+    with open(path, "w") as out:
+        out.write('{"jobs": [')
+        while (
+            jobs < job_count
+            if job_count is not None
+            else written < target_bytes or jobs == 0
+        ):
+            text = json.dumps(synthetic_job(template, jobs, bins, seed))
+            if jobs:
+                out.write(", ")
+            out.write(text)
+            written += len(text)
+            jobs += 1
+        out.write("], " + header + "}")
+    return jobs
+
+
+def client_output(document: dict, servers: typing.List[str]) -> dict:
+    """document as fio --client reports it for the servers: every server's
+    copy of the jobs tagged with its hostname and port under client_stats,
+    followed by the all-clients sum when there is more than one server."""
+    jobs = document.pop("jobs")
+    stats = []
+    for server in servers:
+        hostname, _, port = server.partition(",")
+        for job in jobs:
+            stats.append(dict(job, hostname=hostname, port=int(port or 8765)))
+    if len(servers) > 1:
+        total = json.loads(json.dumps(stats[-1]))
+        total["jobname"] = "All clients"
+        del total["job options"]
+        for direction in ("read", "write", "trim"):
+            for key in ("io_bytes", "bw", "iops", "total_ios"):
+                total[direction][key] = sum(
+                    job[direction][key] for job in stats
+                )
+        stats.append(total)
+    document["client_stats"] = stats
+    return document
+
+
+def fake_fio(argv: typing.List[str]) -> int:
+    """Act as fio for mocks/fio: print a version, or write a synthetic json+
+    output of FAKE_FIO_JOBS jobs (or FAKE_FIO_SIZE bytes) with FAKE_FIO_BINS
+    bins per histogram to --output, or stdout, as --client with a host list
+    file would for its servers if given. Outputs are generated once
+    per configuration into FAKE_FIO_CACHE, if set, so that repeated runs
+    cost a copy rather than a generation."""
+    if "--version" in argv:
+        print("fio-3.35-fake")
+        return 0
+    outputs = [
+        arg.split("=", 1)[1] for arg in argv if arg.startswith("--output=")
+    ]
+    clients = [
+        arg.split("=", 1)[1] for arg in argv if arg.startswith("--client=")
+    ]
+    env = os.environ
+    jobs = int(env["FAKE_FIO_JOBS"]) if "FAKE_FIO_JOBS" in env else None
+    size = parse_size(env.get("FAKE_FIO_SIZE", "1KB"))
+    bins = int(env.get("FAKE_FIO_BINS", "1000"))
+    name = "fake-fio-{}-{}-{}.json".format(jobs or 0, size, bins)
+    cache = Path(env.get("FAKE_FIO_CACHE") or tempfile.gettempdir())
+    path = cache / name
+    if "FAKE_FIO_CACHE" not in env or not path.exists():
+        fd, temp = tempfile.mkstemp(dir=cache, suffix=".tmp")
+        os.close(fd)
+        write_synthetic_output(Path(temp), size, bins, job_count=jobs)
+        os.replace(temp, path)
+    if clients:
+        # a host list file, one server per line
+        servers = Path(clients[0]).read_text().split()
+        text = json.dumps(client_output(json.loads(path.read_text()), servers))
+        if outputs:
+            Path(outputs[0]).write_text(text)
+        else:
+            sys.stdout.write(text)
+    elif outputs:
+        shutil.copyfile(path, outputs[0])
+    else:
+        with open(path, "rb") as document:
+            shutil.copyfileobj(document, sys.stdout.buffer)
+    if "FAKE_FIO_CACHE" not in env:
+        path.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(fake_fio(sys.argv[1:]))
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import typing
+import hashlib
+import tempfile
+from pathlib import Path
+
+from fio_schema import FioSuccessOutput, ResultCache, fio_output_schema
+
+
+def cache_key(job_file: str, fio_version: str, fingerprint: str) -> str:
+    material = "\0".join((job_file, fio_version, fingerprint))
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class OutputCache:
+    """Directory of FioSuccessOutputs keyed by cache_key, one JSON file
+    each. A hit refreshes the entry's modification time, which eviction
+    uses both for age and for least-recently-used order."""
+
+    def __init__(self, options: ResultCache):
+        self.options = options
+        self.directory = Path(options.directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> typing.Optional[FioSuccessOutput]:
+        path = self._path(key)
+        try:
+            if self._expired(path.stat().st_mtime, time.time()):
+                path.unlink(missing_ok=True)
+                return None
+            text = path.read_text()
+        except OSError:
+            return None
+        try:
+            output = fio_output_schema.unserialize(json.loads(text))
+        except Exception:
+            # a corrupt entry, or one written under an older schema
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)
+        return output
+
+    def put(self, key: str, output: FioSuccessOutput):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so readers never see a partial
+        # entry
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as entry:
+            json.dump(fio_output_schema.serialize(output), entry)
+        os.replace(temp, self._path(key))
+        self.evict()
+
+    def _expired(self, mtime: float, now: float) -> bool:
+        max_age = self.options.max_age_seconds
+        return max_age is not None and now - mtime > max_age
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if self._expired(st.st_mtime, now):
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((st.st_mtime, st.st_size, path))
+        max_bytes = self.options.max_bytes
+        if max_bytes is None:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
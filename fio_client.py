@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+import typing
+from dataclasses import replace
+
+from fio_schema import (
+    FioClientOutput,
+    FioSuccessOutput,
+    JobResult,
+    ServerOutput,
+)
+
+
+# jobname of the results fio --client sums across all servers
+ALL_CLIENTS = "All clients"
+
+
+def hosts_file(servers: typing.Sequence[str]) -> str:
+    """A fio --client host list: every job file given with it is run on
+    each of the servers."""
+    return "".join(server + "\n" for server in servers)
+
+
+def split_client_output(output: FioSuccessOutput) -> FioClientOutput:
+    """Group the jobs of a fio --client output by the server that ran them,
+    apart from fio's all-clients aggregate."""
+    servers: typing.Dict[
+        typing.Tuple[str, typing.Optional[int]], typing.List[JobResult]
+    ] = {}
+    aggregate = []
+    for job in output.jobs:
+        if job.jobname == ALL_CLIENTS:
+            aggregate.append(job)
+        else:
+            servers.setdefault((job.hostname, job.port), []).append(job)
+    return FioClientOutput(
+        servers=[
+            ServerOutput(hostname, replace(output, jobs=jobs), port)
+            for (hostname, port), jobs in servers.items()
+        ],
+        aggregate=aggregate or None,
+    )
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+import typing
+
+from fio_schema import (
+    AioOutput,
+    DirectionComparison,
+    FioCompare,
+    FioCompareOutput,
+    MetricChange,
+    Verdict,
+)
+from fio_stats import ks_two_sample
+
+
+DEFAULT_PERCENTILES = (99.0, 99.9)
+
+
+def _change(
+    metric: str,
+    baseline: float,
+    candidate: float,
+    threshold: float,
+    higher_is_better: bool,
+) -> typing.Optional[MetricChange]:
+    if not baseline:
+        return None
+    change = (candidate - baseline) / baseline
+    verdict = Verdict.unchanged
+    if abs(change) > threshold:
+        better = change > 0 if higher_is_better else change < 0
+        verdict = Verdict.improvement if better else Verdict.regression
+    return MetricChange(
+        metric=metric,
+        baseline=float(baseline),
+        candidate=float(candidate),
+        change=change,
+        verdict=verdict,
+    )
+
+
+def compare_direction(
+    params: FioCompare,
+    jobname: str,
+    direction: str,
+    baseline: AioOutput,
+    candidate: AioOutput,
+) -> DirectionComparison:
+    changes = [
+        _change(
+            "iops",
+            baseline.iops,
+            candidate.iops,
+            params.iops_threshold,
+            True,
+        ),
+        _change(
+            "bw_bytes",
+            baseline.bw_bytes,
+            candidate.bw_bytes,
+            params.bw_threshold,
+            True,
+        ),
+    ]
+    percentiles = params.percentiles or DEFAULT_PERCENTILES
+    for p, before, after in zip(
+        percentiles,
+        baseline.clat_ns.percentile_values(percentiles),
+        candidate.clat_ns.percentile_values(percentiles),
+    ):
+        if before is not None and after is not None:
+            changes.append(
+                _change(
+                    "clat_p{:g}_ns".format(p),
+                    before,
+                    after,
+                    params.latency_threshold,
+                    False,
+                )
+            )
+    metrics = [change for change in changes if change is not None]
+    comparison = DirectionComparison(
+        jobname=jobname,
+        direction=direction,
+        verdict=Verdict.unchanged,
+        metrics=metrics,
+    )
+    verdicts = [metric.verdict for metric in metrics]
+    if baseline.clat_ns.bins and candidate.clat_ns.bins:
+        up, down, p_value = ks_two_sample(
+            baseline.clat_ns.histogram(), candidate.clat_ns.histogram()
+        )
+        comparison.ks_statistic = max(up, down)
+        comparison.ks_p_value = p_value
+        comparison.distribution_verdict = Verdict.unchanged
+        if (
+            p_value <= params.significance
+            and comparison.ks_statistic >= params.distribution_threshold
+        ):
+            # the baseline's CDF above the candidate's: slower candidate
+            comparison.distribution_verdict = (
+                Verdict.regression if up >= down else Verdict.improvement
+            )
+        verdicts.append(comparison.distribution_verdict)
+    if Verdict.regression in verdicts:
+        comparison.verdict = Verdict.regression
+    elif Verdict.improvement in verdicts:
+        comparison.verdict = Verdict.improvement
+    return comparison
+
+
+def compare_outputs(params: FioCompare) -> FioCompareOutput:
+    """Compare every job and exercised direction of the candidate with the
+    baseline job at the same position."""
+    baseline_jobs = params.baseline.jobs
+    candidate_jobs = params.candidate.jobs
+    if [job.jobname for job in baseline_jobs] != [
+        job.jobname for job in candidate_jobs
+    ]:
+        raise ValueError(
+            "the baseline and candidate have different jobs, compare "
+            "outputs of the same job file"
+        )
+    comparisons = []
+    for before, after in zip(baseline_jobs, candidate_jobs):
+        for direction in ("read", "write", "trim"):
+            baseline = getattr(before, direction)
+            candidate = getattr(after, direction)
+            if not (baseline.total_ios or candidate.total_ios):
+                continue
+            comparisons.append(
+                compare_direction(
+                    params, before.jobname, direction, baseline, candidate
+                )
+            )
+    return FioCompareOutput(
+        comparisons=comparisons,
+        regression=any(
+            comparison.verdict == Verdict.regression
+            for comparison in comparisons
+        ),
+    )
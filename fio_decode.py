@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+
+import io
+import enum
+import json
+import mmap
+import codecs
+import typing
+import contextlib
+from pathlib import Path
+
+from arcaflow_plugin_sdk import schema
+from fio_instrument import PhaseTimer
+from fio_schema import (
+    FioSuccessOutput,
+    JobResult,
+    fio_output_schema,
+    job_schema,
+)
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# fio --client reports the jobs of every server under client_stats
+_job_keys = frozenset(("jobs", "client_stats"))
+
+Source = typing.Union[
+    Path, str, bytes, bytearray, memoryview, typing.BinaryIO
+]
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+
+
+def _buffer_chunks(
+    buffer: typing.Union[bytes, bytearray, memoryview, mmap.mmap],
+    chunk_size: int,
+) -> typing.Iterator[str]:
+    view = memoryview(buffer)
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for offset in range(0, len(view), chunk_size):
+            yield utf8.decode(view[offset:offset + chunk_size])
+        yield utf8.decode(b"", final=True)
+    finally:
+        view.release()
+
+
+def _file_chunks(
+    fileobj: typing.BinaryIO, chunk_size: int
+) -> typing.Iterator[str]:
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    # read1 returns what is available instead of waiting for a full chunk,
+    # which matters when the source is a pipe from a running fio
+    read = getattr(fileobj, "read1", fileobj.read)
+    while True:
+        data = read(chunk_size)
+        if not data:
+            break
+        yield utf8.decode(data)
+    yield utf8.decode(b"", final=True)
+
+
+def _path_chunks(
+    path: Path, chunk_size: int, use_mmap: bool
+) -> typing.Iterator[str]:
+    with open(path, "rb") as fileobj:
+        if use_mmap and Path(path).stat().st_size > 0:
+            with mmap.mmap(
+                fileobj.fileno(), 0, access=mmap.ACCESS_READ
+            ) as buffer:
+                yield from _buffer_chunks(buffer, chunk_size)
+        else:
+            yield from _file_chunks(fileobj, chunk_size)
+
+
+def text_chunks(
+    source: Source,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    use_mmap: bool = False,
+) -> typing.Iterator[str]:
+    """Yield decoded text from a path, binary file object, or bytes-like
+    buffer (including an mmap) in chunks of at most chunk_size bytes."""
+    if isinstance(source, (str, Path)):
+        return _path_chunks(Path(source), chunk_size, use_mmap)
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return _buffer_chunks(source, chunk_size)
+    if isinstance(source, io.TextIOBase):
+        raise TypeError("text_chunks requires a binary file object")
+    return _file_chunks(source, chunk_size)
+
+
+class JsonStream:
+    """Incremental JSON reader over a sequence of text chunks.
+
+    Only the part of the document that has not been consumed yet is kept in
+    memory, so a large top-level object can be walked one member at a time.
+    """
+
+    def __init__(self, chunks: typing.Iterable[str]):
+        self._chunks = iter(chunks)
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        # read at least as much as is already buffered so that re-decoding a
+        # value that straddles chunks stays linear in its size
+        wanted = max(len(self._buf) - self._pos, 1)
+        pieces = [self._buf[self._pos:]]
+        read = 0
+        while read < wanted:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                break
+            pieces.append(chunk)
+            read += len(chunk)
+        self._buf = "".join(pieces)
+        self._pos = 0
+        return read > 0
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or an empty string
+        at the end of the stream."""
+        while True:
+            while self._pos < len(self._buf):
+                if self._buf[self._pos] not in _whitespace:
+                    return self._buf[self._pos]
+                self._pos += 1
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(
+                "malformed fio json: expected {!r}, found {!r}".format(
+                    char, found or "end of input"
+                )
+            )
+        self._pos += 1
+
+    def consume(self, char: str) -> bool:
+        if self.peek() == char:
+            self._pos += 1
+            return True
+        return False
+
+    def value(self) -> typing.Any:
+        """Decode the next complete JSON value."""
+        if not self.peek():
+            raise ValueError("malformed fio json: unexpected end of input")
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number at the end of the buffer may continue in the next chunk
+            if end == len(self._buf) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def members(self) -> typing.Iterator[str]:
+        """Iterate over the keys of the object at the current position. The
+        caller must consume each member's value before advancing."""
+        self.expect("{")
+        if self.consume("}"):
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("malformed fio json: object key expected")
+            self.expect(":")
+            yield key
+            if self.consume("}"):
+                return
+            self.expect(",")
+
+    def items(self) -> typing.Iterator[None]:
+        """Iterate over the elements of the array at the current position.
+        The caller must consume each element before advancing."""
+        self.expect("[")
+        if self.consume("]"):
+            return
+        while True:
+            yield None
+            if self.consume("]"):
+                return
+            self.expect(",")
+
+    def at_end(self) -> bool:
+        return self.peek() == ""
+
+
+class DecodeMode(str, enum.Enum):
+    # fast: the compiled decoder, falling back to the schema on any value it
+    # does not handle; generic: the schema only; verify: both, compared
+    fast = "fast"
+    generic = "generic"
+    verify = "verify"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class _Unhandled(Exception):
+    """Raised by a compiled decoder for data outside the shape it handles;
+    the schema then decodes the data, or reports what is wrong with it."""
+
+
+Decoder = typing.Callable[[typing.Any], typing.Any]
+
+# called with each raw job before it is decoded, to drop what is not wanted
+Prune = typing.Optional[typing.Callable[[typing.Dict[str, typing.Any]], None]]
+
+
+def _typed(expected: type) -> Decoder:
+    def decode(data):
+        if type(data) is not expected:
+            raise _Unhandled()
+        return data
+
+    return decode
+
+
+def _checked(t: schema.AbstractType, decode: Decoder) -> Decoder:
+    # min, max and pattern constraints are left to the type itself
+    def check(data):
+        value = decode(data)
+        t.validate(value)
+        return value
+
+    return check
+
+
+def _constrained(t: schema.AbstractType) -> bool:
+    return any(
+        getattr(t, attribute, None) is not None
+        for attribute in ("min", "max", "_min_length", "_max_length")
+    ) or (getattr(t, "_pattern", None) is not None)
+
+
+def _compile_map(t: schema.MapType) -> Decoder:
+    key = _compile(t.key_type)
+    value = _compile(t.value_type)
+    if isinstance(t.key_type, schema.StringType) and not _constrained(
+        t.key_type
+    ):
+        if isinstance(t.value_type, (schema.IntType, schema.FloatType)):
+            # latency bins and percentiles: check the values in one pass
+            expected = (
+                int if isinstance(t.value_type, schema.IntType) else float
+            )
+            if not _constrained(t.value_type):
+
+                def decode_numbers(data):
+                    if type(data) is not dict or not all(
+                        type(v) is expected for v in data.values()
+                    ):
+                        raise _Unhandled()
+                    return dict(data)
+
+                return decode_numbers
+
+        def decode_values(data):
+            if type(data) is not dict:
+                raise _Unhandled()
+            return {k: value(v) for k, v in data.items()}
+
+        return decode_values
+
+    def decode(data):
+        if type(data) is not dict:
+            raise _Unhandled()
+        result = {}
+        for k, v in data.items():
+            decoded = key(k)
+            if decoded in result:
+                raise _Unhandled()
+            result[decoded] = value(v)
+        return result
+
+    return decode
+
+
+def _compile_list(t: schema.ListType) -> Decoder:
+    item = _compile(t.type)
+
+    def decode(data):
+        if type(data) is not list:
+            raise _Unhandled()
+        return [item(element) for element in data]
+
+    return decode
+
+
+def _compile_object(t: schema.ObjectType) -> Decoder:
+    if any(
+        p.required_if or p.required_if_not or p.conflicts
+        for p in t.properties.values()
+    ):
+        return _generic(t)
+    properties = [
+        (
+            property_id,
+            p.field_override or property_id,
+            _compile(p.type),
+            p.required,
+        )
+        for property_id, p in t.properties.items()
+    ]
+    allowed = frozenset(t.properties)
+    cls = t.cls
+
+    def decode(data):
+        if type(data) is not dict or not allowed.issuperset(data):
+            raise _Unhandled()
+        kwargs = {}
+        for property_id, name, decode_property, required in properties:
+            value = data.get(property_id)
+            if value is None:
+                if required:
+                    raise _Unhandled()
+                continue
+            kwargs[name] = decode_property(value)
+        return cls(**kwargs)
+
+    return decode
+
+
+def _generic(t: schema.AbstractType) -> Decoder:
+    def decode(data):
+        try:
+            return t.unserialize(data)
+        except schema.ConstraintException as exc:
+            raise _Unhandled() from exc
+
+    return decode
+
+
+def _compile(t: schema.AbstractType) -> Decoder:
+    """A decoder for t that builds the same value as t.unserialize for the
+    JSON fio writes, without the schema's per-value bookkeeping."""
+    if isinstance(t, schema.ObjectType):
+        return _compile_object(t)
+    if isinstance(t, schema.ListType):
+        if _constrained(t):
+            return _checked(t, _compile_list(t))
+        return _compile_list(t)
+    if isinstance(t, schema.MapType):
+        if _constrained(t):
+            return _checked(t, _compile_map(t))
+        return _compile_map(t)
+    for type_class, expected in (
+        (schema.IntType, int),
+        (schema.FloatType, float),
+        (schema.StringType, str),
+        (schema.BoolType, bool),
+    ):
+        if isinstance(t, type_class):
+            if _constrained(t):
+                return _checked(t, _typed(expected))
+            return _typed(expected)
+    return _generic(t)
+
+
+_fast_job = _compile(job_schema)
+_fast_output = _compile(fio_output_schema)
+
+
+def _decode(
+    decode_fast: Decoder,
+    generic: schema.AbstractType,
+    data: typing.Any,
+    path: typing.Tuple[str, ...],
+    mode: DecodeMode,
+):
+    if mode == DecodeMode.generic:
+        return generic.unserialize(data, path)
+    try:
+        value = decode_fast(data)
+    except _Unhandled:
+        # the schema either handles it or reports where it is malformed
+        return generic.unserialize(data, path)
+    if mode == DecodeMode.verify:
+        expected = generic.unserialize(data, path)
+        if value != expected:
+            raise ValueError(
+                "fast and generic decoding of {} differ".format(
+                    "/".join(path) or "output"
+                )
+            )
+    return value
+
+
+def decode_job(
+    data: typing.Dict[str, typing.Any],
+    mode: DecodeMode = DecodeMode.fast,
+) -> JobResult:
+    """JobResult of one decoded element of a json+ output's jobs."""
+    return _decode(_fast_job, job_schema, data, ("jobs",), mode)
+
+
+def decode_output(
+    data: typing.Dict[str, typing.Any],
+    mode: DecodeMode = DecodeMode.fast,
+) -> FioSuccessOutput:
+    """FioSuccessOutput of a decoded json+ output, as
+    fio_output_schema.unserialize builds it."""
+    return _decode(_fast_output, fio_output_schema, data, (), mode)
+
+
+def _decode_document(
+    stream: JsonStream,
+    on_job: typing.Callable[[typing.Dict[str, typing.Any]], None],
+) -> typing.Dict[str, typing.Any]:
+    header = {}
+    for key in stream.members():
+        if key in _job_keys:
+            # validated as an empty list, the jobs are handed to on_job
+            header["jobs"] = []
+            for _ in stream.items():
+                on_job(stream.value())
+        else:
+            header[key] = stream.value()
+    return header
+
+
+def iter_job_results(
+    source: Source,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    use_mmap: bool = False,
+    mode: DecodeMode = DecodeMode.fast,
+    prune: Prune = None,
+) -> typing.Iterator[JobResult]:
+    """Yield the JobResult of every job in a fio json+ output one at a time,
+    without holding the other jobs in memory."""
+    stream = JsonStream(text_chunks(source, chunk_size, use_mmap))
+    for key in stream.members():
+        if key in _job_keys:
+            for _ in stream.items():
+                job = stream.value()
+                if prune is not None:
+                    prune(job)
+                yield decode_job(job, mode)
+        else:
+            stream.value()
+
+
+def _build_output(
+    stream: JsonStream,
+    mode: DecodeMode,
+    prune: Prune,
+    timer: typing.Optional[PhaseTimer] = None,
+) -> FioSuccessOutput:
+    jobs: typing.List[JobResult] = []
+
+    def decoding() -> typing.ContextManager[None]:
+        return timer.phase("decode") if timer else contextlib.nullcontext()
+
+    def add_job(job: typing.Dict[str, typing.Any]):
+        if prune is not None:
+            prune(job)
+        with decoding():
+            jobs.append(decode_job(job, mode))
+
+    header = _decode_document(stream, add_job)
+    with decoding():
+        output = decode_output(header, mode)
+    output.jobs = jobs
+    return output
+
+
+def iter_outputs(
+    source: Source,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    mode: DecodeMode = DecodeMode.fast,
+    prune: Prune = None,
+    timer: typing.Optional[PhaseTimer] = None,
+) -> typing.Iterator[FioSuccessOutput]:
+    """Yield a FioSuccessOutput for each of a sequence of concatenated json+
+    documents, such as fio's interim reports with --status-interval, as
+    soon as each one is complete."""
+    stream = JsonStream(text_chunks(source, chunk_size))
+    while not stream.at_end():
+        yield _build_output(stream, mode, prune, timer)
+
+
+def load_output(
+    source: Source,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    use_mmap: bool = False,
+    mode: DecodeMode = DecodeMode.fast,
+    prune: Prune = None,
+    timer: typing.Optional[PhaseTimer] = None,
+) -> FioSuccessOutput:
+    """Build a FioSuccessOutput from a fio json+ output, decoding and
+    validating one job at a time so that only a single job's raw dict is
+    alive at once. With a timer, building the dataclasses is timed as the
+    decode phase."""
+    stream = JsonStream(text_chunks(source, chunk_size, use_mmap))
+    output = _build_output(stream, mode, prune, timer)
+    if not stream.at_end():
+        raise ValueError("malformed fio json: trailing data after output")
+    return output
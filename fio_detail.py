@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import typing
+
+from fio_schema import DetailLevel, FioJob
+
+
+RawJob = typing.Dict[str, typing.Any]
+
+# json+ maps of an IoLatency each detail level leaves out
+_dropped_maps = {
+    DetailLevel.summary: ("percentile", "bins"),
+    DetailLevel.percentiles: ("bins",),
+    DetailLevel.full: (),
+}
+
+
+def _drop_maps(result: typing.Any, maps: typing.Tuple[str, ...]):
+    if not isinstance(result, dict):
+        return
+    for latency in ("slat_ns", "clat_ns", "lat_ns"):
+        if isinstance(result.get(latency), dict):
+            for key in maps:
+                result[latency].pop(key, None)
+
+
+def prune_job(
+    job: RawJob,
+    detail: DetailLevel,
+    directions: typing.Optional[typing.Collection[str]] = None,
+):
+    """Remove from a raw json+ job, in place and before it is decoded, the
+    maps detail leaves out, and every latency map of the IO directions
+    outside directions."""
+    maps = _dropped_maps[DetailLevel(detail)]
+    for direction in ("read", "write", "trim"):
+        if directions is not None and direction not in directions:
+            _drop_maps(job.get(direction), ("percentile", "bins"))
+        else:
+            _drop_maps(job.get(direction), maps)
+    _drop_maps(job.get("sync"), maps)
+    if detail != DetailLevel.full:
+        for key in ("latency_ns", "latency_us", "latency_ms"):
+            job.pop(key, None)
+
+
+def job_pruner(params: FioJob) -> typing.Callable[[RawJob], None]:
+    """prune_job for the jobs of a run of params, with each job section's
+    directions taken from its readwrite pattern. A section replaying an
+    iolog may do IO in every direction."""
+    directions = params.section_directions()
+
+    def prune(job: RawJob):
+        prune_job(job, params.detail, directions.get(job.get("jobname")))
+
+    return prune
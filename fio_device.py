@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+import typing
+from pathlib import Path
+
+
+SYSFS = Path("/sys")
+
+
+def _read(path: Path) -> typing.Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def block_device(path: str) -> typing.Optional[Path]:
+    """sysfs directory of the block device path is, or of the block device
+    holding the file system path is on, or None for e.g. tmpfs. A file fio
+    has yet to create is on the file system of its nearest existing parent
+    directory."""
+    location = Path(path).absolute()
+    while True:
+        try:
+            st = os.stat(location)
+            break
+        except FileNotFoundError:
+            if location.parent == location:
+                return None
+            location = location.parent
+        except OSError:
+            return None
+    dev = st.st_rdev if stat.S_ISBLK(st.st_mode) else st.st_dev
+    device = SYSFS / "dev" / "block" / f"{os.major(dev)}:{os.minor(dev)}"
+    if not device.exists():
+        return None
+    return device.resolve()
+
+
+def whole_disk(device: Path) -> Path:
+    """The disk of a partition, or device itself."""
+    if (device / "partition").exists():
+        return device.parent
+    return device
+
+
+def fingerprint(path: str) -> str:
+    """Identity of the storage behind path: device numbers plus the model,
+    serial, WWID and size the kernel reports for it, where available."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return f"missing:{path}"
+    dev = st.st_rdev if stat.S_ISBLK(st.st_mode) else st.st_dev
+    parts = [f"{os.major(dev)}:{os.minor(dev)}"]
+    device = block_device(path)
+    if device is not None:
+        disk = whole_disk(device)
+        for attribute in (
+            disk / "device" / "model",
+            disk / "device" / "serial",
+            disk / "wwid",
+            device / "size",
+        ):
+            value = _read(attribute)
+            if value:
+                parts.append(value)
+    return "/".join(parts)
+
+
+def numa_node(device: Path) -> typing.Optional[int]:
+    """NUMA node of the device, from the nearest of it and its parents in
+    sysfs that reports one, e.g. the PCI function of an NVMe namespace.
+    None if the kernel reports no affinity."""
+    for directory in [device, *device.parents]:
+        if directory == SYSFS or SYSFS not in directory.parents:
+            break
+        value = _read(directory / "numa_node")
+        if value is not None:
+            node = int(value)
+            return node if node >= 0 else None
+    return None
+
+
+def node_cpus(node: int) -> typing.Optional[str]:
+    """The CPU list of a NUMA node, e.g. 0-15,32-47."""
+    return _read(
+        SYSFS / "devices" / "system" / "node" / f"node{node}" / "cpulist"
+    )
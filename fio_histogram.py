@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import math
+import typing
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class LatencyHistogram:
+    """Latency histogram stored as two parallel sorted integer arrays.
+
+    fio's json+ output reports a latency distribution as a map from the
+    stringified bucket value in nanoseconds to the quantity of IOs in that
+    bucket. This type keeps the same information as packed 64-bit integers
+    and answers queries with bisection over the cumulative counts instead of
+    parsing strings on every lookup.
+    """
+
+    __slots__ = ("values", "counts", "_cumulative")
+
+    def __init__(self, values: array, counts: array):
+        if len(values) != len(counts):
+            raise ValueError("values and counts must be the same length")
+        self.values = values
+        self.counts = counts
+        cumulative = array("q")
+        total = 0
+        for count in counts:
+            total += count
+            cumulative.append(total)
+        self._cumulative = cumulative
+
+    @classmethod
+    def from_bins(
+        cls, bins: typing.Optional[typing.Mapping[str, int]]
+    ) -> "LatencyHistogram":
+        pairs = sorted(
+            (int(value), count)
+            for value, count in (bins or {}).items()
+            if count
+        )
+        return cls(
+            array("q", (value for value, _ in pairs)),
+            array("q", (count for _, count in pairs)),
+        )
+
+    @classmethod
+    def merged(
+        cls, histograms: typing.Iterable["LatencyHistogram"]
+    ) -> "LatencyHistogram":
+        """Exact sum of several histograms, e.g. of jobs or targets."""
+        totals: typing.Dict[int, int] = {}
+        for histogram in histograms:
+            for value, count in zip(histogram.values, histogram.counts):
+                totals[value] = totals.get(value, 0) + count
+        values = sorted(totals)
+        return cls(
+            array("q", values), array("q", (totals[v] for v in values))
+        )
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, LatencyHistogram):
+            return NotImplemented
+        return self.values == other.values and self.counts == other.counts
+
+    def __repr__(self) -> str:
+        return "LatencyHistogram(buckets={}, N={})".format(
+            len(self.values), self.total
+        )
+
+    @property
+    def total(self) -> int:
+        return self._cumulative[-1] if self._cumulative else 0
+
+    def to_bins(self) -> typing.Dict[str, int]:
+        """The histogram in the json+ bins form used by IoLatency.bins."""
+        return {
+            str(value): count for value, count in zip(self.values, self.counts)
+        }
+
+    def percentiles(self, ps: typing.Iterable[float]) -> typing.List[int]:
+        """Latency at each percentile in ps, using fio's rule: the first
+        bucket whose cumulative count reaches p% of all samples."""
+        total = self.total
+        if not total:
+            return [0 for _ in ps]
+        last = len(self.values) - 1
+        return [
+            self.values[
+                min(bisect_left(self._cumulative, p / 100.0 * total), last)
+            ]
+            for p in ps
+        ]
+
+    def percentile(self, p: float) -> int:
+        return self.percentiles((p,))[0]
+
+    def percentile_map(
+        self, ps: typing.Iterable[float]
+    ) -> typing.Dict[str, int]:
+        """Percentiles keyed the way fio keys IoLatency.percentile."""
+        ps = list(ps)
+        return {
+            "{:.6f}".format(p): value
+            for p, value in zip(ps, self.percentiles(ps))
+        }
+
+    def cdf(self, latencies: typing.Iterable[int]) -> typing.List[float]:
+        """Fraction of samples at or below each latency in latencies."""
+        total = self.total
+        if not total:
+            return [0.0 for _ in latencies]
+        result = []
+        for latency in latencies:
+            index = bisect_right(self.values, latency)
+            below = self._cumulative[index - 1] if index else 0
+            result.append(below / total)
+        return result
+
+    def mean(self) -> float:
+        total = self.total
+        if not total:
+            return 0.0
+        weighted = sum(
+            value * count for value, count in zip(self.values, self.counts)
+        )
+        return weighted / total
+
+    def stddev(self) -> float:
+        """Sample standard deviation of the bucket values, matching fio's
+        n - 1 convention."""
+        total = self.total
+        if total < 2:
+            return 0.0
+        mean = self.mean()
+        squares = sum(
+            (value - mean) ** 2 * count
+            for value, count in zip(self.values, self.counts)
+        )
+        return math.sqrt(squares / (total - 1))
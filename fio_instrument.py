@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import typing
+import cProfile
+import resource
+import contextlib
+import subprocess
+
+from fio_schema import ChildUsage, PhaseTiming
+
+
+class PhaseTimer:
+    """Wall and CPU time of named phases of a run, on the calling thread. A
+    phase entered inside another is left out of the outer one's time."""
+
+    def __init__(self):
+        self._totals: typing.Dict[str, typing.List[float]] = {}
+        self._nested: typing.List[typing.List[float]] = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        total = self._totals.setdefault(name, [0.0, 0.0])
+        nested = [0.0, 0.0]
+        self._nested.append(nested)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            self._nested.pop()
+            total[0] += wall - nested[0]
+            total[1] += cpu - nested[1]
+            if self._nested:
+                self._nested[-1][0] += wall
+                self._nested[-1][1] += cpu
+
+    def timings(self) -> typing.List[PhaseTiming]:
+        return [
+            PhaseTiming(name, wall, cpu)
+            for name, (wall, cpu) in self._totals.items()
+        ]
+
+
+def wait_with_usage(proc: subprocess.Popen) -> resource.struct_rusage:
+    """Reap proc with wait4, setting its returncode, and return the
+    resource usage the kernel accounted to it."""
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return usage
+
+
+def child_usage(usage: resource.struct_rusage) -> ChildUsage:
+    return ChildUsage(
+        utime=usage.ru_utime,
+        stime=usage.ru_stime,
+        maxrss=usage.ru_maxrss,
+        minflt=usage.ru_minflt,
+        majflt=usage.ru_majflt,
+        inblock=usage.ru_inblock,
+        oublock=usage.ru_oublock,
+        nvcsw=usage.ru_nvcsw,
+        nivcsw=usage.ru_nivcsw,
+    )
+
+
+@contextlib.contextmanager
+def profiled(path: typing.Optional[str]) -> typing.Iterator[None]:
+    """Profile the calling thread with cProfile and dump the stats to path,
+    or do nothing if path is None."""
+    if path is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import typing
+from pathlib import Path
+
+from fio_schema import TraceFilter, fio_seconds
+
+
+# version 2 lines are "filename action" for the file actions and
+# "filename action offset length" for the IOs and for waits, which pause
+# for offset microseconds; version 3 drops the waits and puts a timestamp
+# in nanoseconds since the start of the trace in front of every line
+_headers = {
+    "fio version 2 iolog": 2,
+    "fio version 3 iolog": 3,
+}
+_FILE_ACTIONS = {"add", "open", "close"}
+_IO_ACTIONS = {"read", "write", "trim", "sync", "datasync"}
+_WAIT = "wait"
+
+
+class IologEntry(typing.NamedTuple):
+    timestamp: typing.Optional[int]
+    filename: str
+    action: str
+    offset: typing.Optional[int]
+    length: typing.Optional[int]
+
+    def format(self) -> str:
+        fields = [self.filename, self.action]
+        if self.timestamp is not None:
+            fields.insert(0, str(self.timestamp))
+        if self.offset is not None:
+            fields += [str(self.offset), str(self.length)]
+        return " ".join(fields) + "\n"
+
+
+def _number(text: str, what: str) -> int:
+    if not text.isdigit():
+        raise ValueError(f"{what} {text!r} is not a non-negative integer")
+    return int(text)
+
+
+def read_header(stream: typing.TextIO) -> int:
+    """The version of the iolog stream starts with."""
+    header = stream.readline().strip()
+    if header not in _headers:
+        raise ValueError(f"line 1: {header!r} is not an fio iolog header")
+    return _headers[header]
+
+
+def iter_entries(
+    stream: typing.TextIO, version: int
+) -> typing.Iterator[IologEntry]:
+    """The entries of an iolog after its header, checked as they are read
+    the way fio would reject them: unknown actions, malformed numbers, IOs
+    on files never added and timestamps going backwards."""
+    added: typing.Set[str] = set()
+    last = 0
+    for number, line in enumerate(stream, start=2):
+        fields = line.split()
+        try:
+            timestamp = None
+            if version == 3:
+                if not fields:
+                    raise ValueError("missing timestamp")
+                timestamp = _number(fields.pop(0), "timestamp")
+                if timestamp < last:
+                    raise ValueError("timestamp goes backwards")
+                last = timestamp
+            if len(fields) == 2 and fields[1] in _FILE_ACTIONS:
+                filename, action = fields
+                offset = length = None
+                if action == "add":
+                    added.add(filename)
+            elif len(fields) == 4 and (
+                fields[1] in _IO_ACTIONS or fields[1] == _WAIT
+            ):
+                if fields[1] == _WAIT and version != 2:
+                    raise ValueError("wait is only valid in version 2")
+                filename, action = fields[:2]
+                offset = _number(fields[2], "offset")
+                length = _number(fields[3], "length")
+            else:
+                raise ValueError(f"unrecognized entry {line.strip()!r}")
+            if filename not in added:
+                raise ValueError(f"file {filename!r} was never added")
+        except ValueError as exc:
+            raise ValueError(f"line {number}: {exc}") from None
+        yield IologEntry(timestamp, filename, action, offset, length)
+
+
+def validate_iolog(path: typing.Union[str, Path]) -> int:
+    """Check every line of the iolog at path, returning its version."""
+    with open(path) as stream:
+        version = read_header(stream)
+        for _ in iter_entries(stream, version):
+            pass
+    return version
+
+
+def filter_entries(
+    entries: typing.Iterable[IologEntry], trace_filter: TraceFilter
+) -> typing.Iterator[IologEntry]:
+    """entries narrowed down by trace_filter. Timestamps are made relative
+    to the start of the window and divided by the speedup; file actions
+    outside the window move to its edges. Reading stops at the first IO
+    past the window's end."""
+    start = int(fio_seconds(trace_filter.start) * 1e9)
+    end = None
+    if trace_filter.end is not None:
+        end = int(fio_seconds(trace_filter.end) * 1e9)
+    speedup = trace_filter.speedup or 1.0
+    actions = set(map(str, trace_filter.actions or _IO_ACTIONS | {_WAIT}))
+    files = set(trace_filter.files or [])
+    for entry in entries:
+        if files and entry.filename not in files:
+            continue
+        timestamp = entry.timestamp
+        if timestamp is not None:
+            if entry.offset is not None and timestamp < start:
+                continue
+            if end is not None and timestamp >= end:
+                if entry.offset is not None:
+                    return
+                timestamp = end
+            timestamp = int(max(timestamp - start, 0) / speedup)
+        if entry.offset is not None and entry.action not in actions:
+            continue
+        yield entry._replace(timestamp=timestamp)
+
+
+def preprocess_iolog(
+    source: typing.Union[str, Path],
+    destination: typing.Union[str, Path],
+    trace_filter: TraceFilter,
+) -> int:
+    """Write the iolog at source, checked and narrowed down by
+    trace_filter, to destination one line at a time. Returns the number of
+    IOs written."""
+    ios = 0
+    with open(source) as stream, open(destination, "w") as out:
+        version = read_header(stream)
+        if version == 2 and trace_filter.timed():
+            raise ValueError(
+                f"{source} is a version 2 iolog, which has no timestamps to "
+                "slice or speed up"
+            )
+        out.write(f"fio version {version} iolog\n")
+        for entry in filter_entries(
+            iter_entries(stream, version), trace_filter
+        ):
+            out.write(entry.format())
+            if entry.offset is not None and entry.action != _WAIT:
+                ios += 1
+    return ios
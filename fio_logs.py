@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import typing
+from array import array
+from pathlib import Path
+
+from fio_schema import TimeSeries
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class LogColumns:
+    """Columns of one fio bandwidth, IOPS or latency log as packed integer
+    arrays: time in milliseconds, value, data direction (0 read, 1 write,
+    2 trim) and block size in bytes."""
+
+    __slots__ = ("time_ms", "value", "direction", "block_size")
+
+    def __init__(self):
+        self.time_ms = array("q")
+        self.value = array("q")
+        self.direction = array("b")
+        self.block_size = array("q")
+
+    def __len__(self) -> int:
+        return len(self.time_ms)
+
+    def append(self, time_ms: int, value: int, direction: int, bs: int):
+        self.time_ms.append(time_ms)
+        self.value.append(value)
+        self.direction.append(direction)
+        self.block_size.append(bs)
+
+    def to_time_series(self) -> TimeSeries:
+        return TimeSeries(
+            time_ms=self.time_ms.tolist(),
+            value=self.value.tolist(),
+            direction=self.direction.tolist(),
+            block_size=self.block_size.tolist(),
+        )
+
+
+class _Downsampler:
+    # averages the samples of each direction over fixed windows of time;
+    # fio writes each log in time order so only the open window is kept
+    def __init__(self, columns: LogColumns, window_msec: int):
+        self._columns = columns
+        self._window = window_msec
+        self._start = None
+        self._open: typing.Dict[int, typing.List[int]] = {}
+
+    def add(self, time_ms: int, value: int, direction: int, bs: int):
+        start = time_ms - time_ms % self._window
+        if start != self._start:
+            self.flush()
+            self._start = start
+        bucket = self._open.get(direction)
+        if bucket is None:
+            self._open[direction] = [value, 1, bs]
+            return
+        bucket[0] += value
+        bucket[1] += 1
+        if bucket[2] != bs:
+            # mixed block sizes within the window
+            bucket[2] = 0
+
+    def flush(self):
+        for direction in sorted(self._open):
+            total, count, bs = self._open[direction]
+            self._columns.append(
+                self._start, round(total / count), direction, bs
+            )
+        self._open = {}
+
+
+def _lines(path: Path, chunk_size: int) -> typing.Iterator[bytes]:
+    with open(path, "rb") as log:
+        rest = b""
+        while True:
+            chunk = log.read(chunk_size)
+            if not chunk:
+                break
+            lines = (rest + chunk).split(b"\n")
+            rest = lines.pop()
+            yield from lines
+        if rest:
+            yield rest
+
+
+def parse_log(
+    path: Path,
+    downsample_msec: typing.Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> LogColumns:
+    """Parse a fio *_bw, *_iops, *_lat, *_clat or *_slat log into columns,
+    reading it in chunks so that only the columns stay in memory. With
+    downsample_msec, samples are averaged per direction over windows of
+    that many milliseconds while reading."""
+    columns = LogColumns()
+    add = columns.append
+    downsampler = None
+    if downsample_msec:
+        downsampler = _Downsampler(columns, downsample_msec)
+        add = downsampler.add
+    for number, line in enumerate(_lines(Path(path), chunk_size), 1):
+        if not line.strip():
+            continue
+        fields = line.split(b",")
+        if len(fields) < 4:
+            raise ValueError(
+                "{}:{}: expected at least 4 columns".format(path, number)
+            )
+        add(int(fields[0]), int(fields[1]), int(fields[2]), int(fields[3]))
+    if downsampler is not None:
+        downsampler.flush()
+    return columns
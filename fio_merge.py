@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+import math
+import typing
+from dataclasses import replace
+
+from fio_histogram import LatencyHistogram
+from fio_schema import AioOutput, IoLatency, JobResult, SyncIoOutput
+
+
+def merge_latency(latencies: typing.Sequence[IoLatency]) -> IoLatency:
+    """Combine latency statistics of independent samples exactly: counts
+    and extremes directly, mean and stddev by pooling, and the distribution
+    by summing the json+ bins. Percentiles are recomputed from the merged
+    bins at the same points fio reported, never averaged."""
+    sampled = [latency for latency in latencies if latency.N]
+    if not sampled:
+        return replace(latencies[0])
+    n = sum(latency.N for latency in sampled)
+    mean = sum(latency.N * latency.mean for latency in sampled) / n
+    squares = sum(
+        (latency.N - 1) * latency.stddev**2
+        + latency.N * (latency.mean - mean) ** 2
+        for latency in sampled
+    )
+    bins = None
+    percentile = None
+    if all(latency.bins for latency in sampled):
+        histogram = LatencyHistogram.merged(
+            latency.histogram() for latency in sampled
+        )
+        bins = histogram.to_bins()
+        if sampled[0].percentile:
+            percentile = histogram.percentile_map(
+                float(p) for p in sampled[0].percentile
+            )
+    return IoLatency(
+        min_=min(latency.min_ for latency in sampled),
+        max_=max(latency.max_ for latency in sampled),
+        mean=mean,
+        stddev=math.sqrt(squares / (n - 1)) if n > 1 else 0.0,
+        N=n,
+        percentile=percentile,
+        bins=bins,
+    )
+
+
+def _pooled_dev(devs: typing.Iterable[float]) -> float:
+    # concurrent, independent streams: variances of a sum add up
+    return math.sqrt(sum(dev**2 for dev in devs))
+
+
+def merge_aio(outputs: typing.Sequence[AioOutput]) -> AioOutput:
+    """Aggregate one IO direction of concurrently running jobs, i.e. the
+    throughput the jobs achieved together."""
+    return AioOutput(
+        io_bytes=sum(o.io_bytes for o in outputs),
+        io_kbytes=sum(o.io_kbytes for o in outputs),
+        bw_bytes=sum(o.bw_bytes for o in outputs),
+        bw=sum(o.bw for o in outputs),
+        iops=sum(o.iops for o in outputs),
+        runtime=max(o.runtime for o in outputs),
+        total_ios=sum(o.total_ios for o in outputs),
+        short_ios=sum(o.short_ios for o in outputs),
+        drop_ios=sum(o.drop_ios for o in outputs),
+        slat_ns=merge_latency([o.slat_ns for o in outputs]),
+        clat_ns=merge_latency([o.clat_ns for o in outputs]),
+        lat_ns=merge_latency([o.lat_ns for o in outputs]),
+        bw_min=sum(o.bw_min for o in outputs),
+        bw_max=sum(o.bw_max for o in outputs),
+        bw_agg=sum(o.bw_agg for o in outputs) / len(outputs),
+        bw_mean=sum(o.bw_mean for o in outputs),
+        bw_dev=_pooled_dev(o.bw_dev for o in outputs),
+        bw_samples=sum(o.bw_samples for o in outputs),
+        iops_min=sum(o.iops_min for o in outputs),
+        iops_max=sum(o.iops_max for o in outputs),
+        iops_mean=sum(o.iops_mean for o in outputs),
+        iops_stddev=_pooled_dev(o.iops_stddev for o in outputs),
+        iops_samples=sum(o.iops_samples for o in outputs),
+    )
+
+
+def _total_ios(job: JobResult) -> int:
+    return job.read.total_ios + job.write.total_ios + job.trim.total_ios
+
+
+def _weighted_distribution(
+    jobs: typing.Sequence[JobResult],
+    distribution: typing.Callable[
+        [JobResult], typing.Optional[typing.Dict[str, float]]
+    ],
+) -> typing.Optional[typing.Dict[str, float]]:
+    # the depth and latency distributions are percentages of each job's IOs
+    if any(distribution(job) is None for job in jobs):
+        return None
+    weights = [_total_ios(job) for job in jobs]
+    total = sum(weights)
+    if not total:
+        weights = [1] * len(jobs)
+        total = len(jobs)
+    merged: typing.Dict[str, float] = {}
+    for job, weight in zip(jobs, weights):
+        for key, share in distribution(job).items():
+            merged[key] = merged.get(key, 0.0) + share * weight / total
+    return merged
+
+
+def merge_job_results(jobs: typing.Sequence[JobResult]) -> JobResult:
+    """Merge the results of the same job run concurrently against several
+    targets into a single aggregate JobResult."""
+    first = jobs[0]
+    return replace(
+        first,
+        error=next((job.error for job in jobs if job.error), 0),
+        eta=max(job.eta for job in jobs),
+        elapsed=max(job.elapsed for job in jobs),
+        read=merge_aio([job.read for job in jobs]),
+        write=merge_aio([job.write for job in jobs]),
+        trim=merge_aio([job.trim for job in jobs]),
+        sync=SyncIoOutput(
+            total_ios=sum(job.sync.total_ios for job in jobs),
+            lat_ns=merge_latency([job.sync.lat_ns for job in jobs]),
+        ),
+        job_runtime=max(job.job_runtime for job in jobs),
+        usr_cpu=sum(job.usr_cpu for job in jobs),
+        sys_cpu=sum(job.sys_cpu for job in jobs),
+        ctx=sum(job.ctx for job in jobs),
+        majf=sum(job.majf for job in jobs),
+        minf=sum(job.minf for job in jobs),
+        iodepth_level=_weighted_distribution(
+            jobs, lambda job: job.iodepth_level
+        ),
+        iodepth_submit=_weighted_distribution(
+            jobs, lambda job: job.iodepth_submit
+        ),
+        iodepth_complete=_weighted_distribution(
+            jobs, lambda job: job.iodepth_complete
+        ),
+        latency_ns=_weighted_distribution(jobs, lambda job: job.latency_ns),
+        latency_us=_weighted_distribution(jobs, lambda job: job.latency_us),
+        latency_ms=_weighted_distribution(jobs, lambda job: job.latency_ms),
+        # each target reaches steady state on its own
+        steadystate=None,
+        # and runs on the CPUs of its own device
+        placement=None,
+        # the collected logs are time series of one target each
+        bw_log=None,
+        iops_log=None,
+        lat_log=None,
+        clat_log=None,
+        slat_log=None,
+    )
+
+
+def merge_outputs_by_job(
+    job_lists: typing.Sequence[typing.Sequence[JobResult]],
+) -> typing.List[JobResult]:
+    """Merge lists of job results position by position, one list per
+    target."""
+    return [merge_job_results(jobs) for jobs in zip(*job_lists)]
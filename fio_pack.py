@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import zlib
+import struct
+import typing
+import operator
+import itertools
+from array import array
+from pathlib import Path
+
+from fio_decode import DecodeMode, decode_output
+from fio_schema import FioSuccessOutput, fio_output_schema
+
+
+# an 8 byte magic, then a zlib stream of a 4 byte little-endian header
+# length, the JSON header and the packed arrays the header refers to
+MAGIC = b"FIOPACK\x01"
+
+_length = struct.Struct("<I")
+
+# maps of integer counts keyed by numbers fio writes as strings: the json+
+# bins by latency in nanoseconds, and the percentiles as %f
+_packed_maps = {
+    "bins": ("q", int, str),
+    "percentile": ("d", float, "{:f}".format),
+}
+
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: memoryview) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class _Packer:
+    def __init__(self):
+        self.blob = bytearray()
+
+    def _pack(self, kind: str, mapping: dict) -> typing.Optional[dict]:
+        typecode, parse, format_key = _packed_maps[kind]
+        try:
+            parsed = list(map(parse, mapping))
+            counts = array("q", mapping.values())
+        except (TypeError, ValueError, OverflowError):
+            return None
+        # only maps whose keys survive the round trip unchanged
+        if list(map(format_key, parsed)) != list(mapping):
+            return None
+        if typecode == "q":
+            # sorted latency keys compress far better as differences
+            parsed = map(operator.sub, parsed, [0] + parsed[:-1])
+        keys = array(typecode, parsed)
+        offset = len(self.blob)
+        self.blob += _to_little_endian(keys)
+        self.blob += _to_little_endian(counts)
+        return {"$packed": kind, "offset": offset, "length": len(keys)}
+
+    def walk(self, value):
+        if isinstance(value, dict):
+            result = {}
+            for key, item in value.items():
+                packed = None
+                if key in _packed_maps and isinstance(item, dict) and item:
+                    packed = self._pack(key, item)
+                result[key] = packed if packed is not None else self.walk(item)
+            return result
+        if isinstance(value, list):
+            return [self.walk(item) for item in value]
+        return value
+
+
+def dumps_output(output: FioSuccessOutput, level: int = 6) -> bytes:
+    """output in the packed format: the serialized object tree as JSON, with
+    the bins and percentile maps stored as packed integer and float arrays,
+    all zlib compressed."""
+    packer = _Packer()
+    header = json.dumps(
+        packer.walk(fio_output_schema.serialize(output)),
+        separators=(",", ":"),
+    ).encode()
+    payload = _length.pack(len(header)) + header + packer.blob
+    return MAGIC + zlib.compress(payload, level)
+
+
+def loads_output(
+    data: bytes, mode: DecodeMode = DecodeMode.fast
+) -> FioSuccessOutput:
+    """The FioSuccessOutput dumps_output packed into data."""
+    if not data.startswith(MAGIC):
+        raise ValueError("not a packed fio output")
+    payload = memoryview(zlib.decompress(memoryview(data)[len(MAGIC) :]))
+    (header_length,) = _length.unpack_from(payload)
+    blob = payload[_length.size + header_length :]
+
+    def unpack(entry: dict) -> dict:
+        typecode, _, format_key = _packed_maps[entry["$packed"]]
+        start, length = entry["offset"], entry["length"]
+        middle = start + 8 * length
+        keys = _from_little_endian(typecode, blob[start:middle])
+        counts = _from_little_endian("q", blob[middle : middle + 8 * length])
+        if typecode == "q":
+            keys = itertools.accumulate(keys)
+        return dict(zip(map(format_key, keys), counts.tolist()))
+
+    def hook(obj: dict):
+        if "$packed" in obj:
+            return unpack(obj)
+        return obj
+
+    header = json.loads(
+        bytes(payload[_length.size : _length.size + header_length]),
+        object_hook=hook,
+    )
+    return decode_output(header, mode)
+
+
+def dump_output(output: FioSuccessOutput, path: typing.Union[str, Path]):
+    Path(path).write_bytes(dumps_output(output))
+
+
+def load_output(path: typing.Union[str, Path]) -> FioSuccessOutput:
+    return loads_output(Path(path).read_bytes())
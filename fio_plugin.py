@@ -1,67 +1,1215 @@
 #!/usr/bin/env python3
 
+import os
 import sys
-import typing
+import re
+import glob
 import json
+import time
+import shutil
+import signal
+import typing
+import asyncio
+import platform
+import resource
+import tempfile
+import threading
+import contextlib
 import subprocess
-from traceback import format_exc
-from typing import Union
+from traceback import format_exc, format_exception
+from typing import Optional, Union
 from pathlib import Path
+from dataclasses import replace
+from concurrent.futures import ThreadPoolExecutor
 
 from arcaflow_plugin_sdk import plugin
 from fio_schema import (
     FioJob,
+    JobParams,
+    IoEngine,
+    Placement,
+    CpuPlacement,
+    DetailLevel,
     FioSuccessOutput,
     FioErrorOutput,
+    FioFanOutOutput,
+    FioRepeatedOutput,
+    FioClientOutput,
+    TargetOutput,
+    InterimSnapshot,
+    fio_bytes,
+    SloSearch,
+    SloSearchOutput,
+    FioSweep,
+    FioSweepOutput,
+    FioCompare,
+    FioCompareOutput,
+    Instrumentation,
     fio_output_schema,
+    snapshot_schema,
+)
+from fio_decode import iter_outputs, load_output
+from fio_merge import merge_outputs_by_job
+from fio_logs import parse_log
+from fio_search import search_rate
+from fio_sweep import run_sweep
+from fio_cache import OutputCache, cache_key
+from fio_pool import FilePool
+from fio_iolog import preprocess_iolog, validate_iolog
+from fio_device import (
+    block_device,
+    fingerprint,
+    node_cpus,
+    numa_node,
+    whole_disk,
+)
+from fio_detail import job_pruner
+from fio_stats import Repetitions, run_repetitions
+from fio_compare import compare_outputs
+from fio_client import hosts_file, split_client_output
+from fio_pack import dump_output
+from fio_instrument import (
+    PhaseTimer,
+    child_usage,
+    profiled,
+    wait_with_usage,
 )
+from fio_process import (
+    DEFAULT_TAIL_BYTES,
+    Deadline,
+    Supervised,
+    run_supervised,
+)
+
+
+# files of one run, inside its work directory
+_JOB_FILE = "fio-input-tmp.fio"
+_OUTPUT_FILE = "fio-plus.json"
+_LOG_PREFIX = "fio-input-tmp-log"
+_HOSTS_FILE = "fio-hosts"
+_TRACE_PREFIX = "fio-trace"
+
+# what follows a job's name in the names of the data files fio lays out
+_DATA_FILE_SUFFIX = re.compile(r"\.\d+\.\d+")
+
+# seconds a cancelled fio gets to stop on SIGTERM before it is killed
+_TERMINATE_GRACE_SECONDS = 10
+
+# seconds fio gets to write its results after the SIGINT at a run's
+# deadline before it is killed
+_INTERRUPT_GRACE_SECONDS = 30
+
+# log files fio writes for each kind of FioJob.collect_logs
+_log_names = {
+    "bw": ("bw",),
+    "iops": ("iops",),
+    "lat": ("lat", "clat", "slat"),
+}
+
+
+def _kernel_version() -> typing.Tuple[int, int]:
+    match = re.match(r"(\d+)\.(\d+)", platform.release())
+    return (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+
+
+def _io_uring_unsupported(params: FioJob) -> Optional[str]:
+    """Reason the local fio or kernel cannot run the io_uring sections of
+    params, or None."""
+    sections = [
+        job_params
+        for _, job_params in params.job_sections()
+        if IoEngine(job_params.ioengine) == IoEngine.io_uring
+    ]
+    if not sections:
+        return None
+    if platform.system() != "Linux":
+        return "the io_uring IO engine is only available on Linux"
+    if _kernel_version() < (5, 1):
+        return (
+            f"the io_uring IO engine requires Linux 5.1 or later, this "
+            f"kernel is {platform.release()}"
+        )
+    if any(job_params.sqthread_poll for job_params in sections) and (
+        _kernel_version() < (5, 11) and os.geteuid() != 0
+    ):
+        return "sqthread_poll requires root before Linux 5.11"
+    try:
+        disabled = int(
+            Path("/proc/sys/kernel/io_uring_disabled").read_text()
+        )
+    except (OSError, ValueError):
+        disabled = 0
+    if disabled == 2:
+        return "io_uring is disabled by the kernel.io_uring_disabled sysctl"
+    if disabled == 1 and os.geteuid() != 0:
+        try:
+            group = int(Path("/proc/sys/kernel/io_uring_group").read_text())
+        except (OSError, ValueError):
+            group = -1
+        if group not in os.getgroups():
+            return (
+                "io_uring is restricted to privileged users by the "
+                "kernel.io_uring_disabled sysctl"
+            )
+    try:
+        enghelp = subprocess.run(
+            ["fio", "--enghelp=io_uring"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+    except FileNotFoundError:
+        # reported as a missing fio executable by the run itself
+        return None
+    if enghelp.returncode != 0 or "not loadable" in enghelp.stdout:
+        return "the installed fio was built without the io_uring IO engine"
+    return None
+
+
+def _with_logs(params: FioJob, prefix: str) -> FioJob:
+    if not params.collect_logs:
+        return params
+    kinds = {str(kind) for kind in params.collect_logs}
+    return params.map_sections(
+        lambda name, job_params: replace(
+            job_params,
+            **{f"write_{kind}_log": f"{prefix}-{name}" for kind in kinds},
+        ),
+    )
+
+
+def _attach_logs(params: FioJob, prefix: str, output: FioSuccessOutput):
+    if not params.collect_logs:
+        return
+    kinds = {str(kind) for kind in params.collect_logs}
+    # fio numbers the logs by thread across the whole job file, clones
+    # included, from 1 in the order the results appear
+    for index, job in enumerate(output.jobs, start=1):
+        for kind in kinds:
+            for log in _log_names[kind]:
+                path = Path(f"{prefix}-{job.jobname}_{log}.{index}.log")
+                if path.exists():
+                    columns = parse_log(path, params.log_downsample_msec)
+                    setattr(job, f"{log}_log", columns.to_time_series())
+
+
+def _anchor_paths(params: FioJob, base: Path) -> FioJob:
+    """params with relative filename, directory and iolog options made
+    absolute against base, since fio runs inside the work directory."""
+
+    def anchor(value: Optional[str]) -> Optional[str]:
+        if not value:
+            return value
+        # fio separates several files or directories with colons
+        return ":".join(
+            part if not part or os.path.isabs(part) else str(base / part)
+            for part in value.split(":")
+        )
+
+    global_options = params.global_options
+    if global_options:
+        global_options = dict(global_options)
+        for option in ("filename", "directory"):
+            if option in global_options:
+                global_options[option] = anchor(global_options[option])
+    return replace(
+        params.map_sections(
+            lambda name, job_params: replace(
+                job_params,
+                filename=anchor(job_params.filename),
+                directory=anchor(job_params.directory),
+                read_iolog=anchor(job_params.read_iolog),
+                replay_redirect=anchor(job_params.replay_redirect),
+            ),
+        ),
+        global_options=global_options,
+    )
+
+
+def _section_targets(
+    params: FioJob, job_params: JobParams
+) -> typing.List[str]:
+    """Files or directories a job section does its IO in. The section's own
+    options come before the global ones, as in fio."""
+    if job_params.replay_redirect:
+        return [job_params.replay_redirect]
+    global_options = params.global_options or {}
+    for filename in (job_params.filename, global_options.get("filename")):
+        if filename:
+            # fio separates several files of one job with colons
+            return filename.split(":")
+    return [
+        job_params.directory
+        or global_options.get("directory")
+        or params.work_dir
+        or tempfile.gettempdir()
+    ]
+
+
+def _placements(params: FioJob) -> typing.Dict[str, CpuPlacement]:
+    """CPU placement of each job section that has one, by section name, with
+    device_local placement resolved against the section's first target."""
+    placements = {}
+    for name, job_params in params.job_sections():
+        placement = CpuPlacement(
+            cpus_allowed=job_params.cpus_allowed,
+            cpus_allowed_policy=job_params.cpus_allowed_policy,
+            numa_cpu_nodes=job_params.numa_cpu_nodes,
+            numa_mem_policy=job_params.numa_mem_policy,
+        )
+        if (
+            params.placement == Placement.device_local
+            and not job_params.cpus_allowed
+            and not job_params.numa_cpu_nodes
+        ):
+            device = block_device(_section_targets(params, job_params)[0])
+            if device is not None:
+                placement.device = whole_disk(device).name
+                placement.numa_node = numa_node(device)
+            if placement.numa_node is not None:
+                placement.cpus_allowed = node_cpus(placement.numa_node)
+        if placement != CpuPlacement():
+            placements[name] = placement
+    return placements
+
+
+def _with_placements(
+    params: FioJob, placements: typing.Dict[str, CpuPlacement]
+) -> FioJob:
+    def place(name: str, job_params: JobParams) -> JobParams:
+        if name not in placements:
+            return job_params
+        return replace(job_params, cpus_allowed=placements[name].cpus_allowed)
+
+    return params.map_sections(place)
+
+
+def _attach_placements(params: FioJob, output: FioSuccessOutput):
+    placements = _placements(_anchor_paths(params, Path.cwd()))
+    for job in output.jobs:
+        job.placement = placements.get(job.jobname)
+
+
+def _job_file_params(params: FioJob) -> FioJob:
+    # the job as written to the job file
+    anchored = _anchor_paths(params, Path.cwd())
+    return _with_logs(
+        _with_placements(anchored, _placements(anchored)), _LOG_PREFIX
+    )
+
+
+def _pool_sizes(params: FioJob) -> typing.Dict[str, int]:
+    """Bytes of the data file of each job section the data pool serves, by
+    section name: those fio would lay out in the work directory."""
+    global_options = params.global_options or {}
+    if (
+        params.data_pool is None
+        or "filename" in global_options
+        or "directory" in global_options
+    ):
+        return {}
+    # a section's numjobs overrides this; anything but a plain 1 is taken
+    # to clone the section
+    global_numjobs = global_options.get("numjobs", "1").strip()
+    sizes = {}
+    for name, job_params in params.job_sections():
+        size = fio_bytes(job_params.size)
+        if (
+            size is None
+            or job_params.read_iolog
+            or job_params.filename
+            or job_params.directory
+            # clones would all share the one file
+            or str(job_params.numjobs or global_numjobs) != "1"
+        ):
+            continue
+        sizes[name] = size
+    return sizes
+
+
+@contextlib.contextmanager
+def _pooled(params: FioJob) -> typing.Iterator[FioJob]:
+    """params with the filename of every section the data pool serves set
+    to a data file leased from the pool until the context exits."""
+    sizes = _pool_sizes(params)
+    if not sizes:
+        yield params
+        return
+    pool = FilePool(params.data_pool)
+    files = {}
+    with contextlib.ExitStack() as leases:
+        for name, size in sizes.items():
+            path = leases.enter_context(pool.lease(size))
+            if path is not None:
+                files[name] = str(path.absolute())
+        yield params.map_sections(
+            lambda name, job_params: (
+                replace(job_params, filename=files[name])
+                if name in files
+                else job_params
+            )
+        )
+
+
+@contextlib.contextmanager
+def _work_dir(params: FioJob) -> typing.Iterator[Path]:
+    """A new directory for one fio run, removed afterwards unless
+    params.cleanup is off."""
+    if params.work_dir is not None:
+        Path(params.work_dir).mkdir(parents=True, exist_ok=True)
+    path = Path(tempfile.mkdtemp(prefix="fio-", dir=params.work_dir))
+    try:
+        yield path.absolute()
+    finally:
+        if params.cleanup:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _client_command(params: FioJob, work_dir: Path) -> typing.List[str]:
+    # paths in the job are resolved by the servers, so they are left as
+    # given
+    params.write_params_to_file(work_dir / _JOB_FILE)
+    (work_dir / _HOSTS_FILE).write_text(hosts_file(params.servers))
+    return [
+        "fio",
+        "--output-format=json+",
+        f"--output={_OUTPUT_FILE}",
+        f"--client={_HOSTS_FILE}",
+        _JOB_FILE,
+    ]
+
+
+def _with_traces(params: FioJob, work_dir: Path) -> FioJob:
+    """params with every iolog a section replays checked, or replaced by
+    its preprocessed copy in work_dir under params.trace_filter."""
+    copies: typing.Dict[str, str] = {}
+
+    def trace(name: str, job_params: JobParams) -> JobParams:
+        source = job_params.read_iolog
+        if not source:
+            return job_params
+        if source not in copies:
+            if params.trace_filter is None:
+                validate_iolog(source)
+                copies[source] = source
+            else:
+                copy = work_dir / f"{_TRACE_PREFIX}-{len(copies)}.iolog"
+                preprocess_iolog(source, copy, params.trace_filter)
+                copies[source] = str(copy)
+        return replace(job_params, read_iolog=copies[source])
+
+    return params.map_sections(trace)
+
+
+def _fio_command(params: FioJob, work_dir: Path) -> typing.List[str]:
+    # run with work_dir as the current directory
+    if params.servers:
+        return _client_command(params, work_dir)
+    _with_traces(_job_file_params(params), work_dir).write_params_to_file(
+        work_dir / _JOB_FILE
+    )
+    return [
+        "fio",
+        _JOB_FILE,
+        "--output-format=json+",
+        f"--output={_OUTPUT_FILE}",
+    ]
+
+
+def _load_result(
+    params: FioJob,
+    work_dir: Path,
+    timer: PhaseTimer,
+    usage: Optional[resource.struct_rusage] = None,
+) -> FioSuccessOutput:
+    with timer.phase("parse"):
+        output = load_output(
+            work_dir / _OUTPUT_FILE, prune=job_pruner(params), timer=timer
+        )
+    with timer.phase("attach"):
+        _attach_logs(params, str(work_dir / _LOG_PREFIX), output)
+        _attach_placements(params, output)
+    output.max_seconds = params.max_seconds()
+    _attach_instrumentation(params, output, timer, usage)
+    return output
+
+
+def _attach_instrumentation(
+    params: FioJob,
+    output: FioSuccessOutput,
+    timer: PhaseTimer,
+    usage: Optional[resource.struct_rusage],
+):
+    if params.instrumentation:
+        output.instrumentation = Instrumentation(
+            timer.timings(), child_usage(usage) if usage else None
+        )
+
+
+def _run_failure(
+    params: FioJob, work_dir: Path, timer: PhaseTimer, ended: Supervised
+) -> "FioRunError":
+    try:
+        # fio writes its results when interrupted, and often when a job
+        # fails
+        partial = _load_result(params, work_dir, timer, ended.usage)
+    except Exception:
+        partial = None
+    return FioRunError(
+        ended.describe("fio"),
+        partial,
+        exit_code=ended.returncode if ended.returncode >= 0 else None,
+        signal=ended.signal,
+        timed_out=ended.timed_out,
+        stderr=ended.stderr or None,
+    )
+
+
+def _run_fio(params: FioJob, work_dir: Path) -> FioSuccessOutput:
+    timer = PhaseTimer()
+    with timer.phase("render"):
+        cmd = _fio_command(params, work_dir)
+    with timer.phase("fio"):
+        ended = run_supervised(
+            cmd, work_dir, params.timeout, _INTERRUPT_GRACE_SECONDS
+        )
+    if ended.returncode != 0 or ended.timed_out:
+        raise _run_failure(params, work_dir, timer, ended)
+    return _load_result(params, work_dir, timer, ended.usage)
+
+
+def _in_thread(
+    function: typing.Callable[..., typing.Any], *args
+) -> asyncio.Future:
+    """Future of function(*args) called in a thread of its own. Unlike
+    asyncio.to_thread, a long call does not hold one of the few workers of
+    the loop's default executor, which would cap how many fio runs are in
+    flight."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(result, exc: Optional[BaseException]):
+        if future.done():
+            return
+        if exc is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exc)
+
+    def call():
+        try:
+            result, exc = function(*args), None
+        except BaseException as raised:
+            result, exc = None, raised
+        with contextlib.suppress(RuntimeError):
+            # the loop may be closed by the time a stray call returns
+            loop.call_soon_threadsafe(settle, result, exc)
+
+    threading.Thread(target=call, daemon=True).start()
+    return future
+
+
+async def _terminate(started: asyncio.Future, running: asyncio.Future):
+    """Stop the fio that running supervises with SIGTERM, which lets it end
+    its jobs and remove its files, and kill it if it is still running after
+    a grace period."""
+    await asyncio.wait(
+        {started, running}, return_when=asyncio.FIRST_COMPLETED
+    )
+    # os.kill rather than Popen.send_signal, whose poll could reap fio
+    # ahead of the wait4 that collects its usage
+    for signum in (signal.SIGTERM, signal.SIGKILL):
+        if running.done():
+            break
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(started.result(), signum)
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                asyncio.shield(running), _TERMINATE_GRACE_SECONDS
+            )
+    with contextlib.suppress(Exception):
+        await running
+
+
+async def _run_fio_async(params: FioJob, work_dir: Path) -> FioSuccessOutput:
+    # the phases awaited here are timed on the event loop's thread, which
+    # other coroutines share
+    timer = PhaseTimer()
+    with timer.phase("render"):
+        # preprocessing an iolog can take a while
+        cmd = await asyncio.to_thread(_fio_command, params, work_dir)
+    loop = asyncio.get_running_loop()
+    started = loop.create_future()
+
+    def on_start(pid: int):
+        loop.call_soon_threadsafe(started.set_result, pid)
+
+    with timer.phase("fio"):
+        # supervised from a thread so fio is reaped with wait4 and its
+        # usage kept, which the loop's child watcher would discard
+        running = _in_thread(
+            run_supervised,
+            cmd,
+            work_dir,
+            params.timeout,
+            _INTERRUPT_GRACE_SECONDS,
+            DEFAULT_TAIL_BYTES,
+            on_start,
+        )
+        try:
+            ended = await asyncio.shield(running)
+        except asyncio.CancelledError:
+            await _terminate(started, running)
+            raise
+    # decoding the output and attaching logs would hold up the loop's other
+    # coroutines
+    if ended.returncode != 0 or ended.timed_out:
+        raise await asyncio.to_thread(
+            _run_failure, params, work_dir, timer, ended
+        )
+    return await asyncio.to_thread(
+        _load_result, params, work_dir, timer, ended.usage
+    )
+
+
+class FioRunError(Exception):
+    def __init__(
+        self,
+        message: str,
+        partial_output: Optional[FioSuccessOutput],
+        exit_code: Optional[int] = None,
+        signal: Optional[str] = None,
+        timed_out: Optional[bool] = None,
+        stderr: Optional[str] = None,
+    ):
+        super().__init__(message)
+        self.partial_output = partial_output
+        self.exit_code = exit_code
+        self.signal = signal
+        self.timed_out = timed_out
+        self.stderr = stderr
+
+    @classmethod
+    def from_output(
+        cls,
+        message: str,
+        error: FioErrorOutput,
+        partial_output: Optional[FioSuccessOutput],
+    ) -> "FioRunError":
+        """The failed run error reports, explained by message."""
+        return cls(
+            f"{message}:\n{error.error}",
+            partial_output,
+            exit_code=error.exit_code,
+            signal=error.signal,
+            timed_out=error.timed_out,
+            stderr=error.stderr,
+        )
+
+
+def _run_fio_streaming(
+    params: FioJob,
+    work_dir: Path,
+    on_snapshot: typing.Callable[[InterimSnapshot], None],
+) -> FioSuccessOutput:
+    timer = PhaseTimer()
+    with timer.phase("render"):
+        _with_traces(_job_file_params(params), work_dir).write_params_to_file(
+            work_dir / _JOB_FILE
+        )
+    cmd = [
+        "fio",
+        _JOB_FILE,
+        "--output-format=json+",
+        f"--status-interval={params.status_interval or 1}",
+    ]
+    last: Optional[FioSuccessOutput] = None
+    parse_error = None
+    usage = None
+    # the reports are read as fio writes them, so parsing is part of the fio
+    # phase here
+    with timer.phase("fio"), subprocess.Popen(
+        cmd, cwd=work_dir, stdout=subprocess.PIPE
+    ) as proc:
+        deadline = Deadline(proc.pid, params.timeout, _INTERRUPT_GRACE_SECONDS)
+        deadline.start()
+        try:
+            for output in iter_outputs(
+                proc.stdout, prune=job_pruner(params), timer=timer
+            ):
+                last = output
+                on_snapshot(InterimSnapshot(int(time.time() * 1000), output))
+            usage = wait_with_usage(proc)
+        except ValueError:
+            # a report cut short by a killed fio, or garbage on stdout
+            parse_error = format_exc()
+            proc.kill()
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            deadline.finish()
+    if proc.returncode != 0 or deadline.expired:
+        ended = Supervised(proc.returncode, deadline.expired, "", "", usage)
+        raise FioRunError(
+            ended.describe("fio")
+            + (f"\n{parse_error}" if parse_error else ""),
+            last,
+            exit_code=proc.returncode if proc.returncode >= 0 else None,
+            signal=ended.signal,
+            timed_out=deadline.expired,
+        )
+    if parse_error or last is None:
+        raise FioRunError(parse_error or "fio produced no report", last)
+    with timer.phase("attach"):
+        _attach_logs(params, str(work_dir / _LOG_PREFIX), last)
+        _attach_placements(params, last)
+    last.max_seconds = params.max_seconds()
+    _attach_instrumentation(params, last, timer, usage)
+    return last
+
+
+def _snapshot_appender(
+    snapshot_file: Optional[str],
+) -> typing.Callable[[InterimSnapshot], None]:
+    def append(snapshot: InterimSnapshot):
+        if snapshot_file is None:
+            return
+        with open(snapshot_file, "a") as out:
+            out.write(json.dumps(snapshot_schema.serialize(snapshot)) + "\n")
+
+    return append
+
+
+def _cleanup_target(params: FioJob, job: FioJob, target: str):
+    # a target given as filename is the user's file or device
+    if params.cleanup and str(params.target_option) == "directory":
+        for name, _ in job.job_sections():
+            # fio names the files of each clone name.<job>.<file>
+            for path in Path(target).glob(glob.escape(name) + ".*.*"):
+                if _DATA_FILE_SUFFIX.fullmatch(path.name[len(name) :]):
+                    path.unlink(missing_ok=True)
+
+
+def _error_output(exc: BaseException) -> FioErrorOutput:
+    if isinstance(exc, FileNotFoundError) and exc.filename == "fio":
+        return FioErrorOutput(
+            "missing fio executable, please install fio package"
+        )
+    if isinstance(exc, FioRunError):
+        return FioErrorOutput(
+            str(exc),
+            exc.partial_output,
+            exit_code=exc.exit_code,
+            signal=exc.signal,
+            timed_out=exc.timed_out,
+            stderr=exc.stderr,
+        )
+    return FioErrorOutput(
+        "".join(format_exception(type(exc), exc, exc.__traceback__))
+    )
+
+
+def _target_job(
+    params: FioJob, target: str, cpus_allowed: Optional[str]
+) -> FioJob:
+    option = str(params.target_option)
+    global_options = dict(params.global_options or {})
+    if cpus_allowed is not None:
+        global_options["cpus_allowed"] = cpus_allowed
+    return replace(
+        params.map_sections(
+            lambda name, job_params: replace(job_params, **{option: target}),
+        ),
+        global_options=global_options or None,
+        targets=None,
+    )
+
+
+def _run_target(
+    params: FioJob, target: str, cpus_allowed: Optional[str]
+) -> TargetOutput:
+    job = _target_job(params, target, cpus_allowed)
+    try:
+        with _work_dir(params) as work_dir:
+            output = _run_fio(job, work_dir)
+        return TargetOutput(target, output, cpus_allowed)
+    finally:
+        _cleanup_target(params, job, target)
+
+
+async def _run_target_async(
+    params: FioJob, target: str, cpus_allowed: Optional[str]
+) -> TargetOutput:
+    job = _target_job(params, target, cpus_allowed)
+    try:
+        with _work_dir(params) as work_dir:
+            output = await _run_fio_async(job, work_dir)
+        return TargetOutput(target, output, cpus_allowed)
+    finally:
+        _cleanup_target(params, job, target)
+
+
+def _target_cpus(params: FioJob) -> typing.List[Optional[str]]:
+    cpus = sorted(os.sched_getaffinity(0)) if params.pin_cpus else []
+    return [
+        str(cpus[index % len(cpus)]) if cpus else None
+        for index in range(len(params.targets))
+    ]
+
+
+def _run_fanout(
+    params: FioJob,
+) -> typing.Tuple[str, Union[FioFanOutOutput, FioErrorOutput]]:
+    workers = params.max_workers or len(params.targets)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_target, params, target, cpus_allowed)
+            for target, cpus_allowed in zip(
+                params.targets, _target_cpus(params)
+            )
+        ]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as exc:
+            results.append(exc)
+    return _fanout_output(params, results)
+
+
+async def _run_fanout_async(
+    params: FioJob,
+) -> typing.Tuple[str, Union[FioFanOutOutput, FioErrorOutput]]:
+    workers = asyncio.Semaphore(params.max_workers or len(params.targets))
+
+    async def run_target(target: str, cpus_allowed: Optional[str]):
+        async with workers:
+            return await _run_target_async(params, target, cpus_allowed)
+
+    results = await asyncio.gather(
+        *(
+            run_target(target, cpus_allowed)
+            for target, cpus_allowed in zip(
+                params.targets, _target_cpus(params)
+            )
+        ),
+        return_exceptions=True,
+    )
+    return _fanout_output(params, results)
+
+
+def _fanout_output(
+    params: FioJob,
+    results: typing.List[Union[TargetOutput, BaseException]],
+) -> typing.Tuple[str, Union[FioFanOutOutput, FioErrorOutput]]:
+    outputs = []
+    errors = []
+    for target, result in zip(params.targets, results):
+        if isinstance(result, BaseException):
+            errors.append(f"target {target}: {_error_output(result).error}")
+        else:
+            outputs.append(result)
+    if errors:
+        return "error", FioErrorOutput(
+            "\n".join(errors), partial_targets=outputs or None
+        )
+    return "fanout", FioFanOutOutput(
+        targets=outputs,
+        aggregate=merge_outputs_by_job(
+            [target.output.jobs for target in outputs]
+        ),
+    )
+
+
+def _run_single(
+    params: FioJob,
+) -> typing.Tuple[str, Union[FioSuccessOutput, FioErrorOutput]]:
+    try:
+        with _pooled(params) as job, _work_dir(params) as work_dir:
+            return "success", _run_fio(job, work_dir)
+
+    except Exception as exc:
+        return "error", _error_output(exc)
+
+
+async def _run_single_async(
+    params: FioJob,
+) -> typing.Tuple[str, Union[FioSuccessOutput, FioErrorOutput]]:
+    try:
+        with contextlib.ExitStack() as stack:
+            # laying out a data file can take a while
+            job = await asyncio.to_thread(
+                stack.enter_context, _pooled(params)
+            )
+            work_dir = stack.enter_context(_work_dir(params))
+            return "success", await _run_fio_async(job, work_dir)
+
+    except Exception as exc:
+        return "error", _error_output(exc)
+
+
+def _fio_version() -> str:
+    return subprocess.run(
+        ["fio", "--version"],
+        stdout=subprocess.PIPE,
+        check=True,
+        text=True,
+    ).stdout.strip()
+
+
+def _cache_key(params: FioJob) -> str:
+    # with the plugin's options that shape the output but not the job file
+    job_file = _job_file_params(params).render() + (
+        f"; log_downsample_msec={params.log_downsample_msec}\n"
+        f"; detail={params.detail}\n"
+        f"; trace_filter={params.trace_filter}\n"
+    )
+    pooled = _pool_sizes(params)
+    if pooled:
+        # the pool's files are on its own device
+        job_file += f"; data_pool_fill={params.data_pool.fill}\n"
+        pool_directory = Path(params.data_pool.directory).absolute()
+        pool_directory.mkdir(parents=True, exist_ok=True)
+    targets = []
+    # the iologs are too large to hash on every lookup
+    traces = set()
+    anchored = _anchor_paths(params, Path.cwd())
+    for name, job_params in anchored.job_sections():
+        if name in pooled:
+            targets.append(str(pool_directory))
+        else:
+            targets.extend(_section_targets(anchored, job_params))
+        if job_params.read_iolog:
+            traces.add(job_params.read_iolog)
+    fingerprints = [fingerprint(target) for target in targets]
+    for trace in sorted(traces):
+        st = os.stat(trace)
+        fingerprints.append(f"{trace} {st.st_size} {st.st_mtime_ns}")
+    return cache_key(job_file, _fio_version(), "\n".join(fingerprints))
+
+
+def _cache_lookup(
+    params: FioJob,
+) -> typing.Tuple[
+    Optional[OutputCache], Optional[str], Optional[FioSuccessOutput]
+]:
+    """The cache and key of params and the cached output, if any. The cache
+    is None if params has none or no key can be made."""
+    if params.cache is None:
+        return None, None, None
+    try:
+        key = _cache_key(params)
+    except (OSError, subprocess.CalledProcessError):
+        # without a fio version there is no key; the run reports why
+        return None, None, None
+    cache = OutputCache(params.cache)
+    if params.cache.bypass:
+        return cache, key, None
+    return cache, key, cache.get(key)
+
+
+def _with_cache(
+    params: FioJob,
+    execute: typing.Callable[
+        [], typing.Tuple[str, Union[FioSuccessOutput, FioErrorOutput]]
+    ],
+) -> typing.Tuple[str, Union[FioSuccessOutput, FioErrorOutput]]:
+    cache, key, cached = _cache_lookup(params)
+    if cached is not None:
+        return "success", cached
+    output_id, output = execute()
+    if cache is not None and output_id == "success":
+        # the instrumentation belongs to this run, not to later hits
+        cache.put(key, replace(output, instrumentation=None))
+    return output_id, output
 
 
 @plugin.step(
     id="workload",
     name="fio workload",
     description="run an fio workload",
-    outputs={"success": FioSuccessOutput, "error": FioErrorOutput},
+    outputs={
+        "success": FioSuccessOutput,
+        "fanout": FioFanOutOutput,
+        "repeated": FioRepeatedOutput,
+        "clients": FioClientOutput,
+        "error": FioErrorOutput,
+    },
 )
 def run(
     params: FioJob,
+) -> typing.Tuple[
+    str,
+    Union[
+        FioSuccessOutput,
+        FioFanOutOutput,
+        FioRepeatedOutput,
+        FioClientOutput,
+        FioErrorOutput,
+    ],
+]:
+    with profiled(params.profile_file):
+        return _run(params)
+
+
+def _run(
+    params: FioJob,
+) -> typing.Tuple[
+    str,
+    Union[
+        FioSuccessOutput,
+        FioFanOutOutput,
+        FioRepeatedOutput,
+        FioClientOutput,
+        FioErrorOutput,
+    ],
+]:
+    if params.servers:
+        # the servers' kernels decide whether io_uring is available
+        return _client_output(*_run_single(params))
+    unsupported = _io_uring_unsupported(params)
+    if unsupported:
+        return "error", FioErrorOutput(unsupported)
+    if params.targets:
+        return _run_fanout(params)
+    if params.repetitions:
+        return _run_repeated(params)
+    return _packed(params, *_with_cache(params, lambda: _run_once(params)))
+
+
+def _packed(
+    params: FioJob,
+    output_id: str,
+    output: Union[FioSuccessOutput, FioErrorOutput],
+) -> typing.Tuple[str, Union[FioSuccessOutput, FioErrorOutput]]:
+    if output_id == "success" and params.packed_file:
+        try:
+            dump_output(output, params.packed_file)
+        except Exception as exc:
+            return "error", _error_output(exc)
+    return output_id, output
+
+
+def _client_output(
+    output_id: str, output: Union[FioSuccessOutput, FioErrorOutput]
+) -> typing.Tuple[str, Union[FioClientOutput, FioErrorOutput]]:
+    if output_id != "success":
+        return output_id, output
+    return "clients", split_client_output(output)
+
+
+def _run_once(
+    params: FioJob,
+) -> typing.Tuple[str, Union[FioSuccessOutput, FioErrorOutput]]:
+    if params.status_interval:
+        return run_streaming(params, _snapshot_appender(params.snapshot_file))
+    return _run_single(params)
+
+
+def _run_repeated(
+    params: FioJob,
+) -> typing.Tuple[str, Union[FioRepeatedOutput, FioErrorOutput]]:
+    runs = 0
+
+    def execute() -> FioSuccessOutput:
+        nonlocal runs
+        runs += 1
+        output_id, output = _run_once(params)
+        if output_id != "success":
+            raise FioRunError.from_output(
+                f"run {runs} of the repetitions failed",
+                output,
+                output.partial_output,
+            )
+        return output
+
+    try:
+        return "repeated", run_repetitions(params.repetitions, execute)
+    except Exception as exc:
+        return "error", _error_output(exc)
+
+
+def run_streaming(
+    params: FioJob,
+    on_snapshot: typing.Callable[[InterimSnapshot], None],
 ) -> typing.Tuple[str, Union[FioSuccessOutput, FioErrorOutput]]:
+    """Run the workload with fio's --status-interval, handing every interim
+    report to on_snapshot as it arrives. The final report is the success
+    output; if fio fails, the error output carries the last report."""
     try:
-        outfile_temp_path = Path("fio-plus.json")
-        infile_temp_path = Path("fio-input-tmp.fio")
-        params.write_params_to_file(infile_temp_path)
-        cmd = [
-            "fio",
-            f"{infile_temp_path}",
-            "--output-format=json+",
-            f"--output={outfile_temp_path}",
-        ]
-        subprocess.check_output(cmd)
-        output: FioSuccessOutput = fio_output_schema.unserialize(
-            json.loads(outfile_temp_path.read_text())
+        with _pooled(params) as job, _work_dir(params) as work_dir:
+            return "success", _run_fio_streaming(job, work_dir, on_snapshot)
+
+    except Exception as exc:
+        return "error", _error_output(exc)
+
+
+async def run_async(
+    params: FioJob,
+) -> typing.Tuple[
+    str,
+    Union[
+        FioSuccessOutput,
+        FioFanOutOutput,
+        FioRepeatedOutput,
+        FioClientOutput,
+        FioErrorOutput,
+    ],
+]:
+    """Coroutine counterpart of run, for driving many workloads from one
+    event loop. Every fio runs in its own work directory. Cancelling the
+    coroutine terminates fio and removes its work directory. Interim
+    reports are only streamed by run, status_interval is ignored here."""
+    if params.servers:
+        return _client_output(*await _run_single_async(params))
+    unsupported = await asyncio.to_thread(_io_uring_unsupported, params)
+    if unsupported:
+        return "error", FioErrorOutput(unsupported)
+    if params.targets:
+        return await _run_fanout_async(params)
+    if params.repetitions:
+        repetitions = Repetitions(params.repetitions)
+        while True:
+            output_id, output = await _run_single_async(params)
+            if output_id != "success":
+                return output_id, output
+            repeated = repetitions.add(output)
+            if repeated is not None:
+                return "repeated", repeated
+    cache, key, cached = await asyncio.to_thread(_cache_lookup, params)
+    if cached is not None:
+        output_id, output = "success", cached
+    else:
+        output_id, output = await _run_single_async(params)
+        if cache is not None and output_id == "success":
+            await asyncio.to_thread(
+                cache.put, key, replace(output, instrumentation=None)
+            )
+    return await asyncio.to_thread(_packed, params, output_id, output)
+
+
+def _probe_job(job: FioJob, rate_iops: int, iodepth: int) -> FioJob:
+    return job.map_sections(
+        lambda name, job_params: replace(
+            job_params, rate_iops=rate_iops, iodepth=iodepth
+        ),
+    )
+
+
+@plugin.step(
+    id="slo_search",
+    name="fio SLO search",
+    description=(
+        "find the highest IOPS rate that keeps a completion latency "
+        "percentile within a target"
+    ),
+    outputs={"success": SloSearchOutput, "error": FioErrorOutput},
+)
+def slo_search(
+    params: SloSearch,
+) -> typing.Tuple[str, Union[SloSearchOutput, FioErrorOutput]]:
+    if params.job.targets:
+        return "error", FioErrorOutput(
+            "the SLO search probes a single target, targets is not supported"
+        )
+    if params.job.servers:
+        return "error", FioErrorOutput(
+            "the SLO search probes a single host, servers is not supported"
+        )
+    if params.job.repetitions:
+        return "error", FioErrorOutput(
+            "the SLO search makes its own runs, repetitions is not supported"
         )
+    if params.job.detail == DetailLevel.summary:
+        return "error", FioErrorOutput(
+            "the SLO search needs latency percentiles, which the summary "
+            "detail level leaves out"
+        )
+
+    def probe(rate_iops: int, iodepth: int) -> FioSuccessOutput:
+        output_id, output = run(_probe_job(params.job, rate_iops, iodepth))
+        if output_id != "success":
+            raise FioRunError.from_output(
+                f"probe at rate_iops={rate_iops} iodepth={iodepth} failed",
+                output,
+                None,
+            )
+        return output
 
-        return "success", output
+    try:
+        probes, best, converged = search_rate(params, probe)
+    except Exception as exc:
+        return "error", _error_output(exc)
+    best_params = None
+    if best is not None:
+        best_params = _probe_job(
+            params.job, best.rate_iops, best.iodepth
+        ).params
+    return "success", SloSearchOutput(probes, converged, best, best_params)
 
-    except FileNotFoundError as exc:
-        if exc.filename == "fio":
-            error_output: FioErrorOutput = FioErrorOutput(
-                "missing fio executable, please install fio package"
+
+@plugin.step(
+    id="sweep",
+    name="fio parameter sweep",
+    description=(
+        "run a job for every combination of a set of parameter values and "
+        "tabulate the results"
+    ),
+    outputs={"success": FioSweepOutput, "error": FioErrorOutput},
+)
+def sweep(
+    params: FioSweep,
+) -> typing.Tuple[str, Union[FioSweepOutput, FioErrorOutput]]:
+    if params.job.targets:
+        return "error", FioErrorOutput(
+            "a sweep runs against a single target, targets is not supported"
+        )
+    if params.job.servers:
+        return "error", FioErrorOutput(
+            "a sweep runs on a single host, servers is not supported"
+        )
+    if params.job.repetitions:
+        return "error", FioErrorOutput(
+            "a sweep runs every point once, repetitions is not supported"
+        )
+
+    def execute(job: FioJob) -> FioSuccessOutput:
+        output_id, output = run(job)
+        if output_id != "success":
+            raise FioRunError.from_output(
+                "sweep point failed, completed points are kept in the "
+                "checkpoint file",
+                output,
+                None,
             )
-        else:
-            error_output: FioErrorOutput = FioErrorOutput(format_exc())
-        return "error", error_output
+        return output
 
-    except Exception:
-        error_output: FioErrorOutput = FioErrorOutput(format_exc())
-        return "error", error_output
+    try:
+        return "success", run_sweep(params, execute)
+    except Exception as exc:
+        return "error", _error_output(exc)
 
-    finally:
-        if params.cleanup:
-            infile_temp_path.unlink(missing_ok=True)
-            outfile_temp_path.unlink(missing_ok=True)
-            Path(params.name + ".0.0").unlink(missing_ok=True)
+
+@plugin.step(
+    id="compare",
+    name="fio compare",
+    description=(
+        "compare a candidate result with a baseline result and flag "
+        "significant changes in throughput and latency"
+    ),
+    outputs={"success": FioCompareOutput, "error": FioErrorOutput},
+)
+def compare(
+    params: FioCompare,
+) -> typing.Tuple[str, Union[FioCompareOutput, FioErrorOutput]]:
+    try:
+        return "success", compare_outputs(params)
+    except ValueError as exc:
+        return "error", FioErrorOutput(str(exc))
 
 
 if __name__ == "__main__":
-    sys.exit(plugin.run(plugin.build_schema(run)))
+    sys.exit(
+        plugin.run(plugin.build_schema(run, slo_search, sweep, compare))
+    )
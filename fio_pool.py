@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import os
+import fcntl
+import typing
+import tempfile
+import contextlib
+from pathlib import Path
+
+from fio_schema import DataFilePool, PoolFill
+
+
+_LOCK_FILE = ".lock"
+_FILL_CHUNK = 1024 * 1024
+
+
+def _try_lock(path: Path) -> typing.Optional[int]:
+    # an exclusive flock on the data file is what marks it as leased
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except OSError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _lay_out(fd: int, size: int, fill: PoolFill):
+    os.ftruncate(fd, size)
+    if fill == PoolFill.sparse:
+        return
+    zeros = bytes(_FILL_CHUNK)
+    for offset in range(0, size, _FILL_CHUNK):
+        length = min(_FILL_CHUNK, size - offset)
+        chunk = memoryview(
+            os.urandom(length) if fill == PoolFill.random else zeros
+        )[:length]
+        while chunk:
+            written = os.pwrite(fd, chunk, offset)
+            chunk, offset = chunk[written:], offset + written
+    # so the writeback of the layout does not land in the measured run
+    os.fsync(fd)
+
+
+class FilePool:
+    """Directory of data files laid out ahead of the runs that use them,
+    named after their size and fill. A file is leased to one run at a time
+    through an exclusive flock on it; a lease refreshes the file's
+    modification time, which eviction uses for least-recently-used order.
+    Files are reused as the runs before left them."""
+
+    def __init__(self, options: DataFilePool):
+        self.options = options
+        self.directory = Path(options.directory)
+
+    @contextlib.contextmanager
+    def _locked(self) -> typing.Iterator[None]:
+        # serializes picking, creating and evicting files across processes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / _LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _entries(self) -> typing.List[typing.Tuple[float, int, Path]]:
+        entries = []
+        for path in self.directory.iterdir():
+            if path.suffix not in (".data", ".partial"):
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return sorted(entries)
+
+    def _remove_idle(self, path: Path) -> bool:
+        fd = _try_lock(path)
+        if fd is None:
+            return False
+        try:
+            path.unlink(missing_ok=True)
+        finally:
+            os.close(fd)
+        return True
+
+    def _make_room(self, size: int) -> bool:
+        max_bytes = self.options.max_bytes
+        if max_bytes is None:
+            return True
+        entries = self._entries()
+        total = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if total + size <= max_bytes:
+                break
+            if self._remove_idle(path):
+                total -= entry_size
+        return total + size <= max_bytes
+
+    def _claim(
+        self, size: int
+    ) -> typing.Optional[typing.Tuple[Path, int, bool]]:
+        """An idle file of size, locked, or a new partial one to lay out,
+        and whether it is new. None if a new file does not fit."""
+        prefix = f"{size}-{self.options.fill}-"
+        for _, entry_size, path in reversed(self._entries()):
+            if path.suffix == ".partial":
+                # left behind by a layout that did not finish
+                self._remove_idle(path)
+                continue
+            if not path.name.startswith(prefix):
+                continue
+            fd = _try_lock(path)
+            if fd is None:
+                continue
+            if self.options.invalidate or entry_size < size:
+                path.unlink(missing_ok=True)
+                os.close(fd)
+                continue
+            os.utime(path)
+            return path, fd, False
+        if not self._make_room(size):
+            return None
+        fd, temp = tempfile.mkstemp(
+            dir=self.directory, prefix=prefix, suffix=".partial"
+        )
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return Path(temp), fd, True
+
+    @contextlib.contextmanager
+    def lease(self, size: int) -> typing.Iterator[typing.Optional[Path]]:
+        """A data file of size bytes, held for the caller until the context
+        exits and laid out first if the pool has none idle. None if a new
+        file does not fit in max_bytes."""
+        with self._locked():
+            claimed = self._claim(size)
+        if claimed is None:
+            yield None
+            return
+        path, fd, new = claimed
+        try:
+            if new:
+                try:
+                    _lay_out(fd, size, self.options.fill)
+                    ready = path.with_suffix(".data")
+                    os.replace(path, ready)
+                    path = ready
+                except BaseException:
+                    path.unlink(missing_ok=True)
+                    raise
+            yield path
+        finally:
+            os.close(fd)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import os
+import signal
+import typing
+import resource
+import threading
+import subprocess
+
+from fio_instrument import wait_with_usage
+
+
+DEFAULT_TAIL_BYTES = 64 * 1024
+_CHUNK_SIZE = 64 * 1024
+
+
+class Tail:
+    """The last limit bytes of a stream."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._buffer = bytearray()
+        self.dropped = 0
+
+    def write(self, data: bytes):
+        self._buffer += data
+        excess = len(self._buffer) - self.limit
+        if excess > 0:
+            del self._buffer[:excess]
+            self.dropped += excess
+
+    def text(self) -> str:
+        text = self._buffer.decode(errors="replace")
+        if self.dropped:
+            return f"[{self.dropped} bytes dropped]\n{text}"
+        return text
+
+
+def _drain(pipe: typing.BinaryIO, tail: Tail):
+    for chunk in iter(lambda: pipe.read1(_CHUNK_SIZE), b""):
+        tail.write(chunk)
+
+
+class Deadline:
+    """Interrupts a process with SIGINT once timeout seconds have passed,
+    which makes fio stop its jobs and write its results, and kills it if it
+    is still running grace seconds later. finish must be called as soon as
+    the process has been reaped."""
+
+    def __init__(
+        self, pid: int, timeout: typing.Optional[float], grace: float
+    ):
+        self.pid = pid
+        self.timeout = timeout
+        self.grace = grace
+        self.expired = False
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def _signal(self, signum: int):
+        if self._finished.is_set():
+            return
+        try:
+            os.kill(self.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _watch(self):
+        if self._finished.wait(self.timeout):
+            return
+        self.expired = True
+        self._signal(signal.SIGINT)
+        if not self._finished.wait(self.grace):
+            self._signal(signal.SIGKILL)
+
+    def start(self):
+        if self.timeout is not None:
+            self._thread.start()
+
+    def finish(self):
+        self._finished.set()
+
+
+class Supervised:
+    """How a supervised process ended."""
+
+    def __init__(
+        self,
+        returncode: int,
+        timed_out: bool,
+        stdout: str,
+        stderr: str,
+        usage: typing.Optional[resource.struct_rusage],
+    ):
+        self.returncode = returncode
+        self.timed_out = timed_out
+        self.stdout = stdout
+        self.stderr = stderr
+        self.usage = usage
+
+    @property
+    def signal(self) -> typing.Optional[str]:
+        """Name of the signal that ended the process, if one did."""
+        if self.returncode >= 0:
+            return None
+        try:
+            return signal.Signals(-self.returncode).name
+        except ValueError:
+            return str(-self.returncode)
+
+    def describe(self, name: str) -> str:
+        if self.timed_out:
+            reason = f"{name} was interrupted at its deadline"
+            if self.signal == "SIGKILL":
+                reason += " and killed when it did not stop"
+            return reason
+        if self.signal:
+            return f"{name} was ended by {self.signal}"
+        return f"{name} exited with status {self.returncode}"
+
+
+def run_supervised(
+    cmd: typing.List[str],
+    cwd: typing.Union[str, os.PathLike],
+    timeout: typing.Optional[float],
+    grace: float,
+    tail_bytes: int = DEFAULT_TAIL_BYTES,
+    started: typing.Optional[typing.Callable[[int], None]] = None,
+) -> Supervised:
+    """Run cmd to completion, keeping only the last tail_bytes of its stdout
+    and stderr, under a Deadline of timeout seconds if not None. started, if
+    given, is called with the pid of the process once it is running."""
+    proc = subprocess.Popen(
+        cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    tails = (Tail(tail_bytes), Tail(tail_bytes))
+    drains = [
+        threading.Thread(target=_drain, args=(pipe, tail), daemon=True)
+        for pipe, tail in zip((proc.stdout, proc.stderr), tails)
+    ]
+    deadline = Deadline(proc.pid, timeout, grace)
+    try:
+        for drain in drains:
+            drain.start()
+        deadline.start()
+        if started is not None:
+            started(proc.pid)
+        try:
+            usage = wait_with_usage(proc)
+        finally:
+            deadline.finish()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        # processes fio forked may hold on to the pipes after a kill
+        for drain, pipe in zip(drains, (proc.stdout, proc.stderr)):
+            drain.join(grace)
+            if not drain.is_alive():
+                pipe.close()
+    return Supervised(
+        proc.returncode,
+        deadline.expired,
+        tails[0].text(),
+        tails[1].text(),
+        usage,
+    )
@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 
+import io
+import re
 import typing
 import enum
 import configparser
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, asdict, replace
 from typing import Optional, Annotated, Dict
 from pathlib import Path
 
 from arcaflow_plugin_sdk import plugin, validation
+from fio_histogram import LatencyHistogram
 
 
 class IoPattern(str, enum.Enum):
@@ -24,6 +27,10 @@ class IoPattern(str, enum.Enum):
     def __str__(self) -> str:
         return self.value
 
+    @property
+    def directions(self) -> typing.Tuple[str, ...]:
+        return _pattern_directions[self.value]
+
 
 class RateProcess(str, enum.Enum):
     linear = "linear"
@@ -41,19 +48,159 @@ class IoSubmitMode(str, enum.Enum):
         return self.value
 
 
+class TargetOption(str, enum.Enum):
+    filename = "filename"
+    directory = "directory"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class LogType(str, enum.Enum):
+    bw = "bw"
+    iops = "iops"
+    lat = "lat"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class CpusAllowedPolicy(str, enum.Enum):
+    shared = "shared"
+    split = "split"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class Placement(str, enum.Enum):
+    manual = "manual"
+    device_local = "device_local"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class PoolFill(str, enum.Enum):
+    sparse = "sparse"
+    zero = "zero"
+    random = "random"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class IologAction(str, enum.Enum):
+    read = "read"
+    write = "write"
+    trim = "trim"
+    sync = "sync"
+    datasync = "datasync"
+    wait = "wait"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class DetailLevel(str, enum.Enum):
+    summary = "summary"
+    percentiles = "percentiles"
+    full = "full"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+# IO directions each pattern exercises, kept outside IoPattern, where they
+# would become members of the enum
+_pattern_directions = {
+    "read": ("read",),
+    "randread": ("read",),
+    "write": ("write",),
+    "randwrite": ("write",),
+    "rw": ("read", "write"),
+    "readwrite": ("read", "write"),
+    "randrw": ("read", "write"),
+}
+
+
+class Verdict(str, enum.Enum):
+    regression = "regression"
+    improvement = "improvement"
+    unchanged = "unchanged"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+# fio time values: an integer with an optional unit, seconds by default
+_fio_time = re.compile(r"^\d+(us|ms|s|m|h|d)?$")
+_fio_time_units = {
+    "us": 1e-6,
+    "ms": 1e-3,
+    "s": 1.0,
+    "m": 60.0,
+    "h": 3600.0,
+    "d": 86400.0,
+}
+
+
+def fio_seconds(value: Optional[str]) -> float:
+    """Seconds in a fio time value, 0 for None."""
+    if value is None:
+        return 0.0
+    number = value.rstrip("usmhd")
+    return int(number) * _fio_time_units[value[len(number) :] or "s"]
+
+
+# fio sizes: an integer with an optional unit prefix, where fio's default
+# kb_base reads both k and KiB as 1024
+_fio_size = re.compile(r"^(\d+)([kmgtp]?)(i?b)?$", re.IGNORECASE)
+
+
+def fio_bytes(value: str) -> Optional[int]:
+    """Bytes in a fio size, rounded up to the larger reading of its unit,
+    None for a size fio takes relative to the file, like a percentage."""
+    match = _fio_size.match(value.strip())
+    if match is None:
+        return None
+    number, prefix, _ = match.groups()
+    return int(number) * 1024 ** " kmgtp".index(prefix.lower() or " ")
+
+
+# cpu and NUMA node lists, e.g. 0-3,8,10-11
+_cpu_list = r"\d+(-\d+)?(,\d+(-\d+)?)*"
+_numa_mem_policy = re.compile(
+    rf"^(default|local|prefer:\d+|bind:{_cpu_list}|interleave:{_cpu_list})$"
+)
+
+# kept outside IoEngine, where they would become members of the enum
+_sync_io_engines = {"sync", "psync"}
+_async_io_engines = {"libaio", "windowsaio", "io_uring", "null"}
+
+
 class IoEngine(str, enum.Enum):
-    _sync_io_engines = {"sync", "psync"}
-    _async_io_engines = {"libaio", "windowsaio"}
     sync = "sync"
     psync = "psync"
     libaio = "libaio"
     windowsaio = "windowsaio"
+    io_uring = "io_uring"
+    null = "null"
 
     def __str__(self) -> str:
         return self.value
 
     def is_sync(self) -> bool:
-        return self.value in self._sync_io_engines
+        return self.value in _sync_io_engines
+
+
+_io_uring_options = (
+    "sqthread_poll",
+    "hipri",
+    "fixedbufs",
+    "registerfiles",
+    "nonvectored",
+)
 
 
 @dataclass
@@ -116,14 +263,14 @@ class JobParams:
         },
     )
     readwrite: Optional[IoPattern] = field(
-        default=IoPattern.read.value,
+        default=IoPattern.read,
         metadata={
             "name": "Read/Write",
             "description": "type of IO pattern",
         },
     )
     rate_process: Optional[RateProcess] = field(
-        default=RateProcess.linear.value,
+        default=RateProcess.linear,
         metadata={
             "name": "Rate Process",
             "description": (
@@ -131,616 +278,2731 @@ class JobParams:
             ),
         },
     )
-
-
-@dataclass
-class FioJob:
-    name: Annotated[str, validation.min(1)] = field(
-        metadata={
-            "name": "Name",
-            "description": "The name of the fio job.",
-        }
-    )
-    params: JobParams = field(
-        metadata={
-            "name": "Fio Job Parameters",
-            "description": "Parameters to execute one fio job.",
-        }
-    )
-    cleanup: bool = field(
-        default=True,
+    filename: Optional[str] = field(
+        default=None,
         metadata={
-            "name": "Cleanup",
-            "description": "Cleanup temporary files created during execution.",
+            "name": "Filename",
+            "description": (
+                "File or block device the job does IO against, instead of a "
+                "file fio lays out in the working directory."
+            ),
         },
     )
-
-    def write_params_to_file(self, filepath: Path):
-        cfg = configparser.ConfigParser()
-        cfg[self.name] = {}
-        for key, value in asdict(self.params).items():
-            cfg[self.name][key] = str(value)
-        with open(filepath, "w") as temp:
-            cfg.write(
-                temp,
-                space_around_delimiters=False,
-            )
-
-
-@dataclass
-class IoLatency:
-    min_: int = field(
+    directory: Optional[str] = field(
+        default=None,
         metadata={
-            "id": "min",
-            "name": "IO Latency Min",
-            "description": "IO latency minimum",
-        }
+            "name": "Directory",
+            "description": "Directory in which fio lays out the job's files.",
+        },
     )
-    max_: int = field(
+    read_iolog: Optional[str] = field(
+        default=None,
         metadata={
-            "id": "max",
-            "name": "IO Latency Max",
-            "description": "IO latency maximum",
-        }
+            "name": "Read IO Log",
+            "description": (
+                "fio iolog, version 2 or 3, to replay instead of the "
+                "readwrite pattern. It is checked line by line before fio "
+                "starts."
+            ),
+        },
     )
-    mean: float = field(
+    replay_no_stall: typing.Annotated[
+        Optional[int],
+        validation.min(0),
+        validation.max(1),
+    ] = field(
+        default=None,
         metadata={
-            "name": "IO Latency Mean",
-            "description": "IO latency mean",
-        }
+            "name": "Replay Without Stalls",
+            "description": (
+                "Issue the replayed IOs as fast as possible instead of "
+                "honoring the timing in the iolog."
+            ),
+        },
     )
-    stddev: float = field(
+    replay_time_scale: typing.Annotated[
+        Optional[int], validation.min(1)
+    ] = field(
+        default=None,
         metadata={
-            "name": "IO Latency StdDev",
-            "description": "IO latency standard deviation",
-        }
+            "name": "Replay Time Scale",
+            "description": (
+                "Rate of the replay as a percentage of the iolog's, e.g. 200 "
+                "replays it twice as fast. 100 by default."
+            ),
+        },
     )
-    N: int = field(
+    replay_redirect: Optional[str] = field(
+        default=None,
         metadata={
-            "name": "IO Latency Sample Quantity",
-            "description": "quantity of IO latency samples collected",
-        }
+            "name": "Replay Redirect",
+            "description": (
+                "File or device to replay the IOs of every file in the "
+                "iolog against."
+            ),
+        },
     )
-    percentile: Optional[Dict[str, int]] = field(
+    sqthread_poll: typing.Annotated[
+        Optional[int],
+        validation.min(0),
+        validation.max(1),
+    ] = field(
         default=None,
         metadata={
-            "name": "IO Latency Cumulative Distribution",
-            "description": "Cumulative distribution of IO latency sample",
+            "name": "SQ Thread Poll",
+            "description": (
+                "Offload submission to a kernel thread that polls the "
+                "submission queue, saving the system call per submission. "
+                "io_uring only."
+            ),
         },
     )
-    bins: Optional[Dict[str, int]] = field(
+    hipri: typing.Annotated[
+        Optional[int],
+        validation.min(0),
+        validation.max(1),
+    ] = field(
         default=None,
         metadata={
-            "name": "Binned IO Latency Sample",
-            "description": "binned version of the IO latencies collected",
+            "name": "High Priority Polling",
+            "description": (
+                "Use polled IO completions instead of interrupts. Requires "
+                "direct IO. io_uring only."
+            ),
         },
     )
-
-
-@dataclass
-class SyncIoOutput:
-    total_ios: int = field(
+    fixedbufs: typing.Annotated[
+        Optional[int],
+        validation.min(0),
+        validation.max(1),
+    ] = field(
+        default=None,
         metadata={
-            "name": "Quantity of Latencies Logged",
+            "name": "Fixed Buffers",
             "description": (
-                "Quantity of latency samples collected (i.e. logged)."
+                "Register the IO buffers with the kernel up front so they are "
+                "not mapped for every IO. io_uring only."
             ),
-        }
+        },
     )
-    lat_ns: IoLatency = field(
+    registerfiles: typing.Annotated[
+        Optional[int],
+        validation.min(0),
+        validation.max(1),
+    ] = field(
+        default=None,
         metadata={
-            "name": "Latency ns",
-            "description": "Total latency in nanoseconds.",
-        }
+            "name": "Register Files",
+            "description": (
+                "Register the files with the kernel up front to skip the per- "
+                "IO file reference. io_uring only."
+            ),
+        },
     )
-
-
-@dataclass
-class AioOutput:
-    io_bytes: int = field(
+    nonvectored: typing.Annotated[
+        Optional[int],
+        validation.min(0),
+        validation.max(1),
+    ] = field(
+        default=None,
         metadata={
-            "name": "IO B",
-            "description": "Quantity of IO transactions in bytes",
-        }
+            "name": "Non-vectored",
+            "description": (
+                "Use non-vectored read and write commands. io_uring only."
+            ),
+        },
     )
-    io_kbytes: int = field(
+    write_bw_log: Optional[str] = field(
+        default=None,
         metadata={
-            "name": "IO KiB",
-            "description": "Quantity of IO transactions in kibibytes",
-        }
+            "name": "Bandwidth Log",
+            "description": (
+                "File name prefix of the bandwidth log, written as "
+                "<prefix>_bw.<job index>.log."
+            ),
+        },
     )
-    bw_bytes: int = field(
+    write_iops_log: Optional[str] = field(
+        default=None,
         metadata={
-            "name": "Bandwidth B",
-            "description": "IO bandwidth used in bytes",
-        }
+            "name": "IOPS Log",
+            "description": (
+                "File name prefix of the IOPS log, written as "
+                "<prefix>_iops.<job index>.log."
+            ),
+        },
     )
-    bw: int = field(
+    write_lat_log: Optional[str] = field(
+        default=None,
         metadata={
-            "name": "Bandwidth KiB",
-            "description": "IO bandwidth used in kibibytes",
-        }
+            "name": "Latency Log",
+            "description": (
+                "File name prefix of the latency logs, written as "
+                "<prefix>_lat, _clat and _slat.<job index>.log."
+            ),
+        },
     )
-    iops: float = field(
+    log_avg_msec: typing.Annotated[Optional[int], validation.min(0)] = field(
+        default=None,
         metadata={
-            "name": "IOPS",
-            "description": "IO operations per second",
-        }
+            "name": "Log Average ms",
+            "description": (
+                "Average log samples over this many milliseconds instead of "
+                "logging every IO."
+            ),
+        },
     )
-    runtime: int = field(
+    runtime: typing.Annotated[
+        Optional[str], validation.pattern(_fio_time)
+    ] = field(
+        default=None,
         metadata={
             "name": "Runtime",
-            "description": "Length of time in seconds on this IO pattern type",
-        }
-    )
-    total_ios: int = field(
-        metadata={
-            "name": "Quantity of Latencies Logged",
             "description": (
-                "Quantity of latency samples collected (i.e. logged)"
+                "Stop the job after this long, e.g. 60s or 5m, even if size "
+                "has not been transferred yet. Does not include ramp_time."
             ),
-        }
+        },
     )
-    short_ios: int = field(
+    time_based: typing.Annotated[
+        Optional[int],
+        validation.min(0),
+        validation.max(1),
+    ] = field(
+        default=None,
         metadata={
-            "name": "Short IOs",
+            "name": "Time Based",
             "description": (
-                "Unclear from documentation. Educated guess: quantity of"
-                " incomplete IO."
+                "Run for the full runtime, repeating the workload once size "
+                "has been transferred. Requires runtime."
             ),
-        }
+        },
     )
-    drop_ios: int = field(
+    ramp_time: typing.Annotated[
+        Optional[str], validation.pattern(_fio_time)
+    ] = field(
+        default=None,
         metadata={
-            "name": "Dropped IOs",
+            "name": "Ramp Time",
             "description": (
-                "Unclear from documentation. Edcuated guess: quantity of"
-                " dropped IO."
+                "Run the workload this long before collecting any stats or "
+                "log samples, to exclude the warm-up from the results."
+            ),
+        },
+    )
+    startdelay: typing.Annotated[
+        Optional[str], validation.pattern(_fio_time)
+    ] = field(
+        default=None,
+        metadata={
+            "name": "Start Delay",
+            "description": "Wait this long before starting the job.",
+        },
+    )
+    steadystate: typing.Annotated[
+        Optional[str],
+        validation.pattern(re.compile(r"^(iops|bw)(_slope)?:\d+(\.\d+)?%?$")),
+    ] = field(
+        default=None,
+        metadata={
+            "name": "Steady State",
+            "description": (
+                "End the job once IOPS or bandwidth is steady: "
+                "<iops|bw>:<max deviation> from the mean, or "
+                "<iops|bw>_slope:<max slope> of a least squares fit, over "
+                "steadystate_duration. A trailing % makes the limit "
+                "relative to the mean, e.g. iops_slope:0.1%."
+            ),
+        },
+    )
+    steadystate_duration: typing.Annotated[
+        Optional[str], validation.pattern(_fio_time)
+    ] = field(
+        default=None,
+        metadata={
+            "name": "Steady State Duration",
+            "description": (
+                "Length of the rolling window the steady state criterion is "
+                "judged over, e.g. 300s or 5m. Required with steadystate."
+            ),
+        },
+    )
+    steadystate_ramp_time: typing.Annotated[
+        Optional[str], validation.pattern(_fio_time)
+    ] = field(
+        default=None,
+        metadata={
+            "name": "Steady State Ramp Time",
+            "description": (
+                "Time to run before steady state data collection starts."
+            ),
+        },
+    )
+    steadystate_check_interval: typing.Annotated[
+        Optional[str], validation.pattern(_fio_time)
+    ] = field(
+        default=None,
+        metadata={
+            "name": "Steady State Check Interval",
+            "description": (
+                "How often a steady state sample is taken, 1s by default."
+            ),
+        },
+    )
+    numjobs: typing.Annotated[Optional[int], validation.min(1)] = field(
+        default=None,
+        metadata={
+            "name": "Number of Jobs",
+            "description": (
+                "Run this many clones of the job, each reported as a "
+                "separate result with the job's name."
+            ),
+        },
+    )
+    cpus_allowed: typing.Annotated[
+        Optional[str], validation.pattern(re.compile(rf"^{_cpu_list}$"))
+    ] = field(
+        default=None,
+        metadata={
+            "name": "CPUs Allowed",
+            "description": (
+                "CPUs the job's threads may run on, e.g. 0-3,8. Set from the "
+                "target device's NUMA node by the device_local placement."
+            ),
+        },
+    )
+    cpus_allowed_policy: Optional[CpusAllowedPolicy] = field(
+        default=None,
+        metadata={
+            "name": "CPUs Allowed Policy",
+            "description": (
+                "shared lets every clone use all of cpus_allowed, split "
+                "gives each clone its own CPU."
+            ),
+        },
+    )
+    numa_cpu_nodes: typing.Annotated[
+        Optional[str],
+        validation.pattern(re.compile(rf"^(all|{_cpu_list})$")),
+    ] = field(
+        default=None,
+        metadata={
+            "name": "NUMA CPU Nodes",
+            "description": (
+                "Run the job's threads on the CPUs of these NUMA nodes. "
+                "Needs fio built with libnuma."
+            ),
+        },
+    )
+    numa_mem_policy: typing.Annotated[
+        Optional[str], validation.pattern(_numa_mem_policy)
+    ] = field(
+        default=None,
+        metadata={
+            "name": "NUMA Memory Policy",
+            "description": (
+                "Memory policy of the job's IO buffers: default, local, "
+                "prefer:<node>, bind:<nodes> or interleave:<nodes>. Needs "
+                "fio built with libnuma."
+            ),
+        },
+    )
+    stonewall: typing.Annotated[
+        Optional[int],
+        validation.min(0),
+        validation.max(1),
+    ] = field(
+        default=None,
+        metadata={
+            "name": "Stonewall",
+            "description": (
+                "Wait for preceding jobs in the job file to exit before "
+                "starting this one. Implies a new reporting group."
+            ),
+        },
+    )
+    new_group: typing.Annotated[
+        Optional[int],
+        validation.min(0),
+        validation.max(1),
+    ] = field(
+        default=None,
+        metadata={
+            "name": "New Group",
+            "description": (
+                "Start a new reporting group with this job without waiting "
+                "for the preceding jobs."
+            ),
+        },
+    )
+
+    def __post_init__(self):
+        if IoEngine(self.ioengine) != IoEngine.io_uring:
+            for option in _io_uring_options:
+                if getattr(self, option):
+                    raise ValueError(
+                        f"{option} requires the io_uring IO engine"
+                    )
+        if self.hipri and self.buffered:
+            raise ValueError("hipri requires direct IO, set buffered to 0")
+        if self.steadystate and not self.steadystate_duration:
+            # fio silently disables steady state detection without one
+            raise ValueError("steadystate requires steadystate_duration")
+        if not self.read_iolog:
+            for option in (
+                "replay_no_stall",
+                "replay_time_scale",
+                "replay_redirect",
+            ):
+                if getattr(self, option) is not None:
+                    raise ValueError(f"{option} requires read_iolog")
+        if self.time_based and not self.runtime:
+            # fio would run until it is killed
+            raise ValueError("time_based requires runtime")
+        if self.runtime and fio_seconds(self.runtime) <= 0:
+            raise ValueError("runtime must be longer than 0")
+        if (
+            self.runtime
+            and self.steadystate
+            and fio_seconds(self.steadystate_ramp_time)
+            + fio_seconds(self.steadystate_duration)
+            > fio_seconds(self.runtime)
+        ):
+            raise ValueError(
+                "steadystate_ramp_time plus steadystate_duration exceeds "
+                "runtime, the steady state can never be attained"
+            )
+
+    def max_seconds(self) -> Optional[float]:
+        """Upper bound of the job's wall-clock time, None without runtime.
+        fio runs ramp_time on top of runtime, after startdelay."""
+        if not self.runtime:
+            return None
+        return (
+            fio_seconds(self.startdelay)
+            + fio_seconds(self.ramp_time)
+            + fio_seconds(self.runtime)
+        )
+
+    def to_options(self) -> Dict[str, str]:
+        return {
+            key: str(value)
+            for key, value in asdict(self).items()
+            if value is not None
+        }
+
+
+@dataclass
+class JobSection:
+    name: Annotated[str, validation.min(1)] = field(
+        metadata={
+            "name": "Name",
+            "description": "The name of the fio job section.",
+        }
+    )
+    params: JobParams = field(
+        metadata={
+            "name": "Fio Job Parameters",
+            "description": "Parameters to execute this fio job section.",
+        }
+    )
+
+
+@dataclass
+class ResultCache:
+    directory: Annotated[str, validation.min(1)] = field(
+        metadata={
+            "name": "Directory",
+            "description": "Directory holding the cached outputs.",
+        }
+    )
+    bypass: bool = field(
+        default=False,
+        metadata={
+            "name": "Bypass",
+            "description": (
+                "Always run fio, then replace the cached output with the "
+                "fresh one."
+            ),
+        },
+    )
+    max_bytes: typing.Annotated[Optional[int], validation.min(0)] = field(
+        default=None,
+        metadata={
+            "name": "Max Bytes",
+            "description": (
+                "Evict the least recently used outputs beyond this total "
+                "size."
+            ),
+        },
+    )
+    max_age_seconds: typing.Annotated[
+        Optional[int], validation.min(0)
+    ] = field(
+        default=None,
+        metadata={
+            "name": "Max Age Seconds",
+            "description": (
+                "Evict outputs that have not been used for this long."
+            ),
+        },
+    )
+
+
+@dataclass
+class DataFilePool:
+    directory: Annotated[str, validation.min(1)] = field(
+        metadata={
+            "name": "Directory",
+            "description": (
+                "Directory holding the pool's data files. They are kept "
+                "across runs whatever cleanup is set to."
+            ),
+        }
+    )
+    fill: PoolFill = field(
+        default=PoolFill.random,
+        metadata={
+            "name": "Fill",
+            "description": (
+                "How new data files are laid out: sparse only sets their "
+                "size, zero and random write every block and sync it."
+            ),
+        },
+    )
+    max_bytes: typing.Annotated[Optional[int], validation.min(0)] = field(
+        default=None,
+        metadata={
+            "name": "Max Bytes",
+            "description": (
+                "Evict the least recently used idle data files beyond this "
+                "total size. A file that does not fit is laid out in the "
+                "work directory as without a pool."
+            ),
+        },
+    )
+    invalidate: bool = field(
+        default=False,
+        metadata={
+            "name": "Invalidate",
+            "description": (
+                "Delete the idle data files of the sizes this run needs and "
+                "lay out fresh ones."
+            ),
+        },
+    )
+
+
+@dataclass
+class TraceFilter:
+    actions: Optional[typing.List[IologAction]] = field(
+        default=None,
+        metadata={
+            "name": "Actions",
+            "description": (
+                "Replay only the IOs of these kinds, and the waits of a "
+                "version 2 iolog if wait is listed. Everything by default."
+            ),
+        },
+    )
+    files: Optional[typing.List[str]] = field(
+        default=None,
+        metadata={
+            "name": "Files",
+            "description": (
+                "Replay only these files of the iolog, as named in it."
+            ),
+        },
+    )
+    start: typing.Annotated[
+        Optional[str], validation.pattern(_fio_time)
+    ] = field(
+        default=None,
+        metadata={
+            "name": "Start",
+            "description": (
+                "Replay from this far into a version 3 iolog, e.g. 90s, "
+                "with the time before it cut out."
+            ),
+        },
+    )
+    end: typing.Annotated[
+        Optional[str], validation.pattern(_fio_time)
+    ] = field(
+        default=None,
+        metadata={
+            "name": "End",
+            "description": (
+                "Stop replaying this far into a version 3 iolog. The rest "
+                "of the iolog is not read."
+            ),
+        },
+    )
+    speedup: Optional[float] = field(
+        default=None,
+        metadata={
+            "name": "Speedup",
+            "description": (
+                "Divide the timestamps of a version 3 iolog by this factor."
+            ),
+        },
+    )
+
+    def __post_init__(self):
+        if self.speedup is not None and self.speedup <= 0:
+            raise ValueError("speedup must be positive")
+        if self.end is not None and fio_seconds(self.end) <= fio_seconds(
+            self.start
+        ):
+            raise ValueError("end must be later than start")
+
+    def timed(self) -> bool:
+        """Whether the filter needs the iolog's timestamps."""
+        return bool(self.start or self.end or self.speedup is not None)
+
+
+@dataclass
+class RepetitionPolicy:
+    min_runs: typing.Annotated[int, validation.min(2)] = field(
+        default=3,
+        metadata={
+            "name": "Min Runs",
+            "description": "Runs to make before stopping early is considered.",
+        },
+    )
+    max_runs: typing.Annotated[int, validation.min(2)] = field(
+        default=10,
+        metadata={
+            "name": "Max Runs",
+            "description": "Runs to stop at however noisy the results are.",
+        },
+    )
+    confidence: float = field(
+        default=0.95,
+        metadata={
+            "name": "Confidence",
+            "description": "Confidence level of the reported intervals.",
+        },
+    )
+    relative_width: float = field(
+        default=0.05,
+        metadata={
+            "name": "Relative Width",
+            "description": (
+                "Stop once every interval is narrower than this fraction of "
+                "its mean."
+            ),
+        },
+    )
+    percentiles: Optional[typing.List[float]] = field(
+        default=None,
+        metadata={
+            "name": "Percentiles",
+            "description": (
+                "Completion latency percentiles to report intervals for, "
+                "50, 99 and 99.9 by default."
+            ),
+        },
+    )
+
+    def __post_init__(self):
+        if self.min_runs > self.max_runs:
+            raise ValueError("min_runs exceeds max_runs")
+        if not 0 < self.confidence < 1:
+            raise ValueError("confidence must be in (0, 1)")
+        if self.relative_width <= 0:
+            raise ValueError("relative_width must be positive")
+        if not all(0 < p <= 100 for p in self.percentiles or []):
+            raise ValueError("percentiles must be in (0, 100]")
+
+
+@dataclass
+class FioJob:
+    name: Annotated[str, validation.min(1)] = field(
+        metadata={
+            "name": "Name",
+            "description": "The name of the fio job.",
+        }
+    )
+    params: JobParams = field(
+        metadata={
+            "name": "Fio Job Parameters",
+            "description": "Parameters to execute one fio job.",
+        }
+    )
+    cleanup: bool = field(
+        default=True,
+        metadata={
+            "name": "Cleanup",
+            "description": "Cleanup temporary files created during execution.",
+        },
+    )
+    work_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "Work Directory",
+            "description": (
+                "Directory in which each run creates its own working "
+                "directory for the job file, output, logs and the data files "
+                "of jobs without a filename or directory. Defaults to the "
+                "system temporary directory."
+            ),
+        },
+    )
+    global_options: Optional[Dict[str, str]] = field(
+        default=None,
+        metadata={
+            "name": "Global Options",
+            "description": (
+                "Fio options written to the [global] section of the job file "
+                "and applied to every job section."
+            ),
+        },
+    )
+    sections: Optional[typing.List[JobSection]] = field(
+        default=None,
+        metadata={
+            "name": "Additional Job Sections",
+            "description": (
+                "Further jobs, in order, run after the first one by the same "
+                "fio invocation. Use stonewall or new_group in their "
+                "parameters to control grouping."
+            ),
+        },
+    )
+    targets: Optional[typing.List[str]] = field(
+        default=None,
+        metadata={
+            "name": "Targets",
+            "description": (
+                "Files, devices or directories to run the job against "
+                "concurrently, one fio process per target. Results are "
+                "reported per target and merged into an aggregate."
+            ),
+        },
+    )
+    target_option: Optional[TargetOption] = field(
+        default=TargetOption.filename,
+        metadata={
+            "name": "Target Option",
+            "description": (
+                "Fio option, filename or directory, each target is set as."
+            ),
+        },
+    )
+    max_workers: typing.Annotated[Optional[int], validation.min(1)] = field(
+        default=None,
+        metadata={
+            "name": "Max Workers",
+            "description": (
+                "Maximum number of fio processes running at once when "
+                "targets are given. Defaults to one per target."
+            ),
+        },
+    )
+    pin_cpus: bool = field(
+        default=False,
+        metadata={
+            "name": "Pin CPUs",
+            "description": (
+                "Pin the fio process of each target to a separate CPU."
+            ),
+        },
+    )
+    placement: Placement = field(
+        default=Placement.manual,
+        metadata={
+            "name": "Placement",
+            "description": (
+                "manual uses the CPU and NUMA options as given, device_local "
+                "sets cpus_allowed of every job section without one to the "
+                "CPUs of the NUMA node of the section's target block device, "
+                "read from sysfs."
+            ),
+        },
+    )
+    collect_logs: Optional[typing.List[LogType]] = field(
+        default=None,
+        metadata={
+            "name": "Collect Logs",
+            "description": (
+                "Time-series logs (bw, iops, lat) to enable for every job "
+                "section and attach to its result as columns."
+            ),
+        },
+    )
+    log_downsample_msec: typing.Annotated[
+        Optional[int], validation.min(1)
+    ] = field(
+        default=None,
+        metadata={
+            "name": "Log Downsample ms",
+            "description": (
+                "Average collected log samples per direction over windows of "
+                "this many milliseconds."
+            ),
+        },
+    )
+    detail: DetailLevel = field(
+        default=DetailLevel.full,
+        metadata={
+            "name": "Detail Level",
+            "description": (
+                "How much of the latency distribution to report: summary "
+                "keeps min, max, mean and stddev only, percentiles adds "
+                "fio's percentiles, full adds the json+ bins and the latency "
+                "frequency distributions. Latency maps of IO directions the "
+                "readwrite pattern does not exercise are always dropped."
+            ),
+        },
+    )
+    repetitions: Optional[RepetitionPolicy] = field(
+        default=None,
+        metadata={
+            "name": "Repetitions",
+            "description": (
+                "Run the workload repeatedly and report confidence intervals "
+                "of IOPS, bandwidth and completion latency across the runs."
+            ),
+        },
+    )
+    cache: Optional[ResultCache] = field(
+        default=None,
+        metadata={
+            "name": "Result Cache",
+            "description": (
+                "Reuse the output of an earlier run with the same job file, "
+                "fio version and target devices instead of running fio."
+            ),
+        },
+    )
+    data_pool: Optional[DataFilePool] = field(
+        default=None,
+        metadata={
+            "name": "Data File Pool",
+            "description": (
+                "Run job sections without a filename or directory against "
+                "data files from this pool, laid out once and reused by "
+                "later runs of the same size, instead of files fio lays out "
+                "in the work directory. Sections with numjobs above 1 or a "
+                "size relative to the file are left to fio."
+            ),
+        },
+    )
+    trace_filter: Optional[TraceFilter] = field(
+        default=None,
+        metadata={
+            "name": "Trace Filter",
+            "description": (
+                "Filter, slice and speed up the iolog of every job section "
+                "with read_iolog into a copy in the work directory, streamed "
+                "line by line, and replay the copy."
+            ),
+        },
+    )
+    status_interval: typing.Annotated[
+        Optional[int], validation.min(1)
+    ] = field(
+        default=None,
+        metadata={
+            "name": "Status Interval",
+            "description": (
+                "Seconds between interim reports. When set, fio's reports are "
+                "parsed as they arrive and a failed run returns the last one "
+                "as partial output."
+            ),
+        },
+    )
+    snapshot_file: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "Snapshot File",
+            "description": (
+                "File to append each interim report to as a timestamped line "
+                "of JSON, when status_interval is set."
+            ),
+        },
+    )
+    servers: Optional[typing.List[str]] = field(
+        default=None,
+        metadata={
+            "name": "Servers",
+            "description": (
+                "fio --server endpoints, as [ip:|ip6:]hostname[,port], to "
+                "run the job on at once through fio --client. Each server "
+                "runs every job section; file paths in the job are the "
+                "servers' own."
+            ),
+        },
+    )
+    timeout: typing.Annotated[Optional[int], validation.min(1)] = field(
+        default=None,
+        metadata={
+            "name": "Timeout",
+            "description": (
+                "Wall-clock seconds fio may run for. At the deadline fio is "
+                "interrupted, which ends its jobs and writes their results, "
+                "and killed if it has not exited 30 seconds later. The "
+                "results fio wrote are returned as partial output of the "
+                "error."
+            ),
+        },
+    )
+    instrumentation: bool = field(
+        default=False,
+        metadata={
+            "name": "Instrumentation",
+            "description": (
+                "Report the wall and CPU time of each phase of the run and "
+                "fio's resource usage with the output."
+            ),
+        },
+    )
+    profile_file: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "Profile File",
+            "description": (
+                "Profile the plugin's Python side of the run with cProfile "
+                "and write the stats to this file, for pstats or snakeviz. "
+                "Covers the thread running the workload step, not the "
+                "fan-out threads or run_async."
+            ),
+        },
+    )
+    packed_file: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "Packed File",
+            "description": (
+                "File to also write the success output to in the compact "
+                "packed format, with latency bins as packed integer arrays. "
+                "fio_pack.load_output reads it back."
+            ),
+        },
+    )
+
+    def __post_init__(self):
+        if self.repetitions is not None and self.cache is not None:
+            raise ValueError(
+                "repetitions of a cached output would all be the same run"
+            )
+        if self.repetitions is not None and self.targets:
+            raise ValueError("repetitions are not supported with targets")
+        if self.cache is not None and self.targets:
+            # each target's run would need its own entry
+            raise ValueError("cache is not supported with targets")
+        if self.snapshot_file and not self.status_interval:
+            # there would be no interim reports to write
+            raise ValueError("snapshot_file requires status_interval")
+        if self.targets and (self.status_interval or self.snapshot_file):
+            # interim reports are only streamed from a single fio
+            raise ValueError(
+                "status_interval and snapshot_file are not supported with "
+                "targets"
+            )
+        if self.pin_cpus and self.placement == Placement.device_local:
+            raise ValueError("pin_cpus and device_local placement conflict")
+        if self.packed_file and (
+            self.targets or self.repetitions or self.servers
+        ):
+            raise ValueError(
+                "packed_file holds a single run's output, it is not "
+                "supported with targets, repetitions or servers"
+            )
+        if self.data_pool is not None and self.targets:
+            raise ValueError(
+                "data_pool is not supported with targets, which set the "
+                "files of every section"
+            )
+        if self.servers:
+            # all of these act on the local host
+            for option in (
+                "targets",
+                "data_pool",
+                "trace_filter",
+                "collect_logs",
+                "repetitions",
+                "cache",
+                "status_interval",
+            ):
+                if getattr(self, option):
+                    raise ValueError(f"{option} is not supported with servers")
+            if self.placement == Placement.device_local:
+                raise ValueError(
+                    "device_local placement is not supported with servers"
+                )
+
+    def job_sections(self) -> typing.List[typing.Tuple[str, JobParams]]:
+        return [(self.name, self.params)] + [
+            (section.name, section.params) for section in self.sections or []
+        ]
+
+    def section_directions(
+        self,
+    ) -> Dict[str, Optional[typing.Tuple[str, ...]]]:
+        """IO directions each job section exercises, by section name, None
+        for a section replaying an iolog, which may do IO in any."""
+        return {
+            name: (
+                None
+                if params.read_iolog
+                else IoPattern(params.readwrite).directions
+            )
+            for name, params in self.job_sections()
+        }
+
+    def map_sections(
+        self, update: typing.Callable[[str, JobParams], JobParams]
+    ) -> "FioJob":
+        """Copy of this job with update applied to every section's
+        parameters."""
+        sections = [
+            JobSection(name, update(name, params))
+            for name, params in self.job_sections()
+        ]
+        return replace(
+            self, params=sections[0].params, sections=sections[1:] or None
+        )
+
+    def max_seconds(self) -> Optional[float]:
+        """Upper bound of the job file's wall-clock time, None unless every
+        section sets runtime. Sections run concurrently, except that a
+        stonewall section waits for the ones before it."""
+        total = group = 0.0
+        for _, params in self.job_sections():
+            seconds = params.max_seconds()
+            if seconds is None:
+                return None
+            if params.stonewall:
+                total += group
+                group = 0.0
+            group = max(group, seconds)
+        return total + group
+
+    def render(self) -> str:
+        """The fio job file for this job."""
+        cfg = configparser.ConfigParser(interpolation=None)
+        if self.global_options:
+            cfg["global"] = self.global_options
+        for name, params in self.job_sections():
+            if name == "global" or cfg.has_section(name):
+                raise ValueError(
+                    "job section name '{}' is reserved or repeated".format(
+                        name
+                    )
+                )
+            cfg[name] = params.to_options()
+        text = io.StringIO()
+        cfg.write(text, space_around_delimiters=False)
+        return text.getvalue()
+
+    def write_params_to_file(self, filepath: Path):
+        with open(filepath, "w") as temp:
+            temp.write(self.render())
+
+
+@dataclass
+class IoLatency:
+    min_: int = field(
+        metadata={
+            "id": "min",
+            "name": "IO Latency Min",
+            "description": "IO latency minimum",
+        }
+    )
+    max_: int = field(
+        metadata={
+            "id": "max",
+            "name": "IO Latency Max",
+            "description": "IO latency maximum",
+        }
+    )
+    mean: float = field(
+        metadata={
+            "name": "IO Latency Mean",
+            "description": "IO latency mean",
+        }
+    )
+    stddev: float = field(
+        metadata={
+            "name": "IO Latency StdDev",
+            "description": "IO latency standard deviation",
+        }
+    )
+    N: int = field(
+        metadata={
+            "name": "IO Latency Sample Quantity",
+            "description": "quantity of IO latency samples collected",
+        }
+    )
+    percentile: Optional[Dict[str, int]] = field(
+        default=None,
+        metadata={
+            "name": "IO Latency Cumulative Distribution",
+            "description": "Cumulative distribution of IO latency sample",
+        },
+    )
+    bins: Optional[Dict[str, int]] = field(
+        default=None,
+        metadata={
+            "name": "Binned IO Latency Sample",
+            "description": "binned version of the IO latencies collected",
+        },
+    )
+
+    def histogram(self) -> LatencyHistogram:
+        return LatencyHistogram.from_bins(self.bins)
+
+    def percentile_values(
+        self, points: typing.Iterable[float]
+    ) -> typing.List[Optional[int]]:
+        """Latency at each of points, from the bins if present, else from
+        fio's reported percentiles, None where neither has it."""
+        points = list(points)
+        if self.bins:
+            return self.histogram().percentiles(points)
+        reported = self.percentile or {}
+        return [reported.get("{:.6f}".format(p)) for p in points]
+
+
+@dataclass
+class SyncIoOutput:
+    total_ios: int = field(
+        metadata={
+            "name": "Quantity of Latencies Logged",
+            "description": (
+                "Quantity of latency samples collected (i.e. logged)."
+            ),
+        }
+    )
+    lat_ns: IoLatency = field(
+        metadata={
+            "name": "Latency ns",
+            "description": "Total latency in nanoseconds.",
+        }
+    )
+
+
+@dataclass
+class AioOutput:
+    io_bytes: int = field(
+        metadata={
+            "name": "IO B",
+            "description": "Quantity of IO transactions in bytes",
+        }
+    )
+    io_kbytes: int = field(
+        metadata={
+            "name": "IO KiB",
+            "description": "Quantity of IO transactions in kibibytes",
+        }
+    )
+    bw_bytes: int = field(
+        metadata={
+            "name": "Bandwidth B",
+            "description": "IO bandwidth used in bytes",
+        }
+    )
+    bw: int = field(
+        metadata={
+            "name": "Bandwidth KiB",
+            "description": "IO bandwidth used in kibibytes",
+        }
+    )
+    iops: float = field(
+        metadata={
+            "name": "IOPS",
+            "description": "IO operations per second",
+        }
+    )
+    runtime: int = field(
+        metadata={
+            "name": "Runtime",
+            "description": "Length of time in seconds on this IO pattern type",
+        }
+    )
+    total_ios: int = field(
+        metadata={
+            "name": "Quantity of Latencies Logged",
+            "description": (
+                "Quantity of latency samples collected (i.e. logged)"
+            ),
+        }
+    )
+    short_ios: int = field(
+        metadata={
+            "name": "Short IOs",
+            "description": (
+                "Unclear from documentation. Educated guess: quantity of"
+                " incomplete IO."
+            ),
+        }
+    )
+    drop_ios: int = field(
+        metadata={
+            "name": "Dropped IOs",
+            "description": (
+                "Unclear from documentation. Edcuated guess: quantity of"
+                " dropped IO."
+            ),
+        }
+    )
+    slat_ns: IoLatency = field(
+        metadata={
+            "name": "Submission Latency ns",
+            "description": "Submission latency in nanoseconds",
+        }
+    )
+    clat_ns: IoLatency = field(
+        metadata={
+            "name": "Completion Latency ns",
+            "description": "Completion latency in nanoseconds",
+        }
+    )
+    lat_ns: IoLatency = field(
+        metadata={
+            "name": "Latency ns",
+            "description": "Total latency in nanoseconds.",
+        }
+    )
+    bw_min: int = field(
+        metadata={
+            "name": "Bandwidth Min",
+            "description": "Bandwidth minimum",
+        }
+    )
+    bw_max: int = field(
+        metadata={
+            "name": "Bandwidth Max",
+            "description": "Bandwidth maximum",
+        }
+    )
+    bw_agg: float = field(
+        metadata={
+            "name": "Bandwidth Aggregate Percentile",
+            "description": "",
+        }
+    )
+    bw_mean: float = field(
+        metadata={
+            "name": "Bandwidth Mean",
+            "description": "Bandwidth mean",
+        }
+    )
+    bw_dev: float = field(
+        metadata={
+            "name": "Bandwidth Std Dev",
+            "description": "Bandwidth standard deviation",
+        }
+    )
+    bw_samples: int = field(
+        metadata={
+            "name": "Bandwidth Sample Quantity",
+            "description": "Quantity of bandwidth samples collected",
+        }
+    )
+    iops_min: int = field(
+        metadata={
+            "name": "IOPS Min",
+            "description": "IO operations per second minimum",
+        }
+    )
+    iops_max: int = field(
+        metadata={
+            "name": "IOPS Max",
+            "description": "IO operations per second maximum",
+        }
+    )
+    iops_mean: float = field(
+        metadata={
+            "name": "IOPS Mean",
+            "description": "IO operations per second mean",
+        }
+    )
+    iops_stddev: float = field(
+        metadata={
+            "name": "IOPS Std Dev",
+            "description": "IO operations per second standard deviation",
+        }
+    )
+    iops_samples: int = field(
+        metadata={
+            "name": "IOPS Sample Quantity",
+            "description": "Quantity of IOPS samples collected",
+        }
+    )
+
+
+@dataclass
+class TimeSeries:
+    time_ms: typing.List[int] = field(
+        metadata={
+            "name": "Time ms",
+            "description": "Time of each sample since the job started.",
+        }
+    )
+    value: typing.List[int] = field(
+        metadata={
+            "name": "Value",
+            "description": (
+                "Sample value: KiB/s for bandwidth, IOs per second for IOPS, "
+                "nanoseconds for latency."
+            ),
+        }
+    )
+    direction: typing.List[int] = field(
+        metadata={
+            "name": "Direction",
+            "description": "IO direction: 0 read, 1 write, 2 trim.",
+        }
+    )
+    block_size: typing.List[int] = field(
+        metadata={
+            "name": "Block Size",
+            "description": (
+                "Block size in bytes, 0 where a downsampled window mixed "
+                "block sizes."
+            ),
+        }
+    )
+
+
+@dataclass
+class SteadyStateData:
+    bw_mean: int = field(
+        metadata={
+            "name": "Bandwidth Mean",
+            "description": "Mean bandwidth over the window, in bytes/s.",
+        }
+    )
+    iops_mean: int = field(
+        metadata={
+            "name": "IOPS Mean",
+            "description": "Mean IOPS over the window.",
+        }
+    )
+    iops: typing.List[int] = field(
+        metadata={
+            "name": "IOPS Samples",
+            "description": "IOPS samples of the window, oldest first.",
+        }
+    )
+    bw: typing.List[int] = field(
+        metadata={
+            "name": "Bandwidth Samples",
+            "description": (
+                "Bandwidth samples of the window in bytes/s, oldest first."
+            ),
+        }
+    )
+
+
+@dataclass
+class SteadyState:
+    ss: str = field(
+        metadata={
+            "name": "Criterion Kind",
+            "description": "iops, iops_slope, bw or bw_slope.",
+        }
+    )
+    duration: int = field(
+        metadata={
+            "name": "Duration",
+            "description": "Length of the window in seconds.",
+        }
+    )
+    attained: int = field(
+        metadata={
+            "name": "Attained",
+            "description": "1 if the job reached steady state, else 0.",
+        }
+    )
+    criterion: str = field(
+        metadata={
+            "name": "Criterion",
+            "description": (
+                "The limit, with a trailing % if relative to the mean."
+            ),
+        }
+    )
+    max_deviation: float = field(
+        metadata={
+            "name": "Max Deviation",
+            "description": (
+                "Largest deviation from the mean over the last window."
+            ),
+        }
+    )
+    slope: float = field(
+        metadata={
+            "name": "Slope",
+            "description": (
+                "Slope of the least squares fit over the last window."
+            ),
+        }
+    )
+    data: SteadyStateData = field(
+        metadata={
+            "name": "Data",
+            "description": "Samples of the last window.",
+        }
+    )
+
+
+@dataclass
+class CpuPlacement:
+    device: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "Device",
+            "description": (
+                "Block device of the job's target, for device_local "
+                "placement."
+            ),
+        },
+    )
+    numa_node: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "NUMA Node",
+            "description": (
+                "NUMA node of the device, for device_local placement. None "
+                "if the device has no NUMA affinity."
+            ),
+        },
+    )
+    cpus_allowed: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "CPUs Allowed",
+            "description": "CPUs the job's threads were allowed to run on.",
+        },
+    )
+    cpus_allowed_policy: Optional[CpusAllowedPolicy] = field(
+        default=None,
+        metadata={
+            "name": "CPUs Allowed Policy",
+            "description": "How the clones of the job shared cpus_allowed.",
+        },
+    )
+    numa_cpu_nodes: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "NUMA CPU Nodes",
+            "description": "NUMA nodes the job's threads ran on.",
+        },
+    )
+    numa_mem_policy: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "NUMA Memory Policy",
+            "description": "Memory policy of the job's IO buffers.",
+        },
+    )
+
+
+@dataclass
+class JobResult:
+    jobname: str = field(
+        metadata={
+            "name": "Job Name",
+            "description": "Name of the job configuration",
+        }
+    )
+    groupid: int = field(
+        metadata={
+            "name": "Thread Group ID",
+            "description": (
+                "Identifying number for thread group used in a job."
+            ),
+        }
+    )
+    error: int = field(
+        metadata={
+            "name": "Error",
+            "description": "An error code thrown by the job.",
+        }
+    )
+    eta: int = field(
+        metadata={
+            "name": "ETA",
+            "description": (
+                "Specifies when real-time estimates should be printed."
+            ),
+        }
+    )
+    elapsed: int = field(
+        metadata={
+            "name": "Time Elapsed s",
+            "description": "Execution time up to now in seconds.",
+        }
+    )
+    read: AioOutput = field(
+        metadata={
+            "name": "Read",
+            "description": "Read IO results.",
+        }
+    )
+    write: AioOutput = field(
+        metadata={
+            "name": "Write",
+            "description": "Write IO results.",
+        }
+    )
+    trim: AioOutput = field(
+        metadata={
+            "name": "Trim",
+            "description": "Trim IO results.",
+        }
+    )
+    sync: SyncIoOutput = field(
+        metadata={
+            "name": "Synchronous",
+            "description": "Synchronous IO results.",
+        }
+    )
+    job_runtime: int = field(
+        metadata={
+            "name": "Runtime",
+            "description": "Execution time used on this job.",
+        }
+    )
+    usr_cpu: float = field(
+        metadata={
+            "name": "User CPU",
+            "description": "CPU usage in user space.",
+        }
+    )
+    sys_cpu: float = field(
+        metadata={
+            "name": "System CPU",
+            "description": "CPU usage in kernel (system) space.",
+        }
+    )
+    ctx: int = field(
+        metadata={
+            "name": "Context Switches",
+            "description": (
+                "Quantity of voluntary and involuntary context switches."
+            ),
+        }
+    )
+    majf: int = field(
+        metadata={
+            "name": "Major Page Fault",
+            "description": "Quantity of page faults requring physical IO.",
+        }
+    )
+    minf: int = field(
+        metadata={
+            "name": "Minor Page Fault",
+            "description": (
+                "Quantity of page faults not requiring physical IO."
+            ),
+        }
+    )
+    iodepth_level: Dict[str, float] = field(
+        metadata={
+            "name": "Total IO Depth Frequency Distribution",
+            "description": "Unclear from documentation.",
+        }
+    )
+    iodepth_submit: Dict[str, float] = field(
+        metadata={
+            "name": "Submission IO Depth Frequency Distribution",
+            "description": "Unclear from documentation.",
+        }
+    )
+    iodepth_complete: Dict[str, float] = field(
+        metadata={
+            "name": "Completed IO Depth Frequency Distribution",
+            "description": "Unclear from documentation.",
+        }
+    )
+    latency_depth: int = field(
+        metadata={
+            "name": "Latency Depth",
+            "description": "Latency queue depth.",
+        }
+    )
+    latency_target: int = field(
+        metadata={
+            "name": "Latency Target microseconds",
+            "description": "Maximum allowed latency.",
+        }
+    )
+    latency_percentile: float = field(
+        metadata={
+            "name": "Percent Beat Target Latency",
+            "description": "Proportion of IOs that beat the target latency.",
+        }
+    )
+    latency_window: int = field(
+        metadata={
+            "name": "Latency Window microseconds",
+            "description": (
+                """Used with Latency Target to specify the sample window"""
+                """that the job is run at varying queue depths to test """
+                """performance."""
+            ),
+        }
+    )
+    job_options: Optional[Dict[str, str]] = field(
+        default=None,
+        metadata={
+            "id": "job options",
+            "name": "Job Options",
+            "description": (
+                "Options passed to the fio executable. fio leaves them out "
+                "of its all-clients aggregate."
+            ),
+        },
+    )
+    latency_ns: Optional[Dict[str, float]] = field(
+        default=None,
+        metadata={
+            "name": "Nanosecond Latency Frequency Distribution",
+            "description": (
+                "Unclear from documentation. Left out below the full detail "
+                "level."
+            ),
+        },
+    )
+    latency_us: Optional[Dict[str, float]] = field(
+        default=None,
+        metadata={
+            "name": "Microsecond Latency Frequency Distribution",
+            "description": (
+                "Unclear from documentation. Left out below the full detail "
+                "level."
+            ),
+        },
+    )
+    latency_ms: Optional[Dict[str, float]] = field(
+        default=None,
+        metadata={
+            "name": "Millisecond Latency Frequency Distribution",
+            "description": (
+                "Unclear from documentation. Left out below the full detail "
+                "level."
+            ),
+        },
+    )
+    bw_log: Optional[TimeSeries] = field(
+        default=None,
+        metadata={
+            "name": "Bandwidth Log",
+            "description": "Bandwidth over time, when collected.",
+        },
+    )
+    iops_log: Optional[TimeSeries] = field(
+        default=None,
+        metadata={
+            "name": "IOPS Log",
+            "description": "IOPS over time, when collected.",
+        },
+    )
+    lat_log: Optional[TimeSeries] = field(
+        default=None,
+        metadata={
+            "name": "Latency Log",
+            "description": "Total latency over time, when collected.",
+        },
+    )
+    clat_log: Optional[TimeSeries] = field(
+        default=None,
+        metadata={
+            "name": "Completion Latency Log",
+            "description": "Completion latency over time, when collected.",
+        },
+    )
+    slat_log: Optional[TimeSeries] = field(
+        default=None,
+        metadata={
+            "name": "Submission Latency Log",
+            "description": "Submission latency over time, when collected.",
+        },
+    )
+    steadystate: Optional[SteadyState] = field(
+        default=None,
+        metadata={
+            "name": "Steady State",
+            "description": (
+                "Steady state detection results, for jobs with steadystate."
+            ),
+        },
+    )
+    placement: Optional[CpuPlacement] = field(
+        default=None,
+        metadata={
+            "name": "Placement",
+            "description": (
+                "CPU and NUMA placement the job ran with, when any was set."
+            ),
+        },
+    )
+    hostname: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "Hostname",
+            "description": "fio server the job ran on, in client mode.",
+        },
+    )
+    port: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Port",
+            "description": "Port of the fio server, in client mode.",
+        },
+    )
+
+
+@dataclass
+class DiskUtilization:
+    name: str = field(
+        metadata={
+            "name": "Device Name",
+            "description": "Name of the storage device.",
+        }
+    )
+    read_ios: int = field(
+        metadata={
+            "name": "Read IOs",
+            "description": "Quantity of read IO operations.",
+        }
+    )
+    write_ios: int = field(
+        metadata={
+            "name": "Write IOs",
+            "description": "Quantity of write IO operations.",
+        }
+    )
+    read_merges: int = field(
+        metadata={
+            "name": "Read Merges",
+            "description": (
+                "Quantity of read merges performed by IO scheduler."
+            ),
+        }
+    )
+    write_merges: int = field(
+        metadata={
+            "name": "Write Merges",
+            "description": (
+                "Quantity of write merges performed by IO scheduler."
+            ),
+        }
+    )
+    read_ticks: int = field(
+        metadata={
+            "name": "Read Ticks",
+            "description": "Quantity of read ticks that kept the device busy.",
+        }
+    )
+    write_ticks: int = field(
+        metadata={
+            "name": "Write Ticks",
+            "description": (
+                "Quantity of write ticks that kept the device busy."
+            ),
+        }
+    )
+    in_queue: int = field(
+        metadata={
+            "name": "Time in Queue",
+            "description": (
+                "Total time spent in device queue. No units are specified in"
+                " source, nor documentation."
+            ),
+        }
+    )
+    util: float = field(
+        metadata={
+            "name": "Device Utilization",
+            "description": "Proportion of time the device was busy.",
+        }
+    )
+    aggr_read_ios: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Workers' Read IOs",
+            "description": "Total read IO operations across all workers.",
+        },
+    )
+    aggr_write_ios: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Workers' Write IOs",
+            "description": "Total write IO operations across all workers.",
+        },
+    )
+    aggr_read_merges: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Workers' Read Merges",
+            "description": "Total read merges across all workers.",
+        },
+    )
+    aggr_write_merge: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Workers' Write Merges",
+            "description": "Total write merges across all workers.",
+        },
+    )
+    aggr_read_ticks: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Workers' Read Ticks",
+            "description": "Total read ticks across all workers.",
+        },
+    )
+    aggr_write_ticks: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Workers' Write Ticks",
+            "description": "Total write ticks across all workers.",
+        },
+    )
+    aggr_in_queue: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Workers' Time in Queue",
+            "description": "Total time in queue across all workers.",
+        },
+    )
+    aggr_util: Optional[float] = field(
+        default=None,
+        metadata={
+            "name": "Workers' Device Utilization",
+            "description": "Mean device utilization across all workers.",
+        },
+    )
+
+
+@dataclass
+class PhaseTiming:
+    phase: str = field(
+        metadata={
+            "name": "Phase",
+            "description": (
+                "render (writing the job file), fio (the fio process, from "
+                "start to exit), parse (reading fio's JSON), decode "
+                "(building the result dataclasses) or attach (reading "
+                "collected logs and placements)."
+            ),
+        }
+    )
+    wall_seconds: float = field(
+        metadata={
+            "name": "Wall Seconds",
+            "description": "Elapsed time spent in the phase.",
+        }
+    )
+    cpu_seconds: float = field(
+        metadata={
+            "name": "CPU Seconds",
+            "description": (
+                "CPU time of the plugin's thread in the phase. fio's own is "
+                "in the child usage."
+            ),
+        }
+    )
+
+
+@dataclass
+class ChildUsage:
+    utime: float = field(
+        metadata={
+            "name": "User Time",
+            "description": "User CPU seconds of the fio process.",
+        }
+    )
+    stime: float = field(
+        metadata={
+            "name": "System Time",
+            "description": "System CPU seconds of the fio process.",
+        }
+    )
+    maxrss: int = field(
+        metadata={
+            "name": "Max RSS",
+            "description": "Peak resident set size of fio in KiB.",
+        }
+    )
+    minflt: int = field(
+        metadata={
+            "name": "Minor Page Faults",
+            "description": "Page faults served without IO.",
+        }
+    )
+    majflt: int = field(
+        metadata={
+            "name": "Major Page Faults",
+            "description": "Page faults that required IO.",
+        }
+    )
+    inblock: int = field(
+        metadata={
+            "name": "Block Input",
+            "description": "File system input operations.",
+        }
+    )
+    oublock: int = field(
+        metadata={
+            "name": "Block Output",
+            "description": "File system output operations.",
+        }
+    )
+    nvcsw: int = field(
+        metadata={
+            "name": "Voluntary Context Switches",
+            "description": "Context switches while waiting, e.g. for IO.",
+        }
+    )
+    nivcsw: int = field(
+        metadata={
+            "name": "Involuntary Context Switches",
+            "description": "Context switches by preemption.",
+        }
+    )
+
+
+@dataclass
+class Instrumentation:
+    phases: typing.List[PhaseTiming] = field(
+        metadata={
+            "name": "Phases",
+            "description": (
+                "Time of each phase of the plugin's run, in the order first "
+                "entered. A phase's time excludes phases nested in it."
             ),
         }
     )
-    slat_ns: IoLatency = field(
+    child: Optional[ChildUsage] = field(
+        default=None,
         metadata={
-            "name": "Submission Latency ns",
-            "description": "Submission latency in nanoseconds",
+            "name": "Child Usage",
+            "description": (
+                "Resource usage of the fio process from wait4."
+            ),
+        },
+    )
+
+
+@dataclass
+class FioSuccessOutput:
+    fio_version: str = field(
+        metadata={
+            "id": "fio version",
+            "name": "Fio version",
+            "description": "Fio version used on job",
         }
     )
-    clat_ns: IoLatency = field(
+    timestamp: int = field(
         metadata={
-            "name": "Completion Latency ns",
-            "description": "Completion latency in nanoseconds",
+            "name": "Timestamp",
+            "description": "POSIX compliant timestamp in seconds",
         }
     )
-    lat_ns: IoLatency = field(
+    timestamp_ms: int = field(
         metadata={
-            "name": "Latency ns",
-            "description": "Total latency in nanoseconds.",
+            "name": "timestamp ms",
+            "description": "POSIX compliant timestamp in milliseconds",
         }
     )
-    bw_min: int = field(
+    time: str = field(
         metadata={
-            "name": "Bandwidth Min",
-            "description": "Bandwidth minimum",
+            "name": "Time",
+            "description": "Human readable datetime string",
         }
     )
-    bw_max: int = field(
+    jobs: typing.List[JobResult] = field(
         metadata={
-            "name": "Bandwidth Max",
-            "description": "Bandwidth maximum",
+            "name": "Jobs",
+            "description": "List of job input parameter configurations",
         }
     )
-    bw_agg: float = field(
+    global_options: Optional[Dict[str, str]] = field(
+        default=None,
         metadata={
-            "name": "Bandwidth Aggregate Percentile",
-            "description": "",
+            "id": "global options",
+            "name": "global options",
+            "description": "Options applied to every job",
+        },
+    )
+    disk_util: Optional[typing.List[DiskUtilization]] = field(
+        default=None,
+        metadata={
+            "name": "Disk Utlization",
+            "description": "Disk utilization during job",
+        },
+    )
+    instrumentation: Optional[Instrumentation] = field(
+        default=None,
+        metadata={
+            "name": "Instrumentation",
+            "description": (
+                "Phase timings and fio's resource usage, when instrumentation "
+                "was requested."
+            ),
+        },
+    )
+    max_seconds: Optional[float] = field(
+        default=None,
+        metadata={
+            "name": "Max Seconds",
+            "description": (
+                "Upper bound of the run's wall-clock time from its sections' "
+                "startdelay, ramp_time and runtime, which pipelines can "
+                "schedule steps by. Absent unless every section sets runtime."
+            ),
+        },
+    )
+
+
+@dataclass
+class TargetOutput:
+    target: str = field(
+        metadata={
+            "name": "Target",
+            "description": "File, device or directory the job ran against.",
         }
     )
-    bw_mean: float = field(
+    output: FioSuccessOutput = field(
         metadata={
-            "name": "Bandwidth Mean",
-            "description": "Bandwidth mean",
+            "name": "Output",
+            "description": "Fio results for this target.",
         }
     )
-    bw_dev: float = field(
+    cpus_allowed: Optional[str] = field(
+        default=None,
         metadata={
-            "name": "Bandwidth Std Dev",
-            "description": "Bandwidth standard deviation",
+            "name": "CPUs Allowed",
+            "description": "CPUs the target's fio process was pinned to.",
+        },
+    )
+
+
+@dataclass
+class FioErrorOutput:
+    error: str = field(
+        metadata={
+            "name": "Job Error Traceback",
+            "description": "Fio job traceback for debugging",
         }
     )
-    bw_samples: int = field(
+    partial_output: Optional[FioSuccessOutput] = field(
+        default=None,
         metadata={
-            "name": "Bandwidth Sample Quantity",
-            "description": "Quantity of bandwidth samples collected",
+            "name": "Partial Output",
+            "description": (
+                "Results fio wrote before the run failed or was interrupted: "
+                "the last interim report when status_interval was set, else "
+                "whatever json+ output fio left behind."
+            ),
+        },
+    )
+    exit_code: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Exit Code",
+            "description": "Exit status of fio, if it exited.",
+        },
+    )
+    signal: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "Signal",
+            "description": "Name of the signal that ended fio, if one did.",
+        },
+    )
+    timed_out: Optional[bool] = field(
+        default=None,
+        metadata={
+            "name": "Timed Out",
+            "description": "Whether fio was stopped at the run's deadline.",
+        },
+    )
+    stderr: Optional[str] = field(
+        default=None,
+        metadata={
+            "name": "Standard Error",
+            "description": "The last 64 KiB fio wrote to standard error.",
+        },
+    )
+    partial_targets: Optional[typing.List[TargetOutput]] = field(
+        default=None,
+        metadata={
+            "name": "Partial Targets",
+            "description": (
+                "Results of the targets that succeeded when others failed, "
+                "in the order given."
+            ),
+        },
+    )
+
+
+@dataclass
+class InterimSnapshot:
+    timestamp_ms: int = field(
+        metadata={
+            "name": "Timestamp ms",
+            "description": (
+                "POSIX timestamp in milliseconds at which the plugin received "
+                "the report."
+            ),
         }
     )
-    iops_min: int = field(
+    output: FioSuccessOutput = field(
         metadata={
-            "name": "IOPS Min",
-            "description": "IO operations per second minimum",
+            "name": "Output",
+            "description": "Interim fio results up to this report.",
         }
     )
-    iops_max: int = field(
+
+
+@dataclass
+class FioFanOutOutput:
+    targets: typing.List[TargetOutput] = field(
         metadata={
-            "name": "IOPS Max",
-            "description": "IO operations per second maximum",
+            "name": "Targets",
+            "description": "Results of each target, in the order given.",
         }
     )
-    iops_mean: float = field(
+    aggregate: typing.List[JobResult] = field(
         metadata={
-            "name": "IOPS Mean",
-            "description": "IO operations per second mean",
+            "name": "Aggregate",
+            "description": (
+                "Results of each job summed across all targets, with latency "
+                "distributions merged from the binned latencies."
+            ),
         }
     )
-    iops_stddev: float = field(
+
+
+@dataclass
+class ServerOutput:
+    hostname: str = field(
         metadata={
-            "name": "IOPS Std Dev",
-            "description": "IO operations per second standard deviation",
+            "name": "Hostname",
+            "description": "fio server, as the client connected to it.",
         }
     )
-    iops_samples: int = field(
+    output: FioSuccessOutput = field(
         metadata={
-            "name": "IOPS Sample Quantity",
-            "description": "Quantity of IOPS samples collected",
+            "name": "Output",
+            "description": "Fio results of the jobs run on this server.",
         }
     )
+    port: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Port",
+            "description": "Port of the fio server.",
+        },
+    )
 
 
 @dataclass
-class JobResult:
+class FioClientOutput:
+    servers: typing.List[ServerOutput] = field(
+        metadata={
+            "name": "Servers",
+            "description": "Results of each server, in the order reported.",
+        }
+    )
+    aggregate: Optional[typing.List[JobResult]] = field(
+        default=None,
+        metadata={
+            "name": "Aggregate",
+            "description": (
+                "fio's all-clients results, summed across every server's "
+                "jobs. fio reports none for a single server."
+            ),
+        },
+    )
+
+
+@dataclass
+class MetricInterval:
     jobname: str = field(
         metadata={
             "name": "Job Name",
-            "description": "Name of the job configuration",
+            "description": "Name of the job.",
         }
     )
-    groupid: int = field(
+    direction: str = field(
         metadata={
-            "name": "Thread Group ID",
+            "name": "Direction",
+            "description": "IO direction: read, write or trim.",
+        }
+    )
+    metric: str = field(
+        metadata={
+            "name": "Metric",
             "description": (
-                "Identifying number for thread group used in a job."
+                "iops, bw_bytes, clat_mean_ns, or clat_p<percentile>_ns such "
+                "as clat_p99.9_ns."
             ),
         }
     )
-    error: int = field(
+    mean: float = field(
         metadata={
-            "name": "Error",
-            "description": "An error code thrown by the job.",
+            "name": "Mean",
+            "description": "Mean across the runs.",
         }
     )
-    eta: int = field(
+    stddev: float = field(
         metadata={
-            "name": "ETA",
+            "name": "Standard Deviation",
+            "description": "Sample standard deviation across the runs.",
+        }
+    )
+    low: float = field(
+        metadata={
+            "name": "Interval Low",
+            "description": "Lower bound of the confidence interval.",
+        }
+    )
+    high: float = field(
+        metadata={
+            "name": "Interval High",
+            "description": "Upper bound of the confidence interval.",
+        }
+    )
+    samples: typing.List[float] = field(
+        metadata={
+            "name": "Samples",
+            "description": "Value of every run, in order.",
+        }
+    )
+
+
+@dataclass
+class FioRepeatedOutput:
+    outputs: typing.List[FioSuccessOutput] = field(
+        metadata={
+            "name": "Outputs",
+            "description": "Output of every run, in order.",
+        }
+    )
+    intervals: typing.List[MetricInterval] = field(
+        metadata={
+            "name": "Intervals",
             "description": (
-                "Specifies when real-time estimates should be printed."
+                "Confidence intervals of every job and exercised direction."
             ),
         }
     )
-    elapsed: int = field(
+    converged: bool = field(
         metadata={
-            "name": "Time Elapsed s",
-            "description": "Execution time up to now in seconds.",
+            "name": "Converged",
+            "description": (
+                "Whether every interval got narrower than the requested "
+                "relative width, rather than the runs reaching max_runs."
+            ),
+        }
+    )
+
+
+@dataclass
+class SloSearch:
+    job: FioJob = field(
+        metadata={
+            "name": "Probe Job",
+            "description": (
+                "Job run for every probe, with rate_iops and iodepth set by "
+                "the search. Keep it short, e.g. a small size."
+            ),
         }
     )
-    job_options: Dict[str, str] = field(
+    percentile: float = field(
         metadata={
-            "id": "job options",
-            "name": "Job Options",
-            "description": "Options passed to the fio executable.",
+            "name": "Percentile",
+            "description": "Completion latency percentile of the SLO.",
+        }
+    )
+    latency_threshold_ns: typing.Annotated[int, validation.min(1)] = field(
+        metadata={
+            "name": "Latency Threshold ns",
+            "description": (
+                "Completion latency in nanoseconds the percentile must stay "
+                "within."
+            ),
+        }
+    )
+    max_rate_iops: typing.Annotated[int, validation.min(1)] = field(
+        metadata={
+            "name": "Max Rate IOPS",
+            "description": "Highest rate_iops to consider.",
+        }
+    )
+    min_rate_iops: typing.Annotated[int, validation.min(1)] = field(
+        default=1,
+        metadata={
+            "name": "Min Rate IOPS",
+            "description": "Lowest rate_iops to consider.",
+        },
+    )
+    max_iodepth: typing.Annotated[Optional[int], validation.min(1)] = field(
+        default=None,
+        metadata={
+            "name": "Max IO Depth",
+            "description": (
+                "Allow the search to double iodepth up to this value when "
+                "the device meets the latency target but not the rate."
+            ),
+        },
+    )
+    tolerance: float = field(
+        default=0.05,
+        metadata={
+            "name": "Tolerance",
+            "description": (
+                "Stop once the bracket around the best rate is narrower than "
+                "this fraction of it. Probes achieving less than this "
+                "fraction below the requested rate count as not sustained."
+            ),
+        },
+    )
+    max_probes: typing.Annotated[int, validation.min(1)] = field(
+        default=12,
+        metadata={
+            "name": "Max Probes",
+            "description": "Maximum number of fio runs.",
+        },
+    )
+
+    def __post_init__(self):
+        if not 0 < self.percentile <= 100:
+            raise ValueError("percentile must be in (0, 100]")
+        if not 0 <= self.tolerance < 1:
+            raise ValueError("tolerance must be in [0, 1)")
+        if self.min_rate_iops > self.max_rate_iops:
+            raise ValueError("min_rate_iops exceeds max_rate_iops")
+
+
+@dataclass
+class SloProbe:
+    rate_iops: int = field(
+        metadata={
+            "name": "Rate IOPS",
+            "description": "rate_iops the probe ran with.",
+        }
+    )
+    iodepth: int = field(
+        metadata={
+            "name": "IO Depth",
+            "description": "iodepth the probe ran with.",
         }
     )
-    read: AioOutput = field(
+    iops: float = field(
         metadata={
-            "name": "Read",
-            "description": "Read IO results.",
+            "name": "IOPS",
+            "description": "IOPS achieved across all jobs and directions.",
         }
     )
-    write: AioOutput = field(
+    latency_ns: int = field(
         metadata={
-            "name": "Write",
-            "description": "Write IO results.",
+            "name": "Latency ns",
+            "description": "Completion latency at the SLO percentile.",
         }
     )
-    trim: AioOutput = field(
+    meets_slo: bool = field(
         metadata={
-            "name": "Trim",
-            "description": "Trim IO results.",
+            "name": "Meets SLO",
+            "description": (
+                "The latency target was met and every job sustained the "
+                "requested rate in each IO direction it exercises."
+            ),
         }
     )
-    sync: SyncIoOutput = field(
+
+
+@dataclass
+class SloSearchOutput:
+    probes: typing.List[SloProbe] = field(
         metadata={
-            "name": "Synchronous",
-            "description": "Synchronous IO results.",
+            "name": "Probes",
+            "description": "Every probe run, in order.",
         }
     )
-    job_runtime: int = field(
+    converged: bool = field(
         metadata={
-            "name": "Runtime",
-            "description": "Execution time used on this job.",
+            "name": "Converged",
+            "description": (
+                "The search narrowed down the best rate within tolerance "
+                "before running out of probes."
+            ),
         }
     )
-    usr_cpu: float = field(
+    best: Optional[SloProbe] = field(
+        default=None,
         metadata={
-            "name": "User CPU",
-            "description": "CPU usage in user space.",
-        }
+            "name": "Best Probe",
+            "description": "Highest-rate probe that met the SLO.",
+        },
     )
-    sys_cpu: float = field(
+    best_params: Optional[JobParams] = field(
+        default=None,
         metadata={
-            "name": "System CPU",
-            "description": "CPU usage in kernel (system) space.",
-        }
+            "name": "Best Parameters",
+            "description": "Job parameters of the best probe.",
+        },
     )
-    ctx: int = field(
+
+
+@dataclass
+class FioSweep:
+    job: FioJob = field(
         metadata={
-            "name": "Context Switches",
+            "name": "Base Job",
             "description": (
-                "Quantity of voluntary and involuntary context switches."
+                "Job every sweep point starts from. The swept parameters are "
+                "set on all of its sections."
             ),
         }
     )
-    majf: int = field(
+    parameters: Dict[str, typing.List[str]] = field(
         metadata={
-            "name": "Major Page Fault",
-            "description": "Quantity of page faults requring physical IO.",
+            "name": "Parameters",
+            "description": (
+                "Values to sweep for each job parameter, e.g. iodepth, "
+                "ioengine, readwrite or rate_iops. Every combination is run."
+            ),
         }
     )
-    minf: int = field(
+    exclude: Optional[typing.List[Dict[str, str]]] = field(
+        default=None,
         metadata={
-            "name": "Minor Page Fault",
+            "name": "Exclude",
             "description": (
-                "Quantity of page faults not requiring physical IO."
+                "Combinations to skip: a point is skipped if it has all the "
+                "parameter values of any one entry."
             ),
-        }
+        },
     )
-    iodepth_level: Dict[str, float] = field(
+    checkpoint_file: Optional[str] = field(
+        default=None,
         metadata={
-            "name": "Total IO Depth Frequency Distribution",
-            "description": "Unclear from documentation.",
-        }
+            "name": "Checkpoint File",
+            "description": (
+                "File recording completed points. A sweep restarted with the "
+                "same file does not run them again."
+            ),
+        },
     )
-    iodepth_submit: Dict[str, float] = field(
+
+
+@dataclass
+class SweepRow:
+    point: Dict[str, str] = field(
         metadata={
-            "name": "Submission IO Depth Frequency Distribution",
-            "description": "Unclear from documentation.",
+            "name": "Point",
+            "description": "Swept parameter values of this run.",
         }
     )
-    iodepth_complete: Dict[str, float] = field(
+    job_hash: str = field(
         metadata={
-            "name": "Completed IO Depth Frequency Distribution",
-            "description": "Unclear from documentation.",
+            "name": "Job Hash",
+            "description": "SHA-256 of the fio job file of this point.",
         }
     )
-    latency_ns: Dict[str, float] = field(
+    jobname: str = field(
         metadata={
-            "name": "Nanosecond Latency Frequency Distribution",
-            "description": "Unclear from documentation.",
+            "name": "Job Name",
+            "description": "Name of the job section.",
         }
     )
-    latency_us: Dict[str, float] = field(
+    direction: str = field(
         metadata={
-            "name": "Microsecond Latency Frequency Distribution",
-            "description": "Unclear from documentation.",
+            "name": "Direction",
+            "description": "IO direction: read, write or trim.",
         }
     )
-    latency_ms: Dict[str, float] = field(
+    iops: float = field(
         metadata={
-            "name": "Millisecond Latency Frequency Distribution",
-            "description": "Unclear from documentation.",
+            "name": "IOPS",
+            "description": "IO operations per second.",
         }
     )
-    latency_depth: int = field(
+    bw_bytes: int = field(
         metadata={
-            "name": "Latency Depth",
-            "description": "Latency queue depth.",
+            "name": "Bandwidth B",
+            "description": "Bandwidth in bytes per second.",
         }
     )
-    latency_target: int = field(
+    clat_mean_ns: float = field(
         metadata={
-            "name": "Latency Target microseconds",
-            "description": "Maximum allowed latency.",
+            "name": "Completion Latency Mean ns",
+            "description": "Mean completion latency.",
         }
     )
-    latency_percentile: float = field(
+    clat_p50_ns: Optional[int] = field(
+        default=None,
         metadata={
-            "name": "Percent Beat Target Latency",
-            "description": "Proportion of IOs that beat the target latency.",
-        }
+            "name": "Completion Latency p50 ns",
+            "description": "Median completion latency.",
+        },
     )
-    latency_window: int = field(
+    clat_p99_ns: Optional[int] = field(
+        default=None,
         metadata={
-            "name": "Latency Window microseconds",
-            "description": (
-                """Used with Latency Target to specify the sample window"""
-                """that the job is run at varying queue depths to test """
-                """performance."""
-            ),
-        }
+            "name": "Completion Latency p99 ns",
+            "description": "99th percentile completion latency.",
+        },
+    )
+    clat_p99_9_ns: Optional[int] = field(
+        default=None,
+        metadata={
+            "name": "Completion Latency p99.9 ns",
+            "description": "99.9th percentile completion latency.",
+        },
     )
 
 
 @dataclass
-class DiskUtilization:
-    name: str = field(
-        metadata={
-            "name": "Device Name",
-            "description": "Name of the storage device.",
-        }
-    )
-    read_ios: int = field(
+class FioSweepOutput:
+    rows: typing.List[SweepRow] = field(
         metadata={
-            "name": "Read IOs",
-            "description": "Quantity of read IO operations.",
+            "name": "Rows",
+            "description": (
+                "One row per point, job section and IO direction that did IO."
+            ),
         }
     )
-    write_ios: int = field(
+    runs: int = field(
         metadata={
-            "name": "Write IOs",
-            "description": "Quantity of write IO operations.",
+            "name": "Runs",
+            "description": "Fio invocations made by this sweep.",
         }
     )
-    read_merges: int = field(
+    resumed: int = field(
         metadata={
-            "name": "Read Merges",
-            "description": (
-                "Quantity of read merges performed by IO scheduler."
-            ),
+            "name": "Resumed",
+            "description": "Points taken from the checkpoint file.",
         }
     )
-    write_merges: int = field(
+    deduplicated: int = field(
         metadata={
-            "name": "Write Merges",
+            "name": "Deduplicated",
             "description": (
-                "Quantity of write merges performed by IO scheduler."
+                "Points whose job file matched an earlier point of this "
+                "sweep and so were not run again."
             ),
         }
     )
-    read_ticks: int = field(
+
+
+@dataclass
+class FioCompare:
+    baseline: FioSuccessOutput = field(
         metadata={
-            "name": "Read Ticks",
-            "description": "Quantity of read ticks that kept the device busy.",
+            "name": "Baseline",
+            "description": "Earlier output to compare against.",
         }
     )
-    write_ticks: int = field(
+    candidate: FioSuccessOutput = field(
         metadata={
-            "name": "Write Ticks",
+            "name": "Candidate",
             "description": (
-                "Quantity of write ticks that kept the device busy."
+                "New output of the same job file, with its jobs in the same "
+                "order."
             ),
         }
     )
-    in_queue: int = field(
+    iops_threshold: float = field(
+        default=0.05,
         metadata={
-            "name": "Time in Queue",
+            "name": "IOPS Threshold",
             "description": (
-                "Total time spent in device queue. No units are specified in"
-                " source, nor documentation."
+                "Relative change in IOPS beyond which it counts as a "
+                "regression or improvement."
             ),
-        }
+        },
     )
-    util: float = field(
+    bw_threshold: float = field(
+        default=0.05,
         metadata={
-            "name": "Device Utilization",
-            "description": "Proportion of time the device was busy.",
-        }
+            "name": "Bandwidth Threshold",
+            "description": "Relative change in bandwidth that counts.",
+        },
     )
-    aggr_read_ios: Optional[int] = field(
-        default=None,
+    latency_threshold: float = field(
+        default=0.1,
         metadata={
-            "name": "Workers' Read IOs",
-            "description": "Total read IO operations across all workers.",
+            "name": "Latency Threshold",
+            "description": (
+                "Relative change in a completion latency percentile that "
+                "counts."
+            ),
         },
     )
-    aggr_write_ios: Optional[int] = field(
+    percentiles: Optional[typing.List[float]] = field(
         default=None,
         metadata={
-            "name": "Workers' Write IOs",
-            "description": "Total write IO operations across all workers.",
+            "name": "Percentiles",
+            "description": (
+                "Completion latency percentiles to compare, 99 and 99.9 by "
+                "default."
+            ),
         },
     )
-    aggr_read_merges: Optional[int] = field(
-        default=None,
+    significance: float = field(
+        default=0.01,
         metadata={
-            "name": "Workers' Read Merges",
-            "description": "Total read merges across all workers.",
+            "name": "Significance",
+            "description": (
+                "Largest p-value of the two-sample Kolmogorov-Smirnov test "
+                "on the completion latency bins that counts as a change of "
+                "distribution."
+            ),
         },
     )
-    aggr_write_merge: Optional[int] = field(
-        default=None,
+    distribution_threshold: float = field(
+        default=0.05,
         metadata={
-            "name": "Workers' Write Merges",
-            "description": "Total write merges across all workers.",
+            "name": "Distribution Threshold",
+            "description": (
+                "Smallest Kolmogorov-Smirnov distance, the largest gap "
+                "between the two cumulative distributions, that counts as a "
+                "change of distribution. With millions of IOs even "
+                "negligible shifts are significant, this keeps them out."
+            ),
         },
     )
-    aggr_read_ticks: Optional[int] = field(
-        default=None,
+
+    def __post_init__(self):
+        for name in (
+            "iops_threshold",
+            "bw_threshold",
+            "latency_threshold",
+            "distribution_threshold",
+        ):
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name} must not be negative")
+        if not 0 < self.significance < 1:
+            raise ValueError("significance must be in (0, 1)")
+        if not all(0 < p <= 100 for p in self.percentiles or []):
+            raise ValueError("percentiles must be in (0, 100]")
+
+
+@dataclass
+class MetricChange:
+    metric: str = field(
         metadata={
-            "name": "Workers' Read Ticks",
-            "description": "Total read ticks across all workers.",
-        },
+            "name": "Metric",
+            "description": "iops, bw_bytes or clat_p<percentile>_ns.",
+        }
     )
-    aggr_write_ticks: Optional[int] = field(
-        default=None,
+    baseline: float = field(
         metadata={
-            "name": "Workers' Write Ticks",
-            "description": "Total write ticks across all workers.",
-        },
+            "name": "Baseline",
+            "description": "Value in the baseline.",
+        }
     )
-    aggr_in_queue: Optional[int] = field(
-        default=None,
+    candidate: float = field(
         metadata={
-            "name": "Workers' Time in Queue",
-            "description": "Total time in queue across all workers.",
-        },
+            "name": "Candidate",
+            "description": "Value in the candidate.",
+        }
     )
-    aggr_util: Optional[float] = field(
-        default=None,
+    change: float = field(
         metadata={
-            "name": "Workers' Device Utilization",
-            "description": "Mean device utilization across all workers.",
-        },
+            "name": "Change",
+            "description": "Relative change from baseline to candidate.",
+        }
     )
-
-
-@dataclass
-class FioErrorOutput:
-    error: str = field(
+    verdict: Verdict = field(
         metadata={
-            "name": "Job Error Traceback",
-            "description": "Fio job traceback for debugging",
+            "name": "Verdict",
+            "description": "Whether the change crosses its threshold.",
         }
     )
 
 
 @dataclass
-class FioSuccessOutput:
-    fio_version: str = field(
+class DirectionComparison:
+    jobname: str = field(
         metadata={
-            "id": "fio version",
-            "name": "Fio version",
-            "description": "Fio version used on job",
+            "name": "Job Name",
+            "description": "Name of the job.",
         }
     )
-    timestamp: int = field(
+    direction: str = field(
         metadata={
-            "name": "Timestamp",
-            "description": "POSIX compliant timestamp in seconds",
+            "name": "Direction",
+            "description": "IO direction: read, write or trim.",
         }
     )
-    timestamp_ms: int = field(
+    verdict: Verdict = field(
         metadata={
-            "name": "timestamp ms",
-            "description": "POSIX compliant timestamp in milliseconds",
+            "name": "Verdict",
+            "description": (
+                "regression if any metric or the latency distribution "
+                "regressed, else improvement if any improved."
+            ),
         }
     )
-    time: str = field(
+    metrics: typing.List[MetricChange] = field(
         metadata={
-            "name": "Time",
-            "description": "Human readable datetime string",
+            "name": "Metrics",
+            "description": "Change of every compared metric.",
         }
     )
-    jobs: typing.List[JobResult] = field(
+    ks_statistic: Optional[float] = field(
+        default=None,
         metadata={
-            "name": "Jobs",
-            "description": "List of job input parameter configurations",
-        }
+            "name": "KS Statistic",
+            "description": (
+                "Kolmogorov-Smirnov distance between the completion latency "
+                "distributions, when both outputs have bins."
+            ),
+        },
     )
-    global_options: Optional[Dict[str, str]] = field(
+    ks_p_value: Optional[float] = field(
         default=None,
         metadata={
-            "id": "global options",
-            "name": "global options",
-            "description": "Options applied to every job",
+            "name": "KS p-value",
+            "description": (
+                "Asymptotic p-value of the distance. Binning ties samples, "
+                "which makes it conservative."
+            ),
         },
     )
-    disk_util: Optional[typing.List[DiskUtilization]] = field(
+    distribution_verdict: Optional[Verdict] = field(
         default=None,
         metadata={
-            "name": "Disk Utlization",
-            "description": "Disk utilization during job",
+            "name": "Distribution Verdict",
+            "description": (
+                "regression if the candidate's latencies are significantly "
+                "shifted up, improvement if down."
+            ),
         },
     )
 
 
+@dataclass
+class FioCompareOutput:
+    comparisons: typing.List[DirectionComparison] = field(
+        metadata={
+            "name": "Comparisons",
+            "description": "Verdict of every job and exercised direction.",
+        }
+    )
+    regression: bool = field(
+        metadata={
+            "name": "Regression",
+            "description": "Whether any comparison is a regression.",
+        }
+    )
+
+
 fio_input_schema = plugin.build_object_schema(FioJob)
 job_schema = plugin.build_object_schema(JobResult)
 fio_output_schema = plugin.build_object_schema(FioSuccessOutput)
+snapshot_schema = plugin.build_object_schema(InterimSnapshot)
+job_params_schema = plugin.build_object_schema(JobParams)
+sweep_row_schema = plugin.build_object_schema(SweepRow)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import typing
+
+from fio_histogram import LatencyHistogram
+from fio_schema import FioSuccessOutput, SloProbe, SloSearch
+
+
+def completion_latency(output: FioSuccessOutput, percentile: float) -> int:
+    """Completion latency at percentile across every job and IO direction
+    of output, from the merged json+ bins."""
+    latencies = [
+        getattr(job, direction).clat_ns
+        for job in output.jobs
+        for direction in ("read", "write", "trim")
+        if getattr(job, direction).clat_ns.N
+    ]
+    if not latencies:
+        raise ValueError("the probe completed no IO")
+    if all(latency.bins for latency in latencies):
+        return LatencyHistogram.merged(
+            latency.histogram() for latency in latencies
+        ).percentile(percentile)
+    # without bins, fall back to the worst reported value at percentile
+    key = "{:.6f}".format(percentile)
+    reported = [
+        latency.percentile[key]
+        for latency in latencies
+        if latency.percentile and key in latency.percentile
+    ]
+    if not reported:
+        raise ValueError(f"fio did not report the {key} percentile")
+    return max(reported)
+
+
+def total_iops(output: FioSuccessOutput) -> float:
+    return sum(
+        job.read.iops + job.write.iops + job.trim.iops for job in output.jobs
+    )
+
+
+def sustained(
+    output: FioSuccessOutput,
+    rate_iops: int,
+    tolerance: float,
+    directions: typing.Dict[str, typing.Optional[typing.Tuple[str, ...]]],
+) -> bool:
+    """Whether every job of output reached rate_iops in each IO direction
+    its section exercises, within tolerance. fio applies rate_iops to each
+    direction of each job, numjobs clones included, so a sum across them
+    would pass a device short of the rate everywhere. A section without
+    known directions is judged on the directions it did IO in."""
+    for job in output.jobs:
+        active = directions.get(job.jobname)
+        if active is None:
+            active = [
+                direction
+                for direction in ("read", "write", "trim")
+                if getattr(job, direction).total_ios
+            ]
+        for direction in active:
+            if getattr(job, direction).iops < (1 - tolerance) * rate_iops:
+                return False
+    return True
+
+
+def search_rate(
+    search: SloSearch,
+    probe: typing.Callable[[int, int], FioSuccessOutput],
+) -> typing.Tuple[typing.List[SloProbe], typing.Optional[SloProbe], bool]:
+    """Bisect rate_iops for the highest rate whose completion latency at
+    search.percentile stays within search.latency_threshold_ns.
+
+    A rate the device falls short of is treated as too high, unless the
+    latency still meets the target while IO depth can be raised: then the
+    device is waiting on the queue, so the depth doubles and the same rate
+    is probed again. Returns the probes in order, the best passing probe
+    and whether the search converged within search.tolerance.
+    """
+    probes: typing.List[SloProbe] = []
+    best: typing.Optional[SloProbe] = None
+    iodepth = search.job.params.iodepth
+    low, high = search.min_rate_iops, search.max_rate_iops
+    rate = high
+    directions = search.job.section_directions()
+    while len(probes) < search.max_probes:
+        output = probe(rate, iodepth)
+        latency = completion_latency(output, search.percentile)
+        achieved = total_iops(output)
+        meets = latency <= search.latency_threshold_ns
+        result = SloProbe(
+            rate_iops=rate,
+            iodepth=iodepth,
+            iops=achieved,
+            latency_ns=latency,
+            meets_slo=meets
+            and sustained(output, rate, search.tolerance, directions),
+        )
+        probes.append(result)
+        if result.meets_slo:
+            best = result
+            low = rate
+        elif meets and search.max_iodepth and iodepth < search.max_iodepth:
+            iodepth = min(iodepth * 2, search.max_iodepth)
+            continue
+        else:
+            high = rate - 1
+        if high < low or high - low <= search.tolerance * high:
+            return probes, best, True
+        rate = (low + high + 1) // 2
+    return probes, best, False
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import math
+import typing
+
+from fio_histogram import LatencyHistogram
+from fio_schema import (
+    FioRepeatedOutput,
+    FioSuccessOutput,
+    MetricInterval,
+    RepetitionPolicy,
+)
+
+
+DEFAULT_PERCENTILES = (50.0, 99.0, 99.9)
+
+
+def _beta_fraction(a: float, b: float, x: float) -> float:
+    # continued fraction of the incomplete beta function, modified Lentz
+    tiny = 1e-300
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < 1e-15:
+            break
+    return result
+
+
+def _incomplete_beta(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(
+        math.lgamma(a + b)
+        - math.lgamma(a)
+        - math.lgamma(b)
+        + a * math.log(x)
+        + b * math.log1p(-x)
+    )
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _beta_fraction(a, b, x) / a
+    return 1.0 - front * _beta_fraction(b, a, 1.0 - x) / b
+
+
+def student_t_cdf(t: float, df: int) -> float:
+    tail = 0.5 * _incomplete_beta(df / 2.0, 0.5, df / (df + t * t))
+    return 1.0 - tail if t >= 0 else tail
+
+
+def student_t_quantile(p: float, df: int) -> float:
+    """t such that student_t_cdf(t, df) == p, by bisection."""
+    if p < 0.5:
+        return -student_t_quantile(1.0 - p, df)
+    low, high = 0.0, 1.0
+    while student_t_cdf(high, df) < p:
+        high *= 2.0
+    for _ in range(200):
+        middle = (low + high) / 2.0
+        if student_t_cdf(middle, df) < p:
+            low = middle
+        else:
+            high = middle
+        if high - low < 1e-12 * high:
+            break
+    return (low + high) / 2.0
+
+
+def confidence_interval(
+    samples: typing.Sequence[float], confidence: float
+) -> typing.Tuple[float, float, float, float]:
+    """Mean, sample standard deviation and the two-sided Student t
+    confidence interval of the mean of samples."""
+    n = len(samples)
+    mean = sum(samples) / n
+    if n < 2:
+        return mean, 0.0, mean, mean
+    stddev = math.sqrt(sum((x - mean) ** 2 for x in samples) / (n - 1))
+    half = (
+        student_t_quantile((1.0 + confidence) / 2.0, n - 1)
+        * stddev
+        / math.sqrt(n)
+    )
+    return mean, stddev, mean - half, mean + half
+
+
+def kolmogorov_survival(x: float) -> float:
+    """P(K > x) of the Kolmogorov distribution."""
+    if x <= 0:
+        return 1.0
+    total = 0.0
+    for j in range(1, 101):
+        term = (-1) ** (j - 1) * math.exp(-2.0 * j * j * x * x)
+        total += term
+        if abs(term) < 1e-12:
+            break
+    return min(max(2.0 * total, 0.0), 1.0)
+
+
+def ks_two_sample(
+    a: LatencyHistogram, b: LatencyHistogram
+) -> typing.Tuple[float, float, float]:
+    """Two-sample Kolmogorov-Smirnov test of binned latencies: the largest
+    amount by which a's cumulative distribution exceeds b's, i.e. b is
+    shifted towards higher latencies, the largest amount by which b's
+    exceeds a's, and the asymptotic p-value of the larger of the two."""
+    points = sorted(set(a.values) | set(b.values))
+    up = down = 0.0
+    for fa, fb in zip(a.cdf(points), b.cdf(points)):
+        up = max(up, fa - fb)
+        down = max(down, fb - fa)
+    n = a.total * b.total / (a.total + b.total)
+    root = math.sqrt(n)
+    p_value = kolmogorov_survival((root + 0.12 + 0.11 / root) * max(up, down))
+    return up, down, p_value
+
+
+def _metrics(
+    output: FioSuccessOutput, percentiles: typing.Sequence[float]
+) -> typing.Dict[typing.Tuple[int, str, str], typing.Tuple[str, float]]:
+    # keyed by job position, since numjobs repeats a job name
+    values = {}
+    for index, job in enumerate(output.jobs):
+        for direction in ("read", "write", "trim"):
+            result = getattr(job, direction)
+            if not result.total_ios:
+                continue
+            metrics = [
+                ("iops", result.iops),
+                ("bw_bytes", result.bw_bytes),
+                ("clat_mean_ns", result.clat_ns.mean),
+            ]
+            for p, value in zip(
+                percentiles, result.clat_ns.percentile_values(percentiles)
+            ):
+                if value is not None:
+                    metrics.append(("clat_p{:g}_ns".format(p), value))
+            for metric, value in metrics:
+                values[(index, direction, metric)] = (
+                    job.jobname,
+                    float(value),
+                )
+    return values
+
+
+def intervals(
+    outputs: typing.Sequence[FioSuccessOutput], policy: RepetitionPolicy
+) -> typing.List[MetricInterval]:
+    """Confidence interval of each metric present in every one of outputs."""
+    percentiles = policy.percentiles or DEFAULT_PERCENTILES
+    runs = [_metrics(output, percentiles) for output in outputs]
+    result = []
+    for key, (jobname, _) in runs[0].items():
+        if not all(key in run for run in runs):
+            continue
+        samples = [run[key][1] for run in runs]
+        mean, stddev, low, high = confidence_interval(
+            samples, policy.confidence
+        )
+        result.append(
+            MetricInterval(
+                jobname=jobname,
+                direction=key[1],
+                metric=key[2],
+                mean=mean,
+                stddev=stddev,
+                low=low,
+                high=high,
+                samples=samples,
+            )
+        )
+    return result
+
+
+def narrow_enough(
+    interval: MetricInterval, policy: RepetitionPolicy
+) -> bool:
+    if interval.mean == 0:
+        return interval.high == interval.low
+    return (interval.high - interval.low) <= policy.relative_width * abs(
+        interval.mean
+    )
+
+
+class Repetitions:
+    """Outputs of the runs made so far under a policy."""
+
+    def __init__(self, policy: RepetitionPolicy):
+        self.policy = policy
+        self.outputs: typing.List[FioSuccessOutput] = []
+
+    def add(
+        self, output: FioSuccessOutput
+    ) -> typing.Optional[FioRepeatedOutput]:
+        """Record the output of another run. Returns the repeated output once
+        every interval is narrower than the policy's relative width, after
+        at least min_runs runs, or after max_runs runs; None while another
+        run is needed."""
+        self.outputs.append(output)
+        if len(self.outputs) < self.policy.min_runs:
+            return None
+        current = intervals(self.outputs, self.policy)
+        converged = all(narrow_enough(i, self.policy) for i in current)
+        if converged or len(self.outputs) >= self.policy.max_runs:
+            return FioRepeatedOutput(list(self.outputs), current, converged)
+        return None
+
+
+def run_repetitions(
+    policy: RepetitionPolicy,
+    execute: typing.Callable[[], FioSuccessOutput],
+) -> FioRepeatedOutput:
+    repetitions = Repetitions(policy)
+    while True:
+        result = repetitions.add(execute())
+        if result is not None:
+            return result
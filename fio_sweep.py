@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import json
+import typing
+import hashlib
+import itertools
+from pathlib import Path
+from dataclasses import replace
+
+from fio_schema import (
+    FioJob,
+    FioSuccessOutput,
+    FioSweep,
+    FioSweepOutput,
+    SweepRow,
+    job_params_schema,
+    sweep_row_schema,
+)
+
+
+def expand_points(sweep: FioSweep) -> typing.List[typing.Dict[str, str]]:
+    """Cartesian product of the swept values, in the order given, without
+    the points matching an exclude entry."""
+    names = list(sweep.parameters)
+    points = [
+        dict(zip(names, values))
+        for values in itertools.product(
+            *(sweep.parameters[name] for name in names)
+        )
+    ]
+    return [
+        point
+        for point in points
+        if not any(
+            all(point.get(key) == value for key, value in exclude.items())
+            for exclude in sweep.exclude or []
+        )
+    ]
+
+
+def apply_point(job: FioJob, point: typing.Dict[str, str]) -> FioJob:
+    """job with the point's values set on every section, validated as if
+    they had been given in the job's input."""
+
+    def update(name, params):
+        serialized = job_params_schema.serialize(params)
+        for key in point:
+            if key not in job_params_schema.properties:
+                raise ValueError(f"'{key}' is not a job parameter")
+        serialized.update(point)
+        return job_params_schema.unserialize(serialized, (name,))
+
+    return job.map_sections(update)
+
+
+def job_hash(job: FioJob) -> str:
+    return hashlib.sha256(job.render().encode()).hexdigest()
+
+
+def tidy_rows(
+    output: FioSuccessOutput,
+    point: typing.Dict[str, str],
+    key: str,
+) -> typing.List[SweepRow]:
+    rows = []
+    for job in output.jobs:
+        for direction in ("read", "write", "trim"):
+            result = getattr(job, direction)
+            if not result.total_ios:
+                continue
+            p50, p99, p99_9 = result.clat_ns.percentile_values(
+                (50.0, 99.0, 99.9)
+            )
+            rows.append(
+                SweepRow(
+                    point=point,
+                    job_hash=key,
+                    jobname=job.jobname,
+                    direction=direction,
+                    iops=result.iops,
+                    bw_bytes=result.bw_bytes,
+                    clat_mean_ns=result.clat_ns.mean,
+                    clat_p50_ns=p50,
+                    clat_p99_ns=p99,
+                    clat_p99_9_ns=p99_9,
+                )
+            )
+    return rows
+
+
+def load_checkpoint(
+    path: typing.Optional[str],
+) -> typing.Dict[str, typing.List[SweepRow]]:
+    done: typing.Dict[str, typing.List[SweepRow]] = {}
+    if path is None or not Path(path).exists():
+        return done
+    with open(path) as checkpoint:
+        for line in checkpoint:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # the last line of an interrupted sweep may be cut short
+                continue
+            done[entry["job_hash"]] = [
+                sweep_row_schema.unserialize(row) for row in entry["rows"]
+            ]
+    return done
+
+
+def _save_checkpoint(
+    path: typing.Optional[str], key: str, rows: typing.List[SweepRow]
+):
+    if path is None:
+        return
+    line = json.dumps(
+        {
+            "job_hash": key,
+            "rows": [sweep_row_schema.serialize(row) for row in rows],
+        }
+    )
+    with open(path, "a") as checkpoint:
+        checkpoint.write(line + "\n")
+
+
+def run_sweep(
+    sweep: FioSweep,
+    execute: typing.Callable[[FioJob], FioSuccessOutput],
+) -> FioSweepOutput:
+    """Run every point of sweep with execute, once per distinct job file.
+    Each completed job file is appended to the checkpoint file before the
+    next point starts, so an interrupted sweep resumes where it stopped."""
+    # build every job up front so an invalid point fails before any run
+    points = [
+        (point, apply_point(sweep.job, point))
+        for point in expand_points(sweep)
+    ]
+    done = load_checkpoint(sweep.checkpoint_file)
+    ran: typing.Set[str] = set()
+    rows: typing.List[SweepRow] = []
+    resumed = deduplicated = 0
+    for point, job in points:
+        key = job_hash(job)
+        if key in ran:
+            deduplicated += 1
+        elif key in done:
+            resumed += 1
+        else:
+            done[key] = tidy_rows(execute(job), point, key)
+            ran.add(key)
+            _save_checkpoint(sweep.checkpoint_file, key, done[key])
+        rows.extend(replace(row, point=point) for row in done[key])
+    return FioSweepOutput(
+        rows=rows, runs=len(ran), resumed=resumed, deduplicated=deduplicated
+    )
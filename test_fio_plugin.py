@@ -1,15 +1,43 @@
 #!/usr/bin/env python3
 
+import os
+import time
+import shutil
+import socket
+import asyncio
+import subprocess
 import unittest
 import json
+import copy
+import pstats
+import tempfile
+import configparser
+from unittest import mock
+from dataclasses import replace
 from pathlib import Path
 import sys
 
 import yaml
-from arcaflow_plugin_sdk import plugin
+from arcaflow_plugin_sdk import plugin, schema
 
 import fio_plugin
 import fio_schema
+import fio_decode
+import fio_merge
+import fio_logs
+import fio_search
+import fio_sweep
+import fio_cache
+import fio_device
+import fio_detail
+import fio_stats
+import fio_compare
+import fio_client
+import fio_pack
+import fio_instrument
+import fio_pool
+import fio_iolog
+from fio_histogram import LatencyHistogram
 
 
 with open("fixtures/poisson-rate-submission_output-plus.json", "r") as fout:
@@ -25,6 +53,13 @@ poisson_submit_input = fio_schema.fio_input_schema.unserialize(
 )
 
 
+def write_fake_fio(directory: str, body: str):
+    """Put a stand-in fio running the python body into directory."""
+    fake_fio = Path(directory) / "fio"
+    fake_fio.write_text("#!{}\n{}".format(sys.executable, body))
+    fake_fio.chmod(0o755)
+
+
 class FioPluginTest(unittest.TestCase):
     @staticmethod
     def test_serialization():
@@ -43,28 +78,1607 @@ class FioPluginTest(unittest.TestCase):
             yaml.safe_load(poisson_submit_infile)
         )
         job.cleanup = False
-        output_id, output_data = fio_plugin.run(job)
+        with tempfile.TemporaryDirectory() as tmp:
+            job.work_dir = tmp
+            output_id, output_data = fio_plugin.run(job)
 
-        # if the command didn't succeed, fio-plus.json won't exist.
-        try:
-            self.assertEqual("success", output_id)
-        except AssertionError as e:
-            sys.stderr.write("Error: {}\n".format(output_data.error))
-            raise
+            # if the command didn't succeed, fio-plus.json won't exist.
+            try:
+                self.assertEqual("success", output_id)
+            except AssertionError as e:
+                sys.stderr.write("Error: {}\n".format(output_data.error))
+                raise
 
-        with open("fio-plus.json", "r") as fio_output_file:
-            fio_results = fio_output_file.read()
-            output_actual: fio_plugin.FioSuccessOutput = (
-                fio_schema.fio_output_schema.unserialize(
-                    json.loads(fio_results)
+            (work_dir,) = Path(tmp).iterdir()
+            self.assertTrue((work_dir / (job.name + ".0.0")).exists())
+            with open(work_dir / "fio-plus.json", "r") as fio_output_file:
+                fio_results = fio_output_file.read()
+                output_actual: fio_plugin.FioSuccessOutput = (
+                    fio_schema.fio_output_schema.unserialize(
+                        json.loads(fio_results)
+                    )
                 )
-            )
 
         self.assertEqual(output_data, output_actual)
 
-        Path("fio-plus.json").unlink(missing_ok=True)
-        Path("fio-input-tmp.fio").unlink(missing_ok=True)
-        Path(job.name + ".0.0").unlink(missing_ok=True)
+    @unittest.skipUnless(shutil.which("fio"), "needs fio")
+    def test_functional_clients(self):
+        ports = [8765 + 100 + index for index in range(2)]
+        with tempfile.TemporaryDirectory() as tmp:
+            servers = [
+                subprocess.Popen(
+                    ["fio", f"--server=localhost,{port}"], cwd=tmp
+                )
+                for port in ports
+            ]
+            try:
+                for port in ports:
+                    deadline = time.monotonic() + 10
+                    while True:
+                        try:
+                            socket.create_connection(
+                                ("localhost", port), 1
+                            ).close()
+                            break
+                        except OSError:
+                            if time.monotonic() > deadline:
+                                raise
+                            time.sleep(0.1)
+                job = fio_schema.fio_input_schema.unserialize(
+                    dict(
+                        yaml.safe_load(poisson_submit_infile),
+                        servers=[f"localhost,{port}" for port in ports],
+                        work_dir=tmp,
+                    )
+                )
+                output_id, output_data = fio_plugin.run(job)
+            finally:
+                for server in servers:
+                    server.terminate()
+                    server.wait()
+
+        self.assertEqual(
+            "clients", output_id, getattr(output_data, "error", None)
+        )
+        self.assertEqual(2, len(output_data.servers))
+        self.assertEqual(1, len(output_data.aggregate))
+
+    def test_clients(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            dict(
+                yaml.safe_load(poisson_submit_infile),
+                servers=["storage-1", "storage-2,8766"],
+            )
+        )
+        path = str(Path("mocks").absolute()) + os.pathsep + os.environ["PATH"]
+        env = {"PATH": path, "FAKE_FIO_JOBS": "2", "FAKE_FIO_BINS": "10"}
+        with mock.patch.dict(os.environ, env):
+            output_id, output_data = fio_plugin.run(job)
+
+        self.assertEqual("clients", output_id)
+        self.assertEqual(
+            [("storage-1", 8765), ("storage-2", 8766)],
+            [(server.hostname, server.port) for server in output_data.servers],
+        )
+        for server in output_data.servers:
+            self.assertEqual(2, len(server.output.jobs))
+        (aggregate,) = output_data.aggregate
+        self.assertEqual(fio_client.ALL_CLIENTS, aggregate.jobname)
+        self.assertIsNone(aggregate.job_options)
+        self.assertEqual(
+            sum(
+                job.read.iops
+                for server in output_data.servers
+                for job in server.output.jobs
+            ),
+            aggregate.read.iops,
+        )
+        plugin.test_object_serialization(output_data)
+        with self.assertRaises(ValueError):
+            fio_schema.fio_input_schema.unserialize(
+                dict(
+                    yaml.safe_load(poisson_submit_infile),
+                    servers=["storage-1"],
+                    targets=["/dev/nvme0n1"],
+                )
+            )
+
+    def test_write_multi_section_job_file(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            {
+                "name": "seq-writer",
+                "global_options": {"direct": "1", "size": "1m"},
+                "params": dict(
+                    yaml.safe_load(poisson_submit_infile)["params"],
+                    readwrite="write",
+                ),
+                "sections": [
+                    {
+                        "name": "rand-reader",
+                        "params": dict(
+                            yaml.safe_load(poisson_submit_infile)["params"],
+                            stonewall=1,
+                        ),
+                    }
+                ],
+            }
+        )
+        plugin.test_object_serialization(job)
+        with tempfile.TemporaryDirectory() as tmp:
+            job_file = Path(tmp) / "job.fio"
+            job.write_params_to_file(job_file)
+            cfg = configparser.ConfigParser(interpolation=None)
+            cfg.read(job_file)
+
+        self.assertEqual(
+            ["global", "seq-writer", "rand-reader"], cfg.sections()
+        )
+        self.assertEqual("1", cfg["global"]["direct"])
+        self.assertEqual("write", cfg["seq-writer"]["readwrite"])
+        self.assertNotIn("stonewall", cfg["seq-writer"])
+        self.assertEqual("randrw", cfg["rand-reader"]["readwrite"])
+        self.assertEqual("1", cfg["rand-reader"]["stonewall"])
+
+        job.sections.append(job.sections[0])
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(ValueError):
+                job.write_params_to_file(Path(tmp) / "job.fio")
+
+    def test_time_based(self):
+        params = yaml.safe_load(poisson_submit_infile)["params"]
+        job_params = fio_schema.job_params_schema.unserialize(
+            dict(
+                params,
+                runtime="2m",
+                time_based=1,
+                ramp_time="10s",
+                startdelay="500ms",
+            )
+        )
+        options = job_params.to_options()
+        self.assertEqual("2m", options["runtime"])
+        self.assertEqual("1", options["time_based"])
+        self.assertEqual("10s", options["ramp_time"])
+        self.assertEqual(130.5, job_params.max_seconds())
+        with self.assertRaises(ValueError):
+            fio_schema.job_params_schema.unserialize(
+                dict(params, time_based=1)
+            )
+        with self.assertRaises(schema.ConstraintException):
+            fio_schema.job_params_schema.unserialize(
+                dict(params, runtime="1 minute")
+            )
+
+        job = replace(
+            poisson_submit_input,
+            params=job_params,
+            sections=[
+                fio_schema.JobSection(
+                    "concurrent", replace(job_params, runtime="30s")
+                ),
+                fio_schema.JobSection(
+                    "after", replace(job_params, stonewall=1)
+                ),
+            ],
+        )
+        self.assertEqual(261.0, job.max_seconds())
+        self.assertIsNone(poisson_submit_input.max_seconds())
+        path = str(Path("mocks").absolute()) + os.pathsep + os.environ["PATH"]
+        with mock.patch.dict(os.environ, {"PATH": path}):
+            _, output = fio_plugin.run(job)
+            _, unbounded = fio_plugin.run(poisson_submit_input)
+        self.assertEqual(261.0, output.max_seconds)
+        self.assertIsNone(unbounded.max_seconds)
+
+    def test_steadystate(self):
+        params = yaml.safe_load(poisson_submit_infile)["params"]
+        job_params = fio_schema.job_params_schema.unserialize(
+            dict(
+                params,
+                steadystate="iops_slope:0.1%",
+                steadystate_duration="300s",
+                steadystate_ramp_time="1m",
+            )
+        )
+        self.assertEqual(
+            "iops_slope:0.1%", job_params.to_options()["steadystate"]
+        )
+        with self.assertRaises(schema.ConstraintException):
+            fio_schema.job_params_schema.unserialize(
+                dict(
+                    params,
+                    steadystate="latency:1%",
+                    steadystate_duration="300s",
+                )
+            )
+        with self.assertRaises(ValueError):
+            fio_schema.job_params_schema.unserialize(
+                dict(params, steadystate="bw:10")
+            )
+
+        raw = json.loads(poisson_submit_outfile)["jobs"][0]
+        # as fio writes it for a job with steadystate
+        raw["steadystate"] = {
+            "ss": "iops_slope",
+            "duration": 300,
+            "attained": 1,
+            "criterion": "0.100000%",
+            "max_deviation": 1.5,
+            "slope": 0.042,
+            "data": {
+                "bw_mean": 204800,
+                "iops_mean": 50,
+                "iops": [49, 50, 51],
+                "bw": [200704, 204800, 208896],
+            },
+        }
+        with self.assertRaises(ValueError):
+            fio_schema.job_params_schema.unserialize(
+                dict(
+                    params,
+                    steadystate="iops:5%",
+                    steadystate_duration="5m",
+                    runtime="60",
+                )
+            )
+        job = fio_decode.decode_job(raw, fio_decode.DecodeMode.verify)
+        self.assertEqual(1, job.steadystate.attained)
+        self.assertEqual([49, 50, 51], job.steadystate.data.iops)
+        plugin.test_object_serialization(job)
+
+    def test_fanout(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            dict(
+                yaml.safe_load(poisson_submit_infile),
+                targets=["/mnt/a", "/mnt/b", "/mnt/c"],
+                target_option="directory",
+                max_workers=2,
+                pin_cpus=True,
+            )
+        )
+        for options in (
+            {"status_interval": 1},
+            {"status_interval": 1, "snapshot_file": "s"},
+        ):
+            with self.assertRaises(ValueError):
+                replace(job, **options)
+        expected = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        jobs_run = []
+
+        def fake_run_fio(params, work_dir):
+            jobs_run.append(params)
+            return expected
+
+        with mock.patch.object(fio_plugin, "_run_fio", fake_run_fio):
+            output_id, output_data = fio_plugin.run(job)
+
+        self.assertEqual("fanout", output_id)
+        self.assertEqual(
+            ["/mnt/a", "/mnt/b", "/mnt/c"],
+            sorted(params.params.directory for params in jobs_run),
+        )
+        self.assertTrue(
+            all(p.global_options["cpus_allowed"] for p in jobs_run)
+        )
+        self.assertEqual(
+            ["/mnt/a", "/mnt/b", "/mnt/c"],
+            [target.target for target in output_data.targets],
+        )
+        aggregate = output_data.aggregate[0]
+        single = expected.jobs[0]
+        self.assertEqual(3 * single.read.clat_ns.N, aggregate.read.clat_ns.N)
+        self.assertEqual(
+            single.read.clat_ns.percentile, aggregate.read.clat_ns.percentile
+        )
+        self.assertAlmostEqual(3 * single.read.iops, aggregate.read.iops)
+        plugin.test_object_serialization(output_data)
+
+    def test_fanout_partial_failure(self):
+        expected = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            targets = [str(Path(tmp) / name) for name in ("a", "b")]
+            job = fio_schema.fio_input_schema.unserialize(
+                dict(
+                    yaml.safe_load(poisson_submit_infile),
+                    targets=targets,
+                    target_option="directory",
+                )
+            )
+
+            def fake_run_fio(params, work_dir):
+                target = Path(params.params.directory)
+                target.mkdir()
+                # the files of two numjobs clones, and one of the user's
+                for clone in ("0.0", "1.0", "keep"):
+                    (target / f"{params.name}.{clone}").touch()
+                if target.name == "b":
+                    raise fio_plugin.FioRunError("fio failed", None)
+                return expected
+
+            with mock.patch.object(fio_plugin, "_run_fio", fake_run_fio):
+                output_id, output_data = fio_plugin.run(job)
+            for target in targets:
+                self.assertEqual(
+                    [f"{job.name}.keep"],
+                    [path.name for path in Path(target).iterdir()],
+                )
+
+        self.assertEqual("error", output_id)
+        self.assertIn(f"target {targets[1]}: fio failed", output_data.error)
+        self.assertEqual(
+            [targets[0]],
+            [target.target for target in output_data.partial_targets],
+        )
+        plugin.test_object_serialization(output_data)
+
+    def test_streaming_interim_reports(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            dict(yaml.safe_load(poisson_submit_infile), status_interval=1)
+        )
+        expected = fio_schema.fio_output_schema.unserialize(
+            json.loads(poisson_submit_outfile)
+        )
+        fixture = Path("fixtures/poisson-rate-submission_output-plus.json")
+        with tempfile.TemporaryDirectory() as tmp:
+            # a stand-in fio that prints two reports, then dies mid-third
+            write_fake_fio(
+                tmp,
+                "import sys\n"
+                "report = open({!r}).read()\n"
+                "sys.stdout.write(report + report + report[:100])\n"
+                "sys.exit(1)\n".format(str(fixture.absolute())),
+            )
+            snapshots = []
+            path = tmp + os.pathsep + os.environ["PATH"]
+            with mock.patch.dict(os.environ, {"PATH": path}):
+                output_id, output_data = fio_plugin.run_streaming(
+                    job, snapshots.append
+                )
+
+        self.assertEqual("error", output_id)
+        self.assertIn("status 1", output_data.error)
+        self.assertEqual(expected, output_data.partial_output)
+        self.assertEqual(2, len(snapshots))
+        self.assertEqual(expected, snapshots[-1].output)
+        plugin.test_object_serialization(output_data)
+        with self.assertRaises(ValueError):
+            replace(job, status_interval=None, snapshot_file="snapshots")
+
+    def test_fake_fio(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            yaml.safe_load(poisson_submit_infile)
+        )
+        path = str(Path("mocks").absolute()) + os.pathsep + os.environ["PATH"]
+        env = {"PATH": path, "FAKE_FIO_JOBS": "3", "FAKE_FIO_BINS": "50"}
+        with mock.patch.dict(os.environ, env):
+            output_id, output_data = fio_plugin.run(job)
+            self.assertEqual("fio-3.35-fake", fio_plugin._fio_version())
+
+        self.assertEqual("success", output_id)
+        self.assertEqual(3, len(output_data.jobs))
+        self.assertEqual(50, len(output_data.jobs[0].read.clat_ns.bins))
+
+    def test_device_local_placement(self):
+        fixture = Path("fixtures/poisson-rate-submission_output-plus.json")
+        with tempfile.TemporaryDirectory() as tmp:
+            # an NVMe namespace on a PCI function of NUMA node 1
+            sysfs = Path(tmp).resolve() / "sys"
+            function = sysfs / "devices" / "pci0000:00" / "0000:3d:00.0"
+            namespace = function / "nvme" / "nvme0" / "nvme0n1"
+            namespace.mkdir(parents=True)
+            (function / "numa_node").write_text("1\n")
+            node = sysfs / "devices" / "system" / "node" / "node1"
+            node.mkdir(parents=True)
+            (node / "cpulist").write_text("8-15\n")
+            dev = os.stat(tmp).st_dev
+            (sysfs / "dev" / "block").mkdir(parents=True)
+            (
+                sysfs / "dev" / "block" / f"{os.major(dev)}:{os.minor(dev)}"
+            ).symlink_to(namespace)
+            write_fake_fio(
+                tmp,
+                "import sys, shutil\n"
+                "shutil.copy(sys.argv[1], {!r})\n"
+                "shutil.copy({!r}, sys.argv[-1].split('=', 1)[1])\n".format(
+                    str(Path(tmp) / "job.fio"), str(fixture.absolute())
+                ),
+            )
+            config = yaml.safe_load(poisson_submit_infile)
+            config["params"]["filename"] = str(Path(tmp) / "data")
+            job = fio_schema.fio_input_schema.unserialize(
+                dict(config, placement="device_local")
+            )
+            path = tmp + os.pathsep + os.environ["PATH"]
+            with mock.patch.object(fio_device, "SYSFS", sysfs):
+                with mock.patch.dict(os.environ, {"PATH": path}):
+                    output_id, output_data = fio_plugin.run(job)
+            job_file = configparser.ConfigParser()
+            job_file.read(Path(tmp) / "job.fio")
+
+        self.assertEqual("success", output_id)
+        self.assertEqual("8-15", job_file[job.name]["cpus_allowed"])
+        placement = output_data.jobs[0].placement
+        self.assertEqual("nvme0n1", placement.device)
+        self.assertEqual(1, placement.numa_node)
+        self.assertEqual("8-15", placement.cpus_allowed)
+        plugin.test_object_serialization(output_data)
+
+        # without sysfs the job runs unplaced
+        with mock.patch.object(fio_device, "SYSFS", Path("/nonexistent")):
+            self.assertEqual({}, fio_plugin._placements(job))
+        # a target set only in the global options places the job too
+        del config["params"]["filename"]
+        job = fio_schema.fio_input_schema.unserialize(
+            dict(
+                config,
+                placement="device_local",
+                global_options={"filename": "data"},
+            )
+        )
+        with mock.patch.object(
+            fio_plugin, "block_device", return_value=None
+        ) as device:
+            fio_plugin._placements(fio_plugin._anchor_paths(job, Path(tmp)))
+        device.assert_called_once_with(str(Path(tmp) / "data"))
+        with self.assertRaises(ValueError):
+            fio_schema.fio_input_schema.unserialize(
+                dict(config, placement="device_local", pin_cpus=True)
+            )
+        with self.assertRaises(schema.ConstraintException):
+            fio_schema.job_params_schema.unserialize(
+                dict(config["params"], numa_mem_policy="bind:a")
+            )
+
+    def test_instrumentation(self):
+        path = str(Path("mocks").absolute()) + os.pathsep + os.environ["PATH"]
+        env = {"PATH": path, "FAKE_FIO_JOBS": "2", "FAKE_FIO_BINS": "50"}
+        with tempfile.TemporaryDirectory() as tmp:
+            job = fio_schema.fio_input_schema.unserialize(
+                dict(
+                    yaml.safe_load(poisson_submit_infile),
+                    instrumentation=True,
+                    profile_file=str(Path(tmp) / "run.prof"),
+                )
+            )
+            with mock.patch.dict(os.environ, env):
+                output_id, output_data = fio_plugin.run(job)
+                async_id, async_data = asyncio.run(fio_plugin.run_async(job))
+            stats = pstats.Stats(job.profile_file)
+
+        self.assertEqual("success", output_id)
+        instrumentation = output_data.instrumentation
+        self.assertEqual(
+            ["render", "fio", "parse", "decode", "attach"],
+            [timing.phase for timing in instrumentation.phases],
+        )
+        for timing in instrumentation.phases:
+            self.assertGreaterEqual(timing.wall_seconds, 0.0)
+        # the stand-in fio is a python process
+        self.assertGreater(instrumentation.child.maxrss, 1000)
+        self.assertGreater(instrumentation.child.utime, 0.0)
+        self.assertEqual("success", async_id)
+        self.assertGreater(async_data.instrumentation.child.maxrss, 1000)
+        self.assertTrue(
+            any(
+                function == "load_output"
+                for _, _, function in stats.stats.keys()
+            )
+        )
+        plugin.test_object_serialization(output_data)
+
+        timer = fio_instrument.PhaseTimer()
+        with timer.phase("outer"):
+            with timer.phase("inner"):
+                time.sleep(0.05)
+        outer, inner = timer.timings()
+        self.assertLess(outer.wall_seconds, 0.05)
+        self.assertGreaterEqual(inner.wall_seconds, 0.05)
+
+    def test_supervised_failures(self):
+        fixture = Path("fixtures/poisson-rate-submission_output-plus.json")
+        job = fio_schema.fio_input_schema.unserialize(
+            dict(yaml.safe_load(poisson_submit_infile), timeout=1)
+        )
+        scripts = {
+            # writes its results when interrupted, as fio does
+            "interrupted": (
+                "import sys, time, shutil, signal\n"
+                "def stop(*_):\n"
+                "    shutil.copy({!r}, sys.argv[-1].split('=', 1)[1])\n"
+                "    sys.exit(1)\n"
+                "signal.signal(signal.SIGINT, stop)\n"
+                "time.sleep(30)\n".format(str(fixture.absolute()))
+            ),
+            "stuck": (
+                "import time, signal\n"
+                "signal.signal(signal.SIGINT, signal.SIG_IGN)\n"
+                "time.sleep(30)\n"
+            ),
+            "failed": (
+                "import sys\n"
+                "sys.stderr.write('x' * 100000 + 'fio: bad option\\n')\n"
+                "sys.exit(1)\n"
+            ),
+        }
+        errors = {}
+        for name, body in scripts.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                write_fake_fio(tmp, body)
+                path = tmp + os.pathsep + os.environ["PATH"]
+                with mock.patch.dict(os.environ, {"PATH": path}):
+                    with mock.patch.object(
+                        fio_plugin, "_INTERRUPT_GRACE_SECONDS", 0.5
+                    ):
+                        errors[name] = fio_plugin.run(job)
+                        if name == "interrupted":
+                            errors[name + "_async"] = asyncio.run(
+                                fio_plugin.run_async(job)
+                            )
+
+        output_id, interrupted = errors["interrupted"]
+        self.assertEqual("error", output_id)
+        self.assertTrue(interrupted.timed_out)
+        self.assertEqual(1, interrupted.exit_code)
+        self.assertEqual(
+            "poisson-rate-submit", interrupted.partial_output.jobs[0].jobname
+        )
+        _, stuck = errors["stuck"]
+        self.assertTrue(stuck.timed_out)
+        self.assertEqual("SIGKILL", stuck.signal)
+        self.assertIsNone(stuck.partial_output)
+        _, failed = errors["failed"]
+        self.assertFalse(failed.timed_out)
+        self.assertEqual("fio exited with status 1", failed.error)
+        self.assertTrue(failed.stderr.endswith("fio: bad option\n"))
+        self.assertLess(len(failed.stderr), 70000)
+        plugin.test_object_serialization(interrupted)
+        _, interrupted = errors["interrupted_async"]
+        self.assertTrue(interrupted.timed_out)
+        self.assertIsNotNone(interrupted.partial_output)
+
+    def test_run_async_isolated(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            yaml.safe_load(poisson_submit_infile)
+        )
+        fixture = Path("fixtures/poisson-rate-submission_output-plus.json")
+        with tempfile.TemporaryDirectory() as tmp:
+            # records its work directory and writes the fixture as output
+            write_fake_fio(
+                tmp,
+                "import os, sys, shutil\n"
+                "with open({!r}, 'a') as runs:\n"
+                "    runs.write(os.getcwd() + '\\n')\n"
+                "shutil.copy({!r}, sys.argv[-1].split('=', 1)[1])\n".format(
+                    str(Path(tmp) / "runs"), str(fixture.absolute())
+                ),
+            )
+            job.work_dir = str(Path(tmp) / "work")
+            path = tmp + os.pathsep + os.environ["PATH"]
+
+            async def run_all():
+                return await asyncio.gather(
+                    *(fio_plugin.run_async(job) for _ in range(8))
+                )
+
+            with mock.patch.dict(os.environ, {"PATH": path}):
+                results = asyncio.run(run_all())
+            work_dirs = (Path(tmp) / "runs").read_text().split()
+            left = list(Path(job.work_dir).iterdir())
+
+        self.assertEqual(["success"] * 8, [result[0] for result in results])
+        self.assertEqual(8, len(set(work_dirs)))
+        self.assertEqual([], left)
+
+    def test_run_async_cancel(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            yaml.safe_load(poisson_submit_infile)
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            started = Path(tmp) / "started"
+            write_fake_fio(
+                tmp,
+                "import os, time\n"
+                "open({!r}, 'w').write(str(os.getpid()))\n"
+                "time.sleep(60)\n".format(str(started)),
+            )
+            job.work_dir = str(Path(tmp) / "work")
+            path = tmp + os.pathsep + os.environ["PATH"]
+
+            async def run_and_cancel():
+                task = asyncio.ensure_future(fio_plugin.run_async(job))
+                while not started.exists() or not started.read_text():
+                    await asyncio.sleep(0.01)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+
+            with mock.patch.dict(os.environ, {"PATH": path}):
+                asyncio.run(run_and_cancel())
+            pid = int(started.read_text())
+            left = list(Path(job.work_dir).iterdir())
+
+        with self.assertRaises(ProcessLookupError):
+            os.kill(pid, 0)
+        self.assertEqual([], left)
+
+
+class FioMergeTest(unittest.TestCase):
+    def test_merge_latency_exact(self):
+        low = fio_schema.IoLatency(
+            min_=100,
+            max_=200,
+            mean=150.0,
+            stddev=70.7107,
+            N=2,
+            percentile={"50.000000": 100},
+            bins={"100": 1, "200": 1},
+        )
+        high = fio_schema.IoLatency(
+            min_=300,
+            max_=300,
+            mean=300.0,
+            stddev=0.0,
+            N=2,
+            percentile={"50.000000": 300},
+            bins={"300": 2},
+        )
+        merged = fio_merge.merge_latency([low, high])
+        self.assertEqual((100, 300, 4), (merged.min_, merged.max_, merged.N))
+        self.assertEqual(225.0, merged.mean)
+        self.assertAlmostEqual(95.7427, merged.stddev, places=4)
+        self.assertEqual({"100": 1, "200": 1, "300": 2}, merged.bins)
+        self.assertEqual({"50.000000": 200}, merged.percentile)
+
+    def test_merge_drops_logs(self):
+        job = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        ).jobs[0]
+        job.bw_log = fio_schema.TimeSeries([0], [100], [0], [4096])
+        merged = fio_merge.merge_job_results([job, job])
+        self.assertIsNone(merged.bw_log)
+        self.assertEqual(2 * job.read.total_ios, merged.read.total_ios)
+
+    def test_io_uring_params(self):
+        params = dict(
+            yaml.safe_load(poisson_submit_infile)["params"],
+            ioengine="io_uring",
+            sqthread_poll=1,
+            hipri=1,
+            fixedbufs=1,
+        )
+        job_params = plugin.build_object_schema(
+            fio_schema.JobParams
+        ).unserialize(params)
+        self.assertFalse(fio_schema.IoEngine(job_params.ioengine).is_sync())
+        self.assertTrue(fio_schema.IoEngine.psync.is_sync())
+        self.assertEqual("1", job_params.to_options()["sqthread_poll"])
+        self.assertNotIn("registerfiles", job_params.to_options())
+        with self.assertRaises(ValueError):
+            replace(job_params, ioengine=fio_schema.IoEngine.libaio)
+        with self.assertRaises(ValueError):
+            replace(job_params, buffered=1)
+
+    def test_io_uring_unsupported(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            yaml.safe_load(poisson_submit_infile)
+        )
+        job.params.ioengine = fio_schema.IoEngine.io_uring
+        with mock.patch.object(
+            fio_plugin.platform, "release", return_value="4.18.0-el8"
+        ):
+            output_id, output_data = fio_plugin.run(job)
+        self.assertEqual("error", output_id)
+        self.assertIn("Linux 5.1", output_data.error)
+
+
+class SloSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.template = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        self.job = fio_schema.fio_input_schema.unserialize(
+            yaml.safe_load(poisson_submit_infile)
+        )
+        self.job.params.iodepth = 1
+
+    def device(self, rate_iops: int, iodepth: int, share: float = 1.0):
+        # sustains 1000 IOPS per direction at depth 4 or more, 250 below,
+        # times share; latency climbs steeply past 800 IOPS
+        achieved = min(rate_iops, 1000 if iodepth >= 4 else 250) * share
+        latency = 100000 if achieved <= 800 else 900000
+        job = self.template.jobs[0]
+        read, write = (
+            replace(
+                result,
+                iops=float(achieved),
+                clat_ns=replace(result.clat_ns, bins={str(latency): 100}),
+            )
+            for result in (job.read, job.write)
+        )
+        job = replace(job, read=read, write=write)
+        return replace(self.template, jobs=[job])
+
+    def test_search_rate(self):
+        search = fio_schema.SloSearch(
+            job=self.job,
+            percentile=99.0,
+            latency_threshold_ns=500000,
+            max_rate_iops=2000,
+            max_iodepth=8,
+            tolerance=0.02,
+        )
+        probes, best, converged = fio_search.search_rate(search, self.device)
+        self.assertTrue(converged)
+        self.assertTrue(780 <= best.rate_iops <= 800)
+        self.assertEqual(4, best.iodepth)
+        self.assertLess(len(probes), 12)
+        self.assertFalse(probes[0].meets_slo)
+
+    def test_rate_is_per_direction(self):
+        search = fio_schema.SloSearch(
+            job=self.job,
+            percentile=99.0,
+            latency_threshold_ns=500000,
+            max_rate_iops=200,
+        )
+        # reads and writes together exceed the rate, neither reaches it
+        probes, best, _ = fio_search.search_rate(
+            search, lambda rate, depth: self.device(rate, depth, share=0.6)
+        )
+        self.assertGreater(probes[0].iops, 200)
+        self.assertFalse(probes[0].meets_slo)
+        self.assertTrue(best is None or best.rate_iops < 200)
+
+    def test_slo_search_step(self):
+        search = fio_schema.SloSearch(
+            job=self.job,
+            percentile=99.0,
+            latency_threshold_ns=500000,
+            max_rate_iops=200,
+        )
+        with mock.patch.object(
+            fio_plugin,
+            "run",
+            lambda job: (
+                "success",
+                self.device(job.params.rate_iops, job.params.iodepth),
+            ),
+        ):
+            output_id, output_data = fio_plugin.slo_search(search)
+
+        self.assertEqual("success", output_id)
+        self.assertEqual(1, len(output_data.probes))
+        self.assertEqual(200, output_data.best_params.rate_iops)
+        plugin.test_object_serialization(output_data)
+        with self.assertRaises(ValueError):
+            replace(search, percentile=101.0)
+
+
+class FioSweepTest(unittest.TestCase):
+    def setUp(self):
+        self.output = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        job = yaml.safe_load(poisson_submit_infile)
+        del job["params"]["rate_process"]
+        self.sweep = plugin.build_object_schema(
+            fio_schema.FioSweep
+        ).unserialize(
+            {
+                "job": job,
+                "parameters": {
+                    "iodepth": [1, 8],
+                    "ioengine": ["sync", "libaio"],
+                    "rate_iops": [50, 50],
+                },
+                "exclude": [{"iodepth": "8", "ioengine": "sync"}],
+            }
+        )
+
+    def test_expand_points(self):
+        points = fio_sweep.expand_points(self.sweep)
+        self.assertEqual(6, len(points))
+        self.assertNotIn(
+            {"iodepth": "8", "ioengine": "sync", "rate_iops": "50"}, points
+        )
+        job = fio_sweep.apply_point(self.sweep.job, points[-1])
+        self.assertEqual(8, job.params.iodepth)
+        self.assertEqual(fio_schema.IoEngine.libaio, job.params.ioengine)
+        with self.assertRaises(schema.ConstraintException):
+            fio_sweep.apply_point(self.sweep.job, {"iodepth": "deep"})
+        with self.assertRaises(ValueError):
+            fio_sweep.apply_point(self.sweep.job, {"no_such_option": "1"})
+
+    def test_resumable_sweep(self):
+        executed = []
+
+        def execute(job):
+            executed.append(job)
+            if len(executed) == 3:
+                raise RuntimeError("interrupted")
+            return self.output
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.sweep.checkpoint_file = str(Path(tmp) / "sweep.ndjson")
+            with self.assertRaises(RuntimeError):
+                fio_sweep.run_sweep(self.sweep, execute)
+            executed.clear()
+            output = fio_sweep.run_sweep(self.sweep, execute)
+
+        # the rate_iops values repeat, so every job file comes up twice
+        self.assertEqual(1, len(executed))
+        self.assertEqual(1, output.runs)
+        self.assertEqual(4, output.resumed)
+        self.assertEqual(1, output.deduplicated)
+        self.assertEqual(6, len(output.rows))
+        self.assertEqual(
+            {"iodepth": "8", "ioengine": "libaio", "rate_iops": "50"},
+            output.rows[-1].point,
+        )
+        self.assertEqual(
+            self.output.jobs[0].read.clat_ns.percentile["99.000000"],
+            output.rows[0].clat_p99_ns,
+        )
+        plugin.test_object_serialization(output)
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.output = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+
+    def test_cache_key(self):
+        key = fio_cache.cache_key("[job]\n", "fio-3.19", "8:0/disk")
+        self.assertEqual(
+            key, fio_cache.cache_key("[job]\n", "fio-3.19", "8:0/disk")
+        )
+        self.assertNotEqual(
+            key, fio_cache.cache_key("[job]\n", "fio-3.35", "8:0/disk")
+        )
+        self.assertNotEqual(
+            key, fio_cache.cache_key("[job]\n", "fio-3.19", "8:16/disk")
+        )
+
+    def test_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            options = fio_schema.ResultCache(directory=tmp)
+            cache = fio_cache.OutputCache(options)
+            self.assertIsNone(cache.get("a"))
+            cache.put("a", self.output)
+            cache.put("b", self.output)
+            cached = cache.get("a")
+            self.assertEqual(
+                self.output.jobs[0].read.iops, cached.jobs[0].read.iops
+            )
+            # "b" is now the least recently used entry
+            os.utime(Path(tmp) / "b.json", (1, 1))
+            options.max_bytes = (Path(tmp) / "a.json").stat().st_size
+            cache.evict()
+            self.assertIsNone(cache.get("b"))
+            self.assertIsNotNone(cache.get("a"))
+            options.max_age_seconds = 60
+            os.utime(Path(tmp) / "a.json", (1, 1))
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual([], list(Path(tmp).iterdir()))
+
+    def test_run_cached(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            yaml.safe_load(poisson_submit_infile)
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            job.cache = fio_schema.ResultCache(directory=tmp)
+            with mock.patch.object(
+                fio_plugin, "_fio_version", return_value="fio-3.19"
+            ), mock.patch.object(
+                fio_plugin, "_run_fio", return_value=self.output
+            ) as run_fio:
+                self.assertEqual("success", fio_plugin.run(job)[0])
+                output_id, output = fio_plugin.run(job)
+                self.assertEqual(1, run_fio.call_count)
+                self.assertEqual("success", output_id)
+                self.assertEqual(
+                    self.output.jobs[0].read.iops, output.jobs[0].read.iops
+                )
+                job.cache.bypass = True
+                fio_plugin.run(job)
+                self.assertEqual(2, run_fio.call_count)
+                job.cache.bypass = False
+                job.params.iodepth = 2
+                fio_plugin.run(job)
+                self.assertEqual(3, run_fio.call_count)
+                # an entry the schema no longer accepts is a miss
+                key = fio_plugin._cache_key(job)
+                entry = Path(tmp) / f"{key}.json"
+                entry.write_text(json.dumps({"jobs": [{"jobname": 1}]}))
+                self.assertEqual("success", fio_plugin.run(job)[0])
+                self.assertEqual(4, run_fio.call_count)
+                self.assertIsNotNone(
+                    fio_cache.OutputCache(job.cache).get(key)
+                )
+                # the device behind a global target is part of the key
+                job.global_options = {"filename": "data"}
+                with mock.patch.object(
+                    fio_plugin, "fingerprint", side_effect=str
+                ) as fingerprint:
+                    fio_plugin._cache_key(job)
+                fingerprint.assert_called_once_with(
+                    str(Path.cwd() / "data")
+                )
+        with self.assertRaises(ValueError):
+            replace(job, targets=["/mnt/a", "/mnt/b"])
+
+
+class FilePoolTest(unittest.TestCase):
+    def test_fio_bytes(self):
+        self.assertEqual(4096, fio_schema.fio_bytes("4k"))
+        self.assertEqual(10 << 20, fio_schema.fio_bytes("10MiB"))
+        self.assertEqual(1 << 30, fio_schema.fio_bytes("1GB"))
+        self.assertEqual(512, fio_schema.fio_bytes("512"))
+        self.assertIsNone(fio_schema.fio_bytes("50%"))
+
+    def test_lease(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            options = fio_schema.DataFilePool(
+                directory=tmp, fill=fio_schema.PoolFill.zero
+            )
+            pool = fio_pool.FilePool(options)
+            with pool.lease(3000) as first:
+                self.assertEqual(bytes(3000), first.read_bytes())
+                # a file in use is not handed out twice
+                with pool.lease(3000) as second:
+                    self.assertNotEqual(first, second)
+            with pool.lease(3000) as again:
+                self.assertIn(again, (first, second))
+            options.invalidate = True
+            with pool.lease(3000) as fresh:
+                self.assertNotIn(fresh, (first, second))
+            options.invalidate = False
+
+            options.max_bytes = 4000
+            os.utime(fresh, (1, 1))
+            with pool.lease(2000) as small:
+                # the least recently used file made room
+                self.assertFalse(fresh.exists())
+                with pool.lease(4000) as too_big:
+                    self.assertIsNone(too_big)
+            self.assertEqual(
+                [small.name], [p.name for p in Path(tmp).glob("*.data")]
+            )
+
+    def test_run_pooled(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            yaml.safe_load(poisson_submit_infile)
+        )
+        output = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            job.data_pool = fio_schema.DataFilePool(
+                directory=tmp, fill=fio_schema.PoolFill.sparse
+            )
+            with mock.patch.object(
+                fio_plugin, "_run_fio", return_value=output
+            ) as run_fio:
+                self.assertEqual("success", fio_plugin.run(job)[0])
+                self.assertEqual("success", fio_plugin.run(job)[0])
+            filenames = [
+                call.args[0].params.filename for call in run_fio.call_args_list
+            ]
+            self.assertEqual(filenames[0], filenames[1])
+            self.assertTrue(filenames[0].startswith(tmp))
+            self.assertEqual(
+                fio_schema.fio_bytes(job.params.size),
+                Path(filenames[0]).stat().st_size,
+            )
+            self.assertIsNone(job.params.filename)
+            # each clone of a global numjobs lays out its own file
+            job.global_options = {"numjobs": "4"}
+            self.assertEqual({}, fio_plugin._pool_sizes(job))
+            job.params.numjobs = 1
+            self.assertEqual([job.name], list(fio_plugin._pool_sizes(job)))
+
+    def test_cache_key(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            yaml.safe_load(poisson_submit_infile)
+        )
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(
+            fio_plugin, "_fio_version", return_value="fio-3.35"
+        ), mock.patch.object(
+            fio_plugin, "fingerprint", side_effect=lambda path: path
+        ):
+            unpooled = fio_plugin._cache_key(job)
+            job.data_pool = fio_schema.DataFilePool(directory=tmp)
+            pooled = fio_plugin._cache_key(job)
+            job.data_pool.fill = fio_schema.PoolFill.zero
+            zeroed = fio_plugin._cache_key(job)
+        self.assertEqual(3, len({unpooled, pooled, zeroed}))
+
+
+class FioIologTest(unittest.TestCase):
+    trace = (
+        "fio version 3 iolog\n"
+        "0 /dev/sdb add\n"
+        "0 /dev/sdc add\n"
+        "0 /dev/sdb open\n"
+        "1000000000 /dev/sdb read 0 4096\n"
+        "2000000000 /dev/sdb write 4096 4096\n"
+        "2500000000 /dev/sdc read 0 512\n"
+        "3000000000 /dev/sdb read 8192 4096\n"
+        "4000000000 /dev/sdb read 0 4096\n"
+        "5000000000 /dev/sdb close\n"
+    )
+
+    def test_validation(self):
+        cases = {
+            "fio version 4 iolog\n": "line 1",
+            "fio version 2 iolog\n/x add\n/x read 0\n": "line 3",
+            "fio version 2 iolog\n/x read 0 4096\n": "never added",
+            "fio version 3 iolog\n5 /x add\n4 /x open\n": "backwards",
+            "fio version 3 iolog\n0 /x add\n1 /x read -1 1\n": "offset",
+            "fio version 3 iolog\n0 /x add\n1 /x wait 10 0\n": "line 3",
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "trace.iolog"
+            for text, message in cases.items():
+                path.write_text(text)
+                with self.assertRaisesRegex(ValueError, message):
+                    fio_iolog.validate_iolog(path)
+            path.write_text(self.trace)
+            self.assertEqual(3, fio_iolog.validate_iolog(path))
+
+    def test_version_2_waits(self):
+        trace = (
+            "fio version 2 iolog\n"
+            "f add\n"
+            "f open\n"
+            "f read 0 4096\n"
+            "f wait 1000 0\n"
+            "f write 4096 4096\n"
+            "f close\n"
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            source, copy = Path(tmp) / "trace.iolog", Path(tmp) / "copy"
+            source.write_text(trace)
+            self.assertEqual(2, fio_iolog.validate_iolog(source))
+            everything = fio_schema.TraceFilter(files=["f"])
+            self.assertEqual(
+                2, fio_iolog.preprocess_iolog(source, copy, everything)
+            )
+            self.assertEqual(trace, copy.read_text())
+            reads = fio_schema.TraceFilter(
+                actions=[fio_schema.IologAction.read]
+            )
+            self.assertEqual(
+                1, fio_iolog.preprocess_iolog(source, copy, reads)
+            )
+            self.assertNotIn("wait", copy.read_text())
+
+    def test_preprocess(self):
+        trace_filter = fio_schema.TraceFilter(
+            actions=[fio_schema.IologAction.read],
+            files=["/dev/sdb"],
+            start="2s",
+            end="4s",
+            speedup=2.0,
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            source, copy = Path(tmp) / "trace.iolog", Path(tmp) / "copy"
+            source.write_text(self.trace)
+            ios = fio_iolog.preprocess_iolog(source, copy, trace_filter)
+            self.assertEqual(1, ios)
+            self.assertEqual(
+                "fio version 3 iolog\n"
+                "0 /dev/sdb add\n"
+                "0 /dev/sdb open\n"
+                "500000000 /dev/sdb read 8192 4096\n",
+                copy.read_text(),
+            )
+            source.write_text("fio version 2 iolog\n/x add\n")
+            with self.assertRaisesRegex(ValueError, "timestamps"):
+                fio_iolog.preprocess_iolog(source, copy, trace_filter)
+        with self.assertRaises(ValueError):
+            fio_schema.TraceFilter(start="4s", end="2s")
+
+    def test_replay_job_file(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            yaml.safe_load(poisson_submit_infile)
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            trace = Path(tmp) / "trace.iolog"
+            trace.write_text(self.trace)
+            job.params = replace(
+                job.params,
+                read_iolog=str(trace),
+                replay_no_stall=1,
+                replay_redirect="/dev/nullb0",
+            )
+            job.trace_filter = fio_schema.TraceFilter(end="3s")
+            work_dir = Path(tmp) / "run"
+            work_dir.mkdir()
+            fio_plugin._fio_command(job, work_dir)
+            cfg = configparser.ConfigParser()
+            cfg.read(work_dir / fio_plugin._JOB_FILE)
+            section = cfg[job.name]
+            self.assertEqual("1", section["replay_no_stall"])
+            self.assertEqual("/dev/nullb0", section["replay_redirect"])
+            copy = Path(section["read_iolog"])
+            self.assertEqual(work_dir, copy.parent)
+            # the header, the file actions and the IOs before 3s
+            self.assertEqual(7, len(copy.read_text().splitlines()))
+        with self.assertRaises(ValueError):
+            replace(job.params, read_iolog=None)
+
+    def test_streaming_checks_iolog(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            trace = Path(tmp) / "trace.iolog"
+            trace.write_text("fio version 3 iolog\n0 /x read 0 4096\n")
+            job = fio_schema.fio_input_schema.unserialize(
+                dict(yaml.safe_load(poisson_submit_infile), status_interval=1)
+            )
+            job.params.read_iolog = str(trace)
+            # the iolog is rejected before fio would start
+            with mock.patch.object(fio_plugin.subprocess, "Popen") as popen:
+                output_id, output = fio_plugin.run_streaming(job, print)
+        self.assertEqual("error", output_id)
+        self.assertIn("line 2: file '/x' was never added", output.error)
+        popen.assert_not_called()
+
+
+class RepetitionTest(unittest.TestCase):
+    def setUp(self):
+        self.output = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        self.policy = fio_schema.RepetitionPolicy(
+            min_runs=3, max_runs=6, relative_width=0.1
+        )
+
+    def test_confidence_interval(self):
+        # two-sided 95% critical values of Student's t
+        self.assertAlmostEqual(
+            2.776445, fio_stats.student_t_quantile(0.975, 4), places=5
+        )
+        self.assertAlmostEqual(
+            12.706205, fio_stats.student_t_quantile(0.975, 1), places=5
+        )
+        mean, stddev, low, high = fio_stats.confidence_interval(
+            [10.0, 12.0, 14.0], 0.95
+        )
+        self.assertEqual((12.0, 2.0), (mean, stddev))
+        self.assertAlmostEqual(12.0 - 4.968275, low, places=5)
+        self.assertAlmostEqual(12.0 + 4.968275, high, places=5)
+
+    def test_stops_early_when_stable(self):
+        runs = []
+
+        def execute():
+            runs.append(None)
+            return self.output
+
+        repeated = fio_stats.run_repetitions(self.policy, execute)
+        self.assertEqual(3, len(runs))
+        self.assertTrue(repeated.converged)
+        metrics = {i.metric for i in repeated.intervals}
+        self.assertEqual(
+            {
+                "iops",
+                "bw_bytes",
+                "clat_mean_ns",
+                "clat_p50_ns",
+                "clat_p99_ns",
+                "clat_p99.9_ns",
+            },
+            metrics,
+        )
+        p99 = next(i for i in repeated.intervals if i.metric == "clat_p99_ns")
+        self.assertEqual(
+            self.output.jobs[0].read.clat_ns.percentile["99.000000"], p99.mean
+        )
+        plugin.test_object_serialization(repeated)
+
+    def test_runs_to_cap_when_noisy(self):
+        runs = []
+
+        def execute():
+            output = copy.deepcopy(self.output)
+            output.jobs[0].read.iops *= 0.5 + len(runs) % 2
+            runs.append(output)
+            return output
+
+        repeated = fio_stats.run_repetitions(self.policy, execute)
+        self.assertEqual(6, len(runs))
+        self.assertFalse(repeated.converged)
+        iops = next(i for i in repeated.intervals if i.metric == "iops")
+        self.assertLess(iops.low, self.output.jobs[0].read.iops)
+        self.assertGreater(iops.high, self.output.jobs[0].read.iops)
+
+    def test_workload_repetitions(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            dict(
+                yaml.safe_load(poisson_submit_infile),
+                repetitions={"min_runs": 2},
+            )
+        )
+        with mock.patch.object(
+            fio_plugin, "_run_fio", return_value=self.output
+        ) as run_fio:
+            output_id, output_data = fio_plugin.run(job)
+        self.assertEqual("repeated", output_id)
+        self.assertEqual(2, run_fio.call_count)
+        self.assertEqual(2, len(output_data.outputs))
+        with self.assertRaises(ValueError):
+            fio_schema.fio_input_schema.unserialize(
+                dict(
+                    yaml.safe_load(poisson_submit_infile),
+                    repetitions={"min_runs": 4, "max_runs": 3},
+                )
+            )
+
+    def test_failed_repetition(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            dict(
+                yaml.safe_load(poisson_submit_infile),
+                repetitions={"min_runs": 2},
+            )
+        )
+        timed_out = fio_schema.FioErrorOutput(
+            "fio was interrupted at its deadline",
+            self.output,
+            signal="SIGKILL",
+            timed_out=True,
+            stderr="fio: job stuck\n",
+        )
+        with mock.patch.object(
+            fio_plugin, "_run_once", return_value=("error", timed_out)
+        ):
+            output_id, error = fio_plugin.run(job)
+        self.assertEqual("error", output_id)
+        self.assertTrue(error.error.startswith("run 1 of the repetitions"))
+        self.assertTrue(error.timed_out)
+        self.assertEqual("SIGKILL", error.signal)
+        self.assertEqual("fio: job stuck\n", error.stderr)
+        self.assertIs(self.output, error.partial_output)
+
+
+class CompareTest(unittest.TestCase):
+    def setUp(self):
+        self.output = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+
+    def slower(self, factor):
+        output = copy.deepcopy(self.output)
+        clat = output.jobs[0].read.clat_ns
+        clat.bins = {
+            str(int(int(value) * factor)): count
+            for value, count in clat.bins.items()
+        }
+        return output
+
+    def test_unchanged(self):
+        result = fio_compare.compare_outputs(
+            fio_schema.FioCompare(self.output, copy.deepcopy(self.output))
+        )
+        self.assertFalse(result.regression)
+        (comparison,) = result.comparisons
+        self.assertEqual("read", comparison.direction)
+        self.assertEqual(fio_schema.Verdict.unchanged, comparison.verdict)
+        self.assertEqual(0.0, comparison.ks_statistic)
+        self.assertEqual(1.0, comparison.ks_p_value)
+        plugin.test_object_serialization(result)
+
+    def test_latency_regression(self):
+        output_id, result = fio_plugin.compare(
+            fio_schema.FioCompare(self.output, self.slower(1.5))
+        )
+        self.assertEqual("success", output_id)
+        self.assertTrue(result.regression)
+        (comparison,) = result.comparisons
+        self.assertEqual(
+            fio_schema.Verdict.regression, comparison.distribution_verdict
+        )
+        self.assertLess(comparison.ks_p_value, 0.01)
+        verdicts = {m.metric: m.verdict for m in comparison.metrics}
+        self.assertEqual(fio_schema.Verdict.unchanged, verdicts["iops"])
+        self.assertEqual(
+            fio_schema.Verdict.regression, verdicts["clat_p99_ns"]
+        )
+        # the same shift the other way round is an improvement
+        result = fio_compare.compare_outputs(
+            fio_schema.FioCompare(self.slower(1.5), self.output)
+        )
+        self.assertFalse(result.regression)
+        self.assertEqual(
+            fio_schema.Verdict.improvement, result.comparisons[0].verdict
+        )
+
+    def test_iops_threshold(self):
+        candidate = copy.deepcopy(self.output)
+        candidate.jobs[0].read.iops *= 0.9
+        params = fio_schema.FioCompare(self.output, candidate)
+        self.assertTrue(fio_compare.compare_outputs(params).regression)
+        params.iops_threshold = 0.2
+        self.assertFalse(fio_compare.compare_outputs(params).regression)
+        candidate.jobs[0].jobname = "other"
+        output_id, _ = fio_plugin.compare(params)
+        self.assertEqual("error", output_id)
+
+
+class FioLogsTest(unittest.TestCase):
+    log = (
+        "0, 100, 0, 4096, 0\n"
+        "0, 300, 1, 4096, 0\n"
+        "500, 200, 0, 8192, 0\n"
+        "1000, 50, 0, 4096, 0\n"
+    )
+
+    def test_parse_log(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "job_bw.1.log"
+            path.write_text(self.log)
+            columns = fio_logs.parse_log(path, chunk_size=5)
+            downsampled = fio_logs.parse_log(path, downsample_msec=1000)
+
+        series = columns.to_time_series()
+        self.assertEqual([0, 0, 500, 1000], series.time_ms)
+        self.assertEqual([100, 300, 200, 50], series.value)
+        self.assertEqual([0, 1, 0, 0], series.direction)
+        self.assertEqual([4096, 4096, 8192, 4096], series.block_size)
+        plugin.test_object_serialization(series)
+
+        series = downsampled.to_time_series()
+        self.assertEqual([0, 0, 1000], series.time_ms)
+        self.assertEqual([150, 300, 50], series.value)
+        self.assertEqual([0, 1, 0], series.direction)
+        self.assertEqual([0, 4096, 4096], series.block_size)
+
+    def test_collect_logs(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            dict(yaml.safe_load(poisson_submit_infile), collect_logs=["bw"])
+        )
+        output = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = str(Path(tmp) / "run")
+            job_file = Path(tmp) / "job.fio"
+            fio_plugin._with_logs(job, prefix).write_params_to_file(job_file)
+            cfg = configparser.ConfigParser(interpolation=None)
+            cfg.read(job_file)
+            Path(f"{prefix}-{job.name}_bw.1.log").write_text(self.log)
+            fio_plugin._attach_logs(job, prefix, output)
+
+        self.assertEqual(
+            f"{prefix}-{job.name}", cfg[job.name]["write_bw_log"]
+        )
+        self.assertEqual(4, len(output.jobs[0].bw_log.value))
+        self.assertIsNone(output.jobs[0].lat_log)
+
+    def test_collect_logs_sections(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            dict(
+                yaml.safe_load(poisson_submit_infile),
+                collect_logs=["bw"],
+                sections=[
+                    {
+                        "name": "second",
+                        "params": yaml.safe_load(poisson_submit_infile)[
+                            "params"
+                        ],
+                    }
+                ],
+            )
+        )
+        output = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        output.jobs.append(replace(output.jobs[0], jobname="second"))
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = str(Path(tmp) / "run")
+            Path(f"{prefix}-{job.name}_bw.1.log").write_text(self.log)
+            # the second section's thread is fio's second
+            Path(f"{prefix}-second_bw.2.log").write_text(
+                self.log.splitlines(keepends=True)[0]
+            )
+            fio_plugin._attach_logs(job, prefix, output)
+
+        self.assertEqual(4, len(output.jobs[0].bw_log.value))
+        self.assertEqual(1, len(output.jobs[1].bw_log.value))
+
+
+class FioDecodeTest(unittest.TestCase):
+    fixture = Path("fixtures/poisson-rate-submission_output-plus.json")
+
+    def test_streaming_matches_generic(self):
+        expected = fio_schema.fio_output_schema.unserialize(
+            json.loads(poisson_submit_outfile)
+        )
+        self.assertEqual(expected, fio_decode.load_output(self.fixture))
+        # chunk boundaries fall inside keys, strings and numbers
+        for chunk_size in (1, 7, 4096):
+            self.assertEqual(
+                expected,
+                fio_decode.load_output(
+                    self.fixture, chunk_size=chunk_size, use_mmap=True
+                ),
+            )
+        self.assertEqual(
+            expected,
+            fio_decode.load_output(poisson_submit_outfile.encode(), 13),
+        )
+
+    def test_iter_job_results(self):
+        jobs = list(fio_decode.iter_job_results(self.fixture, chunk_size=64))
+        self.assertEqual(
+            [
+                fio_schema.job_schema.unserialize(job)
+                for job in json.loads(poisson_submit_outfile)["jobs"]
+            ],
+            jobs,
+        )
+
+    def test_iter_outputs(self):
+        outputs = list(
+            fio_decode.iter_outputs(
+                (poisson_submit_outfile * 3).encode(), chunk_size=512
+            )
+        )
+        self.assertEqual(3, len(outputs))
+        self.assertEqual(outputs[0], outputs[2])
+
+    def test_fast_decoder(self):
+        modes = fio_decode.DecodeMode
+        raw = json.loads(poisson_submit_outfile)
+        expected = fio_schema.job_schema.unserialize(
+            json.loads(poisson_submit_outfile)["jobs"][0]
+        )
+        self.assertEqual(expected, fio_decode._fast_job(raw["jobs"][0]))
+        self.assertEqual(
+            fio_decode.load_output(self.fixture, mode=modes.generic),
+            fio_decode.load_output(self.fixture, mode=modes.verify),
+        )
+        # values only the schema converts fall back to it
+        raw["jobs"][0]["groupid"] = "0"
+        with self.assertRaises(fio_decode._Unhandled):
+            fio_decode._fast_job(raw["jobs"][0])
+        self.assertEqual(
+            expected, fio_decode.decode_job(raw["jobs"][0], modes.verify)
+        )
+        raw["jobs"][0]["read"]["iops"] = "many"
+        with self.assertRaises(schema.ConstraintException):
+            fio_decode.decode_job(raw["jobs"][0])
+
+    def test_detail_levels(self):
+        job = fio_schema.fio_input_schema.unserialize(
+            yaml.safe_load(poisson_submit_infile)
+        )
+
+        def load(detail, readwrite=fio_schema.IoPattern.randrw):
+            job.detail = detail
+            job.params.readwrite = readwrite
+            return fio_decode.load_output(
+                self.fixture, prune=fio_detail.job_pruner(job)
+            ).jobs[0]
+
+        full = load(fio_schema.DetailLevel.full)
+        self.assertEqual(
+            fio_schema.job_schema.unserialize(
+                json.loads(poisson_submit_outfile)["jobs"][0]
+            ),
+            full,
+        )
+        percentiles = load(fio_schema.DetailLevel.percentiles)
+        self.assertIsNone(percentiles.read.clat_ns.bins)
+        self.assertEqual(
+            full.read.clat_ns.percentile, percentiles.read.clat_ns.percentile
+        )
+        self.assertIsNone(percentiles.latency_us)
+        summary = load(fio_schema.DetailLevel.summary)
+        self.assertIsNone(summary.read.clat_ns.percentile)
+        self.assertEqual(full.read.clat_ns.mean, summary.read.clat_ns.mean)
+        plugin.test_object_serialization(summary)
+        # the fixture's reads fall outside a write-only pattern
+        write_only = load(
+            fio_schema.DetailLevel.full, fio_schema.IoPattern.randwrite
+        )
+        self.assertIsNone(write_only.read.clat_ns.bins)
+        self.assertEqual(full.latency_ns, write_only.latency_ns)
+        # a replayed iolog may do IO in any direction, whatever readwrite is
+        job.params.read_iolog = "trace.iolog"
+        replayed = load(
+            fio_schema.DetailLevel.full, fio_schema.IoPattern.randwrite
+        )
+        self.assertEqual(full.read.clat_ns.bins, replayed.read.clat_ns.bins)
+
+    def test_malformed_output(self):
+        with self.assertRaises(ValueError):
+            fio_decode.load_output(poisson_submit_outfile[:-200].encode())
+        with self.assertRaises(ValueError):
+            fio_decode.load_output((poisson_submit_outfile + "{}").encode())
+
+
+class FioPackTest(unittest.TestCase):
+    def test_round_trip(self):
+        output = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        packed = fio_pack.dumps_output(output)
+        self.assertLess(len(packed), len(poisson_submit_outfile) / 4)
+        self.assertEqual(output, fio_pack.loads_output(packed))
+        with self.assertRaises(ValueError):
+            fio_pack.loads_output(poisson_submit_outfile.encode())
+
+        # keys that would not come back the same stay in the JSON header
+        clat = output.jobs[0].read.clat_ns
+        clat.bins = dict(clat.bins, **{"0012": 1})
+        self.assertEqual(
+            clat.bins,
+            fio_pack.loads_output(fio_pack.dumps_output(output))
+            .jobs[0]
+            .read.clat_ns.bins,
+        )
+
+    def test_packed_file(self):
+        output = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            job = fio_schema.fio_input_schema.unserialize(
+                dict(
+                    yaml.safe_load(poisson_submit_infile),
+                    packed_file=str(Path(tmp) / "result.pack"),
+                )
+            )
+            with mock.patch.object(
+                fio_plugin, "_run_fio", return_value=output
+            ):
+                output_id, output_data = fio_plugin.run(job)
+            self.assertEqual("success", output_id)
+            self.assertEqual(output, fio_pack.load_output(job.packed_file))
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    def setUp(self):
+        output = fio_decode.load_output(
+            Path("fixtures/poisson-rate-submission_output-plus.json")
+        )
+        self.clat = output.jobs[0].read.clat_ns
+
+    def test_matches_fio_percentiles(self):
+        histogram = self.clat.histogram()
+        self.assertEqual(self.clat.N, histogram.total)
+        self.assertEqual(
+            self.clat.percentile,
+            histogram.percentile_map(float(p) for p in self.clat.percentile),
+        )
+        self.assertAlmostEqual(self.clat.mean, histogram.mean(), delta=10)
+
+    def test_round_trip(self):
+        histogram = self.clat.histogram()
+        self.assertEqual(self.clat.bins, histogram.to_bins())
+        self.assertEqual(
+            histogram, LatencyHistogram.from_bins(histogram.to_bins())
+        )
+        plugin.test_object_serialization(self.clat)
+
+    def test_queries(self):
+        histogram = LatencyHistogram.from_bins({"300": 1, "100": 2, "200": 1})
+        self.assertEqual(
+            [100, 100, 200, 300], histogram.percentiles([0, 50, 75, 100])
+        )
+        self.assertEqual(
+            [0.0, 0.5, 0.75, 1.0], histogram.cdf([50, 100, 250, 1000])
+        )
+        self.assertEqual(175.0, histogram.mean())
+        merged = LatencyHistogram.merged([histogram, histogram])
+        self.assertEqual({"100": 4, "200": 2, "300": 2}, merged.to_bins())
+        self.assertAlmostEqual(95.7427, histogram.stddev(), places=4)
+        self.assertEqual(0, LatencyHistogram.from_bins(None).percentile(99))
 
 
 if __name__ == "__main__":